@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CustomUser, StudySession, Categories, CategoryBlock, UserGoals, DailyAggregate, WeeklyAggregate, MonthlyAggregate, WeeklyGoal, DailyGoal
+from .models import CustomUser, StudySession, Categories, CategoryBlock, UserGoals, DailyAggregate, WeeklyAggregate, MonthlyAggregate, WeeklyGoal, DailyGoal, AggregateJob, UserFlowStats, CategoryDailyFact, DailyCumulative
 from django.utils.timezone import localtime
 
 @admin.register(StudySession)
@@ -98,6 +98,31 @@ class MonthlyAggregateAdmin(admin.ModelAdmin):
         return f"{obj.total_duration / 3600:.2f}h"
     total_duration_hours.short_description = 'Duration (hours)'
 
+@admin.register(AggregateJob)
+class AggregateJobAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'status', 'attempts', 'requested_at', 'run_after', 'last_error')
+    list_filter = ('status',)
+    search_fields = ('user__username',)
+    ordering = ('run_after',)
+
+@admin.register(CategoryDailyFact)
+class CategoryDailyFactAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'category', 'seconds', 'block_count', 'session_count')
+    list_filter = ('date',)
+    search_fields = ('user__username', 'category__name')
+    ordering = ('-date',)
+
+@admin.register(DailyCumulative)
+class DailyCumulativeAdmin(admin.ModelAdmin):
+    list_display = ('user', 'date', 'total_duration', 'session_count', 'break_count')
+    search_fields = ('user__username',)
+    ordering = ('-date',)
+
+@admin.register(UserFlowStats)
+class UserFlowStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'flow_score_count', 'flow_score_min', 'flow_score_max', 'total_duration', 'total_sessions', 'last_updated')
+    search_fields = ('user__username',)
+
 @admin.register(WeeklyGoal)
 class WeeklyGoalAdmin(admin.ModelAdmin):
     list_display = ('user', 'week_start', 'total_minutes', 'active_weekdays_display', 'carry_over_enabled')
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from analytics.models import StudySession
+from analytics.services.date_utils import get_local_date
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill StudySession.local_date from each user\'s timezone for sessions still missing it. '
+        'Migration 0030 already does this; run it for databases migrated before that step existed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of sessions to update per query'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the sessions that would be updated without writing anything'
+        )
+
+    def handle(self, *args, **options):
+        missing = StudySession.objects.filter(local_date__isnull=True)
+        total = missing.count()
+        self.stdout.write(f"Found {total} sessions without a local_date")
+
+        if options['dry_run'] or not total:
+            return
+
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            # Walk by primary key so each batch is an indexed range scan
+            batch = list(
+                missing.filter(id__gt=last_id).select_related('user').order_by('id')[:batch_size]
+            )
+            if not batch:
+                break
+
+            for session in batch:
+                session.local_date = get_local_date(session.user, session.start_time)
+            StudySession.objects.bulk_update(batch, ['local_date'])
+
+            last_id = batch[-1].id
+            updated += len(batch)
+            self.stdout.write(f"Updated {updated}/{total} sessions")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Backfilled local_date for {updated} sessions"))
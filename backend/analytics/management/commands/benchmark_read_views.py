@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from analytics.models import CustomUser
+from analytics.services.date_utils import get_month_boundaries, get_user_today, get_week_boundaries
+from analytics.services.insights_cache import InsightsCache
+from analytics.views.async_api import (
+    AsyncDailyInsights, AsyncWeeklyInsights, AsyncMonthlyInsights, AsyncCategoryList, AsyncWeeklyGoalView,
+)
+from analytics.views.category_api import CategoryList
+from analytics.views.goal_api import WeeklyGoalView
+from analytics.views.insights_api import DailyInsights, WeeklyInsights, MonthlyInsights
+
+ENDPOINTS = {
+    'daily': (DailyInsights, AsyncDailyInsights),
+    'weekly': (WeeklyInsights, AsyncWeeklyInsights),
+    'monthly': (MonthlyInsights, AsyncMonthlyInsights),
+    'categories': (CategoryList, AsyncCategoryList),
+    'goal': (WeeklyGoalView, AsyncWeeklyGoalView),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and latency of the sync (WSGI) and async (ASGI) read views '
+        'for one user at the same worker count. Views are called in-process, so the '
+        'numbers leave out the web server but include the database round trips.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='User whose data is requested')
+        parser.add_argument(
+            '--endpoint',
+            choices=sorted(ENDPOINTS),
+            default='daily',
+            help='Endpoint to benchmark'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests per run'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Sync: threads serving one request at a time. Async: threads each running an event loop'
+        )
+        parser.add_argument(
+            '--in-flight',
+            type=int,
+            default=8,
+            help='Concurrent requests per async worker'
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Invalidate the insights cache before every request so payloads are rebuilt'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options['username'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        self.user = user
+        self.cold = options['cold']
+        self.params = self._params(user, options['endpoint'])
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        self.path = f"/api/{options['endpoint']}/"
+        sync_view, async_view = ENDPOINTS[options['endpoint']]
+
+        total, workers = options['requests'], options['workers']
+        self.stdout.write(
+            f"{options['endpoint']} for {user.username}: {total} requests, {workers} workers"
+            f"{', cold cache' if self.cold else ''}"
+        )
+
+        results = [
+            ('sync (WSGI)', self._run_sync(sync_view.as_view(), total, workers)),
+            (
+                f"async (ASGI, {options['in_flight']} in flight per worker)",
+                self._run_async(async_view.as_view(), total, workers, options['in_flight'])
+            ),
+        ]
+        for label, (elapsed, latencies) in results:
+            latencies.sort()
+            self.stdout.write(
+                f"  {label}: {len(latencies) / elapsed:.1f} req/s, "
+                f"p50 {statistics.median(latencies) * 1000:.1f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms"
+            )
+
+    def _params(self, user, endpoint):
+        today = get_user_today(user)
+        if endpoint == 'daily':
+            return {'date': today.isoformat()}
+        if endpoint == 'weekly':
+            start, end = get_week_boundaries(today)
+        elif endpoint == 'monthly':
+            start, end = get_month_boundaries(today)
+        else:
+            return {}
+        return {'start_date': start.isoformat(), 'end_date': end.isoformat()}
+
+    def _check(self, response):
+        if response.status_code not in (200, 304, 404):
+            raise CommandError(f"Request failed with status {response.status_code}")
+
+    def _run_sync(self, view, total, workers):
+        factory = RequestFactory()
+        latencies = []
+
+        def one_request(_):
+            if self.cold:
+                InsightsCache.bump(self.user.id)
+            started = time.perf_counter()
+            response = view(factory.get(self.path, self.params, headers=self.headers))
+            if hasattr(response, 'render'):
+                response.render()
+            # What the request_finished signal does under a real handler
+            close_old_connections()
+            latencies.append(time.perf_counter() - started)
+            self._check(response)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(one_request, range(total)))
+        return time.perf_counter() - started, latencies
+
+    def _run_async(self, view, total, workers, in_flight):
+        factory = AsyncRequestFactory()
+        issued = itertools.count()
+        latencies = []
+
+        async def one_request():
+            if self.cold:
+                InsightsCache.bump(self.user.id)
+            started = time.perf_counter()
+            # As under the ASGI handler: each request gets its own thread for sync work
+            async with ThreadSensitiveContext():
+                response = await view(factory.get(self.path, self.params, headers=self.headers))
+                await sync_to_async(close_old_connections)()
+            latencies.append(time.perf_counter() - started)
+            self._check(response)
+
+        async def drain():
+            while next(issued) < total:
+                await one_request()
+
+        async def worker():
+            await asyncio.gather(*(drain() for _ in range(in_flight)))
+
+        def run_worker():
+            asyncio.run(worker())
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run_worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, latencies
@@ -54,7 +54,8 @@ class Command(BaseCommand):
         problematic_sessions = StudySession.objects.filter(
             user=user,
             start_time__date=cleanup_date,
-            status='active'  # Usually the duplicate ones are still 'active'
+            status='active',  # Usually the duplicate ones are still 'active'
+            client_uuid__isnull=True  # Creates with a client_uuid can't be duplicated
         ).filter(
             Q(total_duration__isnull=True) |  # Null duration (from infinite loop)
             Q(total_duration__lt=300)  # Or less than 5 minutes
@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from analytics.models import AggregateJob, CustomUser
+from analytics.models import DailyAggregate, WeeklyAggregate, MonthlyAggregate
+from analytics.services.date_utils import get_timezone_today, get_week_boundaries, get_month_boundaries
+from analytics.services.insights_cache import InsightsCache
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark daily, weekly and monthly aggregates final once their period has ended in '
+        'each user\'s timezone. Safe to run hourly so every timezone is swept soon after '
+        'its local midnight.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows to finalize per UPDATE'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the rows that would be finalized without writing anything'
+        )
+
+    def handle(self, *args, **options):
+        timezones = CustomUser.objects.values_list('timezone', flat=True).distinct().order_by('timezone')
+
+        totals = {'daily': 0, 'weekly': 0, 'monthly': 0}
+        for timezone_name in timezones:
+            today = get_timezone_today(timezone_name)
+            counts = self._finalize_timezone(timezone_name, today, options['batch_size'], options['dry_run'])
+            for level, count in counts.items():
+                totals[level] += count
+            if any(counts.values()):
+                self.stdout.write(
+                    f"{timezone_name} (today {today}): {counts['daily']} daily, "
+                    f"{counts['weekly']} weekly, {counts['monthly']} monthly"
+                )
+
+        verb = "Would finalize" if options['dry_run'] else "Finalized"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {verb} {totals['daily']} daily, {totals['weekly']} weekly and {totals['monthly']} monthly aggregates"
+        ))
+
+    def _finalize_timezone(self, timezone_name, today, batch_size, dry_run):
+        current_week_start = get_week_boundaries(today)[0]
+        current_month_start = get_month_boundaries(today)[0]
+
+        # Days with an outstanding recompute stay open until it has run
+        dirty_day = AggregateJob.objects.filter(user=OuterRef('user'), date=OuterRef('date'))
+        daily = DailyAggregate.objects.filter(
+            user__timezone=timezone_name, is_final=False, date__lt=today
+        ).exclude(Exists(dirty_day))
+
+        dirty_week = AggregateJob.objects.filter(
+            user=OuterRef('user'), date__gte=OuterRef('week_start'), date__lt=current_week_start
+        )
+        weekly = WeeklyAggregate.objects.filter(
+            user__timezone=timezone_name, is_final=False, week_start__lt=current_week_start
+        ).exclude(Exists(dirty_week))
+
+        dirty_month = AggregateJob.objects.filter(
+            user=OuterRef('user'), date__gte=OuterRef('month_start'), date__lt=current_month_start
+        )
+        monthly = MonthlyAggregate.objects.filter(
+            user__timezone=timezone_name, is_final=False, month_start__lt=current_month_start
+        ).exclude(Exists(dirty_month))
+
+        return {
+            'daily': self._finalize(daily, batch_size, dry_run),
+            'weekly': self._finalize(weekly, batch_size, dry_run),
+            'monthly': self._finalize(monthly, batch_size, dry_run),
+        }
+
+    @staticmethod
+    def _finalize(queryset, batch_size, dry_run):
+        if dry_run:
+            return queryset.count()
+
+        model = queryset.model
+        finalized = 0
+        while True:
+            rows = list(queryset.values_list('id', 'user_id')[:batch_size])
+            if not rows:
+                return finalized
+            # The pre-rendered payload carries is_final; it is re-rendered on next read
+            finalized += model.objects.filter(id__in=[row[0] for row in rows]).update(
+                is_final=True, rendered_payload=None
+            )
+            # Cached insights carry is_final
+            InsightsCache.bump_many({row[1] for row in rows})
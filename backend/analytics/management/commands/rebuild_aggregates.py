@@ -0,0 +1,181 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+
+from analytics.models import CustomUser, StudySession, UserFlowStats, DailyCumulative
+from analytics.services.date_utils import get_month_boundaries
+from analytics.services.insights_cache import InsightsCache
+from analytics.services.split_aggregate_service import SplitAggregateUpdateService
+
+
+def _init_worker():
+    """Process pool initializer: make Django usable and never reuse the parent's connections"""
+    django.setup()
+    connections.close_all()
+
+
+def _rebuild_chunk(user_id, month_start, range_start, range_end):
+    try:
+        return SplitAggregateUpdateService.rebuild_user_month(user_id, month_start, range_start, range_end)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily, weekly and monthly aggregates from raw sessions, split into (user, month) chunks run in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            action='append',
+            dest='users',
+            help='Username to rebuild (repeatable). Defaults to all users.'
+        )
+        parser.add_argument(
+            '--start',
+            type=str,
+            help='First date to rebuild (YYYY-MM-DD). Defaults to each user\'s first session.'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            help='Last date to rebuild (YYYY-MM-DD). Defaults to each user\'s last session.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes. Use 1 to run in this process.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default='.rebuild_aggregates_checkpoint.json',
+            help='File recording finished chunks so an interrupted run can resume'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore any existing checkpoint and rebuild every chunk'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            range_start = date.fromisoformat(options['start']) if options['start'] else None
+            range_end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError:
+            raise CommandError("Invalid date format. Use YYYY-MM-DD.")
+
+        users = CustomUser.objects.all()
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+
+        chunks = self._plan_chunks(users, range_start, range_end)
+
+        # Only resume a checkpoint written for the same arguments
+        run_key = json.dumps([sorted(options['users'] or []), options['start'], options['end']])
+        done = set()
+        checkpoint_path = options['checkpoint']
+        if not options['restart'] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('run') == run_key:
+                done = set(checkpoint.get('done', []))
+                self.stdout.write(f"Resuming from checkpoint: {len(done)} chunks already done")
+
+        pending = [chunk for chunk in chunks if self._chunk_key(chunk) not in done]
+        self.stdout.write(f"Rebuilding {len(pending)} of {len(chunks)} (user, month) chunks with {options['workers']} worker(s)")
+
+        totals = [0, 0, 0]
+        failed = 0
+
+        def record(chunk, result):
+            for i, count in enumerate(result):
+                totals[i] += count
+            done.add(self._chunk_key(chunk))
+            self._save_checkpoint(checkpoint_path, run_key, done)
+
+        if options['workers'] <= 1:
+            for chunk in pending:
+                try:
+                    record(chunk, SplitAggregateUpdateService.rebuild_user_month(*chunk, range_start, range_end))
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"❌ Chunk {self._chunk_key(chunk)} failed: {str(e)}"))
+        else:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                futures = {
+                    pool.submit(_rebuild_chunk, *chunk, range_start, range_end): chunk
+                    for chunk in pending
+                }
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        record(chunk, future.result())
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(self.style.ERROR(f"❌ Chunk {self._chunk_key(chunk)} failed: {str(e)}"))
+
+        self.stdout.write(
+            f"Wrote {totals[0]} daily, {totals[1]} weekly and {totals[2]} monthly aggregates"
+        )
+
+        # Bulk upserts bypass the incremental lifetime stats and running totals; drop
+        # them so they are rebuilt from the new daily rows on next read
+        rebuilt_user_ids = {user_id for user_id, _ in chunks}
+        UserFlowStats.objects.filter(user_id__in=rebuilt_user_ids).delete()
+        DailyCumulative.objects.filter(user_id__in=rebuilt_user_ids).delete()
+        InsightsCache.bump_many(rebuilt_user_ids)
+        if failed:
+            raise CommandError(f"{failed} chunk(s) failed. Re-run the same command to retry them.")
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS("🎉 Aggregate rebuild completed"))
+
+    def _plan_chunks(self, users, range_start, range_end):
+        """One (user_id, month_start) chunk per month between each user's first and last session"""
+        spans = StudySession.objects.filter(
+            user__in=users,
+            status='completed'
+        ).values('user_id').annotate(
+            first=Min('start_time'),
+            last=Max('start_time')
+        ).order_by('user_id')
+
+        chunks = []
+        for span in spans:
+            # Local dates can be a day either side of the UTC date
+            first = span['first'].date() - timedelta(days=1)
+            last = span['last'].date() + timedelta(days=1)
+            if range_start:
+                first = max(first, range_start)
+            if range_end:
+                last = min(last, range_end)
+
+            month_start = get_month_boundaries(first)[0]
+            while month_start <= last:
+                chunks.append((span['user_id'], month_start))
+                month_start = get_month_boundaries(month_start)[1] + timedelta(days=1)
+        return chunks
+
+    @staticmethod
+    def _chunk_key(chunk):
+        user_id, month_start = chunk
+        return f"{user_id}:{month_start.isoformat()}"
+
+    @staticmethod
+    def _save_checkpoint(path, run_key, done):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'run': run_key, 'done': sorted(done)}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.services.aggregate_job_queue import AggregateJobQueue
+
+
+class Command(BaseCommand):
+    help = 'Drain the aggregate job queue, recomputing aggregates for each queued (user, date)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of jobs to claim per batch'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait before polling again when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once there are no due jobs instead of polling forever'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue backlog and lag, then exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._print_stats()
+            return
+
+        self.stdout.write("Starting aggregate worker...")
+        self._print_stats()
+
+        total_succeeded = total_failed = 0
+        while True:
+            succeeded, failed = AggregateJobQueue.run_pending(options['batch_size'])
+            total_succeeded += succeeded
+            total_failed += failed
+
+            if succeeded or failed:
+                self.stdout.write(f"Processed batch: {succeeded} succeeded, {failed} failed")
+                self._print_stats()
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Aggregate worker finished: {total_succeeded} succeeded, {total_failed} failed")
+        )
+
+    def _print_stats(self):
+        stats = AggregateJobQueue.backlog_stats()
+        self.stdout.write(
+            f"Backlog: {stats['pending']} pending, {stats['running']} running, "
+            f"{stats['failed']} failed, lag {stats['lag_seconds']:.1f}s"
+        )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.services.hanging_session_service import ABANDONED_AFTER, HangingSessionService
+from analytics.services.live_session_service import LiveSessionService
+
+
+class Command(BaseCommand):
+    help = (
+        'Complete sessions whose heartbeats stopped, close sessions that never sent one and '
+        'have been open for hours, and orphaned category blocks for all users, and queue '
+        'aggregate refreshes for the days they touch. Run periodically (cron) or with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Keep running, sweeping every this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Sweeping sessions with expired heartbeats, or none and open longer than {ABANDONED_AFTER}...")
+
+        while True:
+            expired = LiveSessionService.close_expired()
+            sessions, blocks = HangingSessionService.sweep(hanging_after=ABANDONED_AFTER)
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Closed {expired} session(s) with expired heartbeats, {sessions} hanging session(s) "
+                f"and {blocks} orphaned category block(s)"
+            ))
+
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
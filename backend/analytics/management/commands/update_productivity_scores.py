@@ -10,7 +10,7 @@ class Command(BaseCommand):
         self.stdout.write('Updating productivity scores for all daily aggregates...')
         
         # Get all daily aggregates
-        aggregates = DailyAggregate.objects.all()
+        aggregates = DailyAggregate.objects.select_related('user')
         updated_count = 0
         
         for aggregate in aggregates:
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-17 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0027_feedback'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyaggregate',
+            name='flow_weighted_duration',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dailyaggregate',
+            name='flow_weighted_sum',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dailyaggregate',
+            name='productivity_rated_duration',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='dailyaggregate',
+            name='productivity_weighted_sum',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+from analytics.services.date_utils import get_local_date
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_local_dates(apps, schema_editor):
+    # Daily lookups match local_date exactly, so existing sessions need it before the
+    # first recompute of their day, or their totals drop out of the aggregates
+    StudySession = apps.get_model('analytics', 'StudySession')
+    missing = StudySession.objects.filter(local_date__isnull=True).select_related('user').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(missing.filter(id__gt=last_id)[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        for session in batch:
+            session.local_date = get_local_date(session.user, session.start_time)
+        StudySession.objects.bulk_update(batch, ['local_date'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0029_aggregatejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='local_date',
+            field=models.DateField(blank=True, help_text="Session start date in the user's timezone", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['user', 'status', 'local_date'], name='analytics_s_user_id_09f97e_idx'),
+        ),
+        migrations.RunPython(backfill_local_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0030_studysession_local_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserFlowStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flow_score_sum', models.FloatField(default=0)),
+                ('flow_score_count', models.IntegerField(default=0)),
+                ('flow_score_min', models.FloatField(blank=True, null=True)),
+                ('flow_score_max', models.FloatField(blank=True, null=True)),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('total_sessions', models.IntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='flow_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
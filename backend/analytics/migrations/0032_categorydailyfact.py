@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0031_userflowstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDailyFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('seconds', models.IntegerField(default=0)),
+                ('block_count', models.IntegerField(default=0)),
+                ('session_count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='analytics.categories')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='analytics_c_user_id_4f2c1e_idx')],
+                'unique_together': {('user', 'date', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0032_categorydailyfact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCumulative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_duration', models.BigIntegerField(default=0)),
+                ('session_count', models.IntegerField(default=0)),
+                ('break_count', models.IntegerField(default=0)),
+                ('flow_weighted_sum', models.FloatField(default=0)),
+                ('flow_weighted_duration', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='analytics_d_user_id_6a1687_idx')],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
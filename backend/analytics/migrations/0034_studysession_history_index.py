@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0033_dailycumulative'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['user', '-start_time', '-id'], name='analytics_s_user_id_823f7d_idx'),
+        ),
+    ]
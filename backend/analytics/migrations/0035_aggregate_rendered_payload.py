@@ -0,0 +1,28 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0034_studysession_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyaggregate',
+            name='rendered_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='monthlyaggregate',
+            name='rendered_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='weeklyaggregate',
+            name='rendered_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0035_aggregate_rendered_payload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoryblock',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studysession',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, help_text='Client-generated id making creates idempotent', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='categoryblock',
+            constraint=models.UniqueConstraint(fields=('study_session', 'client_uuid'), name='unique_block_client_uuid'),
+        ),
+        migrations.AddConstraint(
+            model_name='studysession',
+            constraint=models.UniqueConstraint(fields=('user', 'client_uuid'), name='unique_session_client_uuid'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.5 on 2026-10-17 06:46
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Q, Subquery
+
+
+def set_open_session_markers(apps, schema_editor):
+    CustomUser = apps.get_model('analytics', 'CustomUser')
+    StudySession = apps.get_model('analytics', 'StudySession')
+    open_sessions = StudySession.objects.filter(Q(end_time__isnull=True) | Q(status='active'))
+    CustomUser.objects.filter(pk__in=open_sessions.values('user_id')).update(
+        open_session_since=Subquery(
+            open_sessions.filter(user=OuterRef('pk')).order_by('start_time').values('start_time')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0036_session_block_client_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='open_session_since',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(set_open_session_markers, migrations.RunPython.noop),
+    ]
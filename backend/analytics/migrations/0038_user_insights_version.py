@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0037_user_open_session_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='insights_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
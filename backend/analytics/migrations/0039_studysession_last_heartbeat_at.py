@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0038_user_insights_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='last_heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last heartbeat from the running timer', null=True),
+        ),
+    ]
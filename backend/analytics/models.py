@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from datetime import timedelta
 
 
@@ -33,6 +34,13 @@ class CustomUser(AbstractUser):
         help_text='Whether the user has premium access (currently defaults to True for testing)'
     )
 
+    # Start of the user's earliest session still open, null when none is; lets launch
+    # skip hanging-session cleanup without querying sessions
+    open_session_since = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # Bumped on every write that changes the user's insights; keys their cached payloads
+    insights_version = models.BigIntegerField(default=0)
+
 class StudySessionManager(models.Manager):
     def active_sessions(self):
         """Get only completed sessions, excluding active and cancelled ones"""
@@ -59,6 +67,12 @@ class StudySession(models.Model):
     total_duration = models.IntegerField(null=True, blank=True)  # Duration in seconds
     focus_rating = models.CharField(null=True, blank=True, max_length=50, help_text="User's self-rated focus level (1-5)")
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default="active")
+    # Start date in the user's timezone, stored so daily lookups are exact indexed queries
+    local_date = models.DateField(null=True, blank=True, help_text="Session start date in the user's timezone")
+    # Generated by the app so a retried create returns the first attempt's row
+    client_uuid = models.UUIDField(null=True, blank=True, help_text="Client-generated id making creates idempotent")
+    # Written at most every SESSION_HEARTBEAT_PERSIST_SECONDS, so other processes can tell a live session from a crashed one
+    last_heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last heartbeat from the running timer")
     
     # Flow Score fields
     flow_score = models.IntegerField(null=True, blank=True, help_text="Flow score (0-1000)")
@@ -68,35 +82,72 @@ class StudySession(models.Model):
 
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['user', 'status', 'local_date']),
+            # Keyset pagination of session history
+            models.Index(fields=['user', '-start_time', '-id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'client_uuid'], name='unique_session_client_uuid'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets save() tell whether start_time moved since the row was loaded
+        instance._loaded_start_time = instance.__dict__.get('start_time')
+        return instance
+
+    def start_time_moved(self):
+        loaded = getattr(self, '_loaded_start_time', None)
+        return loaded is not None and loaded != self.start_time
 
     def save(self, *args, **kwargs):
         if self.end_time and self.start_time:
             duration = self.end_time - self.start_time
             self.total_duration = round(duration.total_seconds())
+            if self.local_date is None or self.start_time_moved():
+                from analytics.services.date_utils import get_local_date
+                self.local_date = get_local_date(self.user, self.start_time)
+        opened = self._state.adding and self.end_time is None
         super().save(*args, **kwargs)
-    
+        self._loaded_start_time = self.start_time
+        if opened:
+            from analytics.services.hanging_session_service import HangingSessionService
+            HangingSessionService.mark_opened(self)
+
     def calculate_flow_score(self):
         """
         Calculate and store the flow score for this session.
         Should be called when session is completed.
         Minimum session length: 15 minutes (900 seconds)
         """
-        from analytics.flow_score import calculate_flow_score
-        
         if not self.end_time or not self.start_time:
             return None
         
+        # Get all category blocks for this session
+        self.set_flow_score(self.categoryblock_set.all().order_by('start_time'))
+        
+        # Save the updated scores
+        super().save(update_fields=['flow_score', 'flow_components'])
+        
+        return self.flow_score
+    
+    def set_flow_score(self, blocks):
+        """
+        Compute flow_score and flow_components from the session's category blocks
+        (ordered by start_time) without saving, so bulk inserts can score sessions
+        before they are written.
+        """
+        from analytics.flow_score import calculate_flow_score
+        
         # Check minimum session length (15 minutes)
         if self.total_duration and self.total_duration < 900:
             # Session too short for flow score
             self.flow_score = None
             self.flow_components = None
-            super().save(update_fields=['flow_score', 'flow_components'])
             return None
         
-        # Get all category blocks for this session
-        blocks = self.categoryblock_set.all().order_by('start_time')
-        
         # Format blocks for flow score calculation
         category_blocks = []
         for block in blocks:
@@ -153,9 +204,6 @@ class StudySession(models.Model):
             'coaching_message': result.coaching_message
         }
         
-        # Save the updated scores
-        super().save(update_fields=['flow_score', 'flow_components'])
-        
         return self.flow_score
 
 
@@ -183,6 +231,12 @@ class CategoryBlock(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField(null=True, blank=True)
     duration = models.IntegerField(null=True, blank=True)
+    client_uuid = models.UUIDField(null=True, blank=True)  # Makes retried creates idempotent
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['study_session', 'client_uuid'], name='unique_block_client_uuid'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.end_time and self.start_time:
@@ -192,7 +246,22 @@ class CategoryBlock(models.Model):
 
 
 # Split aggregate models
-class DailyAggregate(models.Model):
+class RenderedPayloadMixin:
+    """
+    Keeps rendered_payload (the aggregate's insights payload, pre-encoded as JSON) in
+    step with the row, so reads can send the bytes without decoding or re-encoding.
+    Bulk writes that bypass save() must set or clear rendered_payload themselves.
+    """
+    
+    def save(self, *args, **kwargs):
+        from analytics.services.insights_payload import render_aggregate_payload
+        self.rendered_payload = render_aggregate_payload(self)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'rendered_payload'}
+        super().save(*args, **kwargs)
+
+
+class DailyAggregate(RenderedPayloadMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     date = models.DateField()
     
@@ -210,9 +279,17 @@ class DailyAggregate(models.Model):
     flow_score_details = models.JSONField(null=True, blank=True)  # Min/max/avg/distribution
     flow_coaching_message = models.TextField(null=True, blank=True)  # Personalized advice
     
+    # Running sums behind the weighted averages, so a finished session can be applied
+    # as a delta. Null on rows written before these were tracked (forces a full recompute).
+    productivity_weighted_sum = models.FloatField(null=True, blank=True)  # sum(score * seconds)
+    productivity_rated_duration = models.IntegerField(null=True, blank=True)  # seconds
+    flow_weighted_sum = models.FloatField(null=True, blank=True)  # sum(flow_score * seconds)
+    flow_weighted_duration = models.IntegerField(null=True, blank=True)  # seconds
+    
     # Pre-computed JSON data for API responses
     category_durations = models.JSONField(default=dict)  # {category_name: seconds}
     timeline_data = models.JSONField(default=list)  # Complete session timeline for API
+    rendered_payload = models.BinaryField(null=True, blank=True, editable=False)  # Insights payload as JSON bytes
     
     # Metadata
     is_final = models.BooleanField(default=False)  # True when day is complete
@@ -229,7 +306,7 @@ class DailyAggregate(models.Model):
         return f"{self.user.username} - {self.date}"
 
 
-class WeeklyAggregate(models.Model):
+class WeeklyAggregate(RenderedPayloadMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     week_start = models.DateField()  # Monday of the week
     
@@ -247,6 +324,7 @@ class WeeklyAggregate(models.Model):
     category_durations = models.JSONField(default=dict)  # {category_name: seconds}
     daily_breakdown = models.JSONField(default=dict)  # {day_code: {total, categories}}
     session_times = models.JSONField(default=list)  # All session start/end times
+    rendered_payload = models.BinaryField(null=True, blank=True, editable=False)  # Insights payload as JSON bytes
     
     # Metadata
     is_final = models.BooleanField(default=False)  # True when week is complete
@@ -262,7 +340,7 @@ class WeeklyAggregate(models.Model):
         return f"{self.user.username} - week of {self.week_start}"
 
 
-class MonthlyAggregate(models.Model):
+class MonthlyAggregate(RenderedPayloadMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     month_start = models.DateField()  # First day of month
     
@@ -280,6 +358,7 @@ class MonthlyAggregate(models.Model):
     category_durations = models.JSONField(default=dict)  # {category_name: seconds}
     daily_breakdown = models.JSONField(default=list)  # [{date, total_duration, categories}]
     heatmap_data = models.JSONField(default=dict)  # {date_str: hours} Ready for heatmap
+    rendered_payload = models.BinaryField(null=True, blank=True, editable=False)  # Insights payload as JSON bytes
     
     # Metadata
     is_final = models.BooleanField(default=False)  # True when month is complete
@@ -295,6 +374,117 @@ class MonthlyAggregate(models.Model):
         return f"{self.user.username} - month of {self.month_start}"
 
 
+class CategoryDailyFact(models.Model):
+    """
+    Study time per category per local day, keyed by category id so renames keep
+    their history. Maintained alongside DailyAggregate by SplitAggregateUpdateService;
+    category breakdowns for any range are a single GROUP BY over this table.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()  # User's local date
+    category = models.ForeignKey(Categories, on_delete=models.CASCADE)
+    seconds = models.IntegerField(default=0)
+    block_count = models.IntegerField(default=0)
+    session_count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('user', 'date', 'category')
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.date} - category {self.category_id}"
+
+
+class DailyCumulative(models.Model):
+    """
+    Running totals of a user's daily aggregates up to and including a local date.
+    
+    There is a row for every date that has a DailyAggregate, so the totals for any
+    range [start, end] are the latest row on or before end minus the latest row
+    before start: two indexed lookups however long the range is.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()  # User's local date
+    total_duration = models.BigIntegerField(default=0)  # seconds
+    session_count = models.IntegerField(default=0)
+    break_count = models.IntegerField(default=0)
+    flow_weighted_sum = models.FloatField(default=0)  # sum(flow_score * seconds)
+    flow_weighted_duration = models.BigIntegerField(default=0)  # seconds
+    
+    class Meta:
+        unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - through {self.date}"
+
+
+class UserFlowStats(models.Model):
+    """
+    Lifetime statistics over a user's daily aggregates, kept in step with every
+    daily aggregate change so the insights views read them in O(1).
+    
+    flow_score_* cover days that have a flow score; the mean is
+    flow_score_sum / flow_score_count.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='flow_stats')
+    flow_score_sum = models.FloatField(default=0)
+    flow_score_count = models.IntegerField(default=0)
+    flow_score_min = models.FloatField(null=True, blank=True)
+    flow_score_max = models.FloatField(null=True, blank=True)
+    total_duration = models.BigIntegerField(default=0)  # seconds
+    total_sessions = models.IntegerField(default=0)
+    last_updated = models.DateTimeField(auto_now=True)
+    
+    @property
+    def flow_score_avg(self):
+        if not self.flow_score_count:
+            return None
+        return self.flow_score_sum / self.flow_score_count
+    
+    def __str__(self):
+        return f"{self.user.username} - lifetime flow stats"
+
+
+class AggregateJob(models.Model):
+    """
+    Pending aggregate recompute for one user's local date.
+    
+    There is at most one row per (user, date): enqueueing again while a job is
+    pending just bumps requested_at, so a burst of session changes on the same
+    day triggers a single recompute. Finished jobs are deleted, so the table is
+    the backlog.
+    """
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    date = models.DateField()  # User's local date to recompute
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)  # Pushed back on retry
+    requested_at = models.DateTimeField(default=timezone.now)  # Last time a change was enqueued
+    started_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.date} ({self.status})"
+
+
 class Break(models.Model):
     study_session = models.ForeignKey('StudySession', on_delete = models.CASCADE)
     start_time = models.DateTimeField()
@@ -1,8 +1,10 @@
-from django.db.models import Sum, Avg, Count
+from django.db.models import Sum, Avg, Count, Exists, OuterRef, Prefetch, Q
 from django.utils import timezone
 from datetime import timedelta
 from .models import StudySession, CategoryBlock, Categories, Break
-from .models import DailyAggregate, WeeklyAggregate, MonthlyAggregate
+from .models import DailyAggregate, WeeklyAggregate, MonthlyAggregate, CategoryDailyFact
+from .services.date_utils import get_user_today
+from .services.daily_cumulative_service import DailyCumulativeService
 
 class StudyAnalytics:
 
@@ -62,87 +64,27 @@ class StudyAnalytics:
 
     @staticmethod
     def get_custom_aggregate(user, start_date, end_date):
-        filters = {
-            'user': user, 
-            'start_date__gte': start_date, 
-            'end_date__lte': end_date,
-            'status': 'completed'  # Only include completed sessions
-        }
-        return StudySession.objects.filter(**filters).aggregate(
-            total_duration=Sum('total_duration'),
-            session_count=Count('id'),
-            break_duration=Sum('break__duration')
-        )
+        """Totals between two local dates (inclusive) from the running-totals table"""
+        return DailyCumulativeService.get_range_totals(user, start_date, end_date)
     
     @staticmethod
     def get_daily_sessions_with_breakdown(user, target_date):
-        from datetime import timedelta
-        import pytz
-        
-        # Get user's timezone
-        user_timezone_str = getattr(user, 'timezone', 'UTC')
-        try:
-            user_tz = pytz.timezone(user_timezone_str)
-        except pytz.exceptions.UnknownTimeZoneError:
-            user_tz = pytz.UTC
-        
-        # Query 3-day buffer to capture timezone edge cases
-        buffer_start = target_date - timedelta(days=1)
-        buffer_end = target_date + timedelta(days=1)
-        
-        # Get candidate sessions
-        candidate_sessions = StudySession.objects.filter(
+        """Completed sessions on a local date (user's timezone), oldest first"""
+        return list(StudySession.objects.filter(
             user=user,
-            start_time__date__gte=buffer_start,
-            start_time__date__lte=buffer_end,
-            status='completed'
-        ).prefetch_related('categoryblock_set').order_by('start_time')
-        
-        # Filter by user's local date in Python
-        target_sessions = []
-        for session in candidate_sessions:
-            session_local_date = session.start_time.astimezone(user_tz).date()
-            if session_local_date == target_date:
-                target_sessions.append(session)
-        
-        return target_sessions
+            status='completed',
+            local_date=target_date
+        ).prefetch_related('categoryblock_set').order_by('start_time'))
     
     @staticmethod
     def get_weekly_session_times(user, week_start, week_end):
-        from datetime import timedelta
-        import pytz
-        
-        # Get user's timezone
-        user_timezone_str = getattr(user, 'timezone', 'UTC')
-        try:
-            user_tz = pytz.timezone(user_timezone_str)
-        except pytz.exceptions.UnknownTimeZoneError:
-            user_tz = pytz.UTC
-        
-        # Query with buffer to capture timezone edge cases
-        buffer_start = week_start - timedelta(days=1)
-        buffer_end = week_end + timedelta(days=1)
-        
-        # Get candidate sessions
-        candidate_sessions = StudySession.objects.filter(
+        """Start/end times of completed sessions between two local dates (user's timezone)"""
+        return list(StudySession.objects.filter(
             user=user,
-            start_time__date__gte=buffer_start,
-            start_time__date__lte=buffer_end,
-            status='completed'
-        ).order_by('start_time')
-        
-        # Filter by user's local date range in Python
-        target_sessions = []
-        for session in candidate_sessions:
-            session_local_date = session.start_time.astimezone(user_tz).date()
-            if week_start <= session_local_date <= week_end:
-                target_sessions.append({
-                    'start_time': session.start_time,
-                    'end_time': session.end_time,
-                    'total_duration': session.total_duration
-                })
-        
-        return target_sessions
+            status='completed',
+            local_date__gte=week_start,
+            local_date__lte=week_end
+        ).order_by('start_time').values('start_time', 'end_time', 'total_duration'))
 
     @staticmethod
     def get_longest_session(user, start_date, end_date):
@@ -190,22 +132,33 @@ class StudyAnalytics:
     @staticmethod
     def get_category_breakdown(user, timeframe='week'):
         """Get study time breakdown by category"""
-        now = timezone.now()
+        today = get_user_today(user)
         if timeframe == 'week':
-            start_date = now - timedelta(days=7)
+            start_date = today - timedelta(days=7)
         elif timeframe == 'month':
-            start_date = now - timedelta(days=30)
+            start_date = today - timedelta(days=30)
         else:
             start_date = None
 
-        return CategoryBlock.objects.filter(
-            study_session__user=user,
-            study_session__status='completed',  # Only include completed sessions
-            start_time__gte=start_date
-        ).values('category__name').annotate(
-            total_duration=Sum('duration'),
-            session_count=Count('study_session', distinct=True)
-        )
+        return StudyAnalytics.get_category_breakdown_in_range(user, start_date, today)
+
+    @staticmethod
+    def get_category_breakdown_in_range(user, start_date=None, end_date=None):
+        """
+        Study time per category between two local dates (inclusive), from the
+        category fact table. Names and colors are the categories' current ones.
+        """
+        facts = CategoryDailyFact.objects.filter(user=user)
+        if start_date:
+            facts = facts.filter(date__gte=start_date)
+        if end_date:
+            facts = facts.filter(date__lte=end_date)
+
+        return facts.values('category_id', 'category__name', 'category__color').annotate(
+            total_duration=Sum('seconds'),
+            block_count=Sum('block_count'),
+            session_count=Sum('session_count')
+        ).order_by('-total_duration')
 
     @staticmethod
     def get_productivity_stats(user):
@@ -226,6 +179,42 @@ class StudyAnalytics:
             status='completed'  # Only include completed sessions
         ).order_by('-start_time')[:limit]
 
+    @staticmethod
+    def get_session_history(user, limit, after=None, statuses=None, category_id=None,
+                            focus_ratings=None, min_duration=None, max_duration=None):
+        """
+        One page of a user's sessions, newest first, keyset-paginated on (start_time, id).
+        after is the (start_time, id) of the last session on the previous page, so deep
+        pages cost the same index range scan as the first one instead of an OFFSET.
+        """
+        sessions = StudySession.objects.filter(user=user)
+        if after:
+            after_start_time, after_id = after
+            sessions = sessions.filter(
+                Q(start_time__lt=after_start_time) | Q(start_time=after_start_time, id__lt=after_id)
+            )
+        if statuses:
+            sessions = sessions.filter(status__in=statuses)
+        if category_id:
+            sessions = sessions.filter(Exists(
+                CategoryBlock.objects.filter(study_session=OuterRef('pk'), category_id=category_id)
+            ))
+        if focus_ratings:
+            # Ratings are stored as the strings '1'-'5'
+            sessions = sessions.filter(focus_rating__in=[str(rating) for rating in focus_ratings])
+        if min_duration is not None:
+            sessions = sessions.filter(total_duration__gte=min_duration)
+        if max_duration is not None:
+            sessions = sessions.filter(total_duration__lte=max_duration)
+
+        return sessions.order_by('-start_time', '-id').prefetch_related(
+            Prefetch(
+                'categoryblock_set',
+                queryset=CategoryBlock.objects.select_related('category').order_by('start_time')
+            ),
+            Prefetch('break_set', queryset=Break.objects.order_by('start_time')),
+        )[:limit]
+
     @staticmethod
     def get_category_list(user):
         """Get all categories created by user"""
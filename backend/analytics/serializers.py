@@ -43,11 +43,23 @@ class CategorySerializer(serializers.ModelSerializer):
         
         return data
 
+def validate_unchanged_client_uuid(instance, value):
+    """client_uuid is set when a row is created and can't be changed afterwards"""
+    if instance is not None and value != instance.client_uuid:
+        raise serializers.ValidationError("client_uuid can't be changed once set")
+    return value
+
+
 class StudySessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudySession
         fields = '__all__'
-        read_only_fields = ['id','user', 'total_duration', 'flow_score', 'flow_components']
+        # local_date picks the aggregate bucket, so it always comes from start_time and the user's timezone
+        read_only_fields = ['id','user', 'total_duration', 'flow_score', 'flow_components', 'local_date', 'last_heartbeat_at']
+        extra_kwargs = {'client_uuid': {'required': False}}
+    
+    def validate_client_uuid(self, value):
+        return validate_unchanged_client_uuid(self.instance, value)
     
     def validate(self, data):
         start_time = data.get('start_time')
@@ -64,38 +76,18 @@ class StudySessionSerializer(serializers.ModelSerializer):
     
 
 
-    def complete_session(self, instance, validated_data):
-        instance.end_time = validated_data.get('end_time')
-        instance.status = validated_data.get('status', 'completed')
-        
-        # Update focus rating if provided
-        if 'focus_rating' in validated_data:
-            instance.focus_rating = validated_data.get('focus_rating')
-            
-        instance.save()
-        
-        # Calculate flow score after saving (needs complete session data)
-        if instance.status == 'completed':
-            try:
-                flow_score = instance.calculate_flow_score()
-                print(f"Calculated flow score for session {instance.id}: {flow_score}")
-            except Exception as e:
-                print(f"Failed to calculate flow score for session {instance.id}: {str(e)}")
-                # Don't fail the session completion if flow score calculation fails
-        
-        return instance
-
-        ...
-    
-
-
-
 class CategoryBlockSerializer(serializers.ModelSerializer):
     category = serializers.PrimaryKeyRelatedField(queryset=Categories.objects.all())
     study_session = serializers.PrimaryKeyRelatedField(queryset=StudySession.objects.all())
     class Meta:
         model = CategoryBlock
         fields = '__all__'
+        extra_kwargs = {'client_uuid': {'required': False}}
+        # Repeated client_uuids are retries, answered by the view with the existing block
+        validators = []
+
+    def validate_client_uuid(self, value):
+        return validate_unchanged_client_uuid(self.instance, value)
 
     def validate(self, data):
         user = self.context['request'].user
@@ -152,6 +144,42 @@ class CategoryBlockSerializer(serializers.ModelSerializer):
         
 
 
+# Offline sync: complete sessions recorded without a connection, uploaded in batches
+class SyncBreakSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("Start time must be before end time")
+        return data
+
+
+class SyncCategoryBlockSerializer(SyncBreakSerializer):
+    category = serializers.IntegerField()
+    client_uuid = serializers.UUIDField(required=False, allow_null=True)
+
+
+class SyncSessionSerializer(serializers.Serializer):
+    start_time = serializers.DateTimeField()
+    end_time = serializers.DateTimeField()
+    status = serializers.ChoiceField(choices=['completed', 'cancelled', 'interrupted'], default='completed')
+    focus_rating = serializers.CharField(max_length=50, required=False, allow_null=True)
+    client_uuid = serializers.UUIDField(required=False, allow_null=True)
+    category_blocks = SyncCategoryBlockSerializer(many=True, default=list)
+    breaks = SyncBreakSerializer(many=True, default=list)
+
+    def validate(self, data):
+        start_time = data['start_time']
+        end_time = data['end_time']
+        if start_time >= end_time:
+            raise serializers.ValidationError("Start time must be before end time")
+        for record in [*data['category_blocks'], *data['breaks']]:
+            if record['start_time'] < start_time or record['end_time'] > end_time:
+                raise serializers.ValidationError("Category blocks and breaks must lie within the session")
+        return data
+
+
 class DailyGoalSerializer(serializers.ModelSerializer):
     class Meta:
         model = DailyGoal
@@ -0,0 +1,263 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, Min, Q, Value, When
+from django.utils import timezone
+
+from ..models import AggregateJob, CustomUser
+from .date_utils import get_session_local_date
+from .split_aggregate_service import SplitAggregateUpdateService
+from .insights_cache import InsightsCache
+
+logger = logging.getLogger(__name__)
+
+
+def deferred_updates_enabled():
+    """True when aggregate recomputes go through the job queue instead of running inline"""
+    return getattr(settings, 'AGGREGATE_UPDATES_DEFERRED', False)
+
+
+def stale_while_revalidate_enabled():
+    """True when reads serve dirty aggregates as-is and refresh them in a background thread"""
+    return getattr(settings, 'AGGREGATE_STALE_WHILE_REVALIDATE', False)
+
+
+def _refresh_in_background(user_id, start_date, end_date):
+    try:
+        user = CustomUser.objects.get(pk=user_id)
+        AggregateJobQueue.refresh_range(user, start_date, end_date)
+    except Exception as e:
+        logger.warning("Background aggregate refresh for user %s failed: %s", user_id, e)
+    finally:
+        # Threads get their own connection; don't leak it
+        connection.close()
+
+
+class AggregateJobQueue:
+    """
+    Database-backed queue of aggregate recomputes, coalesced per (user, local date).
+    A queued job marks that day's aggregates dirty. Jobs are drained by the
+    run_aggregate_worker management command, or on first read by the insights views.
+    """
+
+    @staticmethod
+    def enqueue(user, date):
+        """
+        Request a recompute of the user's aggregates for a local date.
+        Coalesces with any job already queued for the same (user, date).
+        """
+        now = timezone.now()
+        # Cached insights must not outlive the data they were built from
+        InsightsCache.bump(user.id)
+        job, created = AggregateJob.objects.get_or_create(
+            user=user,
+            date=date,
+            defaults={'requested_at': now, 'run_after': now},
+        )
+        if not created:
+            AggregateJobQueue._requeue(AggregateJob.objects.filter(pk=job.pk), now)
+        return job
+
+    @staticmethod
+    def enqueue_days(days):
+        """
+        enqueue() for many (user_id, date) pairs at once: one insert for the new jobs and
+        one update for those already queued, whatever the number of days.
+        """
+        days = set(days)
+        if not days:
+            return
+        now = timezone.now()
+        InsightsCache.bump_many({user_id for user_id, _ in days})
+        AggregateJob.objects.bulk_create(
+            [AggregateJob(user_id=user_id, date=date, requested_at=now, run_after=now) for user_id, date in days],
+            ignore_conflicts=True,
+        )
+        matching = Q()
+        for user_id, date in days:
+            matching |= Q(user_id=user_id, date=date)
+        AggregateJobQueue._requeue(AggregateJob.objects.filter(matching), now)
+
+    @staticmethod
+    def _requeue(jobs, now):
+        # Bump the request time so a running job knows to run again;
+        # revive failed jobs with a fresh retry budget
+        failed = Q(status='failed')
+        jobs.update(
+            requested_at=now,
+            status=Case(When(failed, then=Value('pending')), default=F('status')),
+            attempts=Case(When(failed, then=Value(0)), default=F('attempts')),
+            run_after=Case(When(failed, then=Value(now)), default=F('run_after')),
+        )
+
+    @staticmethod
+    def enqueue_for_session(session):
+        """Enqueue a recompute for the local date a session belongs to"""
+        return AggregateJobQueue.enqueue(session.user, get_session_local_date(session))
+
+    @staticmethod
+    def request_update(session):
+        """
+        Refresh aggregates after a session changed: queued when deferred updates
+        are enabled, otherwise recomputed immediately.
+        """
+        if deferred_updates_enabled():
+            AggregateJobQueue.enqueue_for_session(session)
+            return
+
+        try:
+            SplitAggregateUpdateService.update_for_date(session.user, get_session_local_date(session))
+        except Exception as e:
+            # Leave the day marked dirty so the next read recomputes it
+            logger.warning("Failed to update aggregates for session %s: %s", session.id, e)
+            AggregateJobQueue.enqueue_for_session(session)
+
+    @staticmethod
+    def claim(batch_size=50):
+        """
+        Claim up to batch_size due jobs for this worker.
+        Jobs left 'running' by a crashed worker are reclaimed after AGGREGATE_JOB_STALE_SECONDS.
+        """
+        now = timezone.now()
+        return AggregateJobQueue._claim(
+            AggregateJob.objects.filter(
+                Q(status='pending', run_after__lte=now) |
+                Q(status='running', started_at__lt=AggregateJobQueue._stale_before(now))
+            ),
+            now,
+            batch_size,
+        )
+
+    @staticmethod
+    def _stale_before(now):
+        return now - timedelta(seconds=getattr(settings, 'AGGREGATE_JOB_STALE_SECONDS', 600))
+
+    @staticmethod
+    def _claim(jobs, now, limit=None):
+        with transaction.atomic():
+            job_ids = jobs.select_for_update(skip_locked=True).order_by('run_after').values_list('id', flat=True)
+            job_ids = list(job_ids[:limit] if limit else job_ids)
+            AggregateJob.objects.filter(id__in=job_ids).update(
+                status='running',
+                started_at=now,
+                attempts=F('attempts') + 1,
+            )
+
+        return list(AggregateJob.objects.filter(id__in=job_ids).select_related('user').order_by('run_after'))
+
+    @staticmethod
+    def is_dirty(user, start_date, end_date):
+        """True while any day in the range has a recompute outstanding"""
+        return AggregateJob.objects.filter(user=user, date__gte=start_date, date__lte=end_date).exists()
+
+    @staticmethod
+    async def ais_dirty(user, start_date, end_date):
+        return await AggregateJob.objects.filter(user=user, date__gte=start_date, date__lte=end_date).aexists()
+
+    @staticmethod
+    def refresh_range(user, start_date, end_date):
+        """
+        Recompute the user's dirty days in a range right now, ignoring retry backoff.
+        Jobs another worker is actively running are left to it.
+        """
+        now = timezone.now()
+        jobs = AggregateJobQueue._claim(
+            AggregateJob.objects.filter(user=user, date__gte=start_date, date__lte=end_date).filter(
+                Q(status='pending') |
+                Q(status='running', started_at__lt=AggregateJobQueue._stale_before(now))
+            ),
+            now,
+        )
+        for job in jobs:
+            AggregateJobQueue.run_job(job)
+        return len(jobs)
+
+    @staticmethod
+    def ensure_fresh(user, start_date, end_date):
+        """
+        Read-through refresh for the insights views: recompute dirty days in the range
+        before it is served. With AGGREGATE_STALE_WHILE_REVALIDATE the refresh runs in a
+        background thread and the current rows are served as they are.
+        Returns True when what is about to be served may be out of date.
+        """
+        if not AggregateJobQueue.is_dirty(user, start_date, end_date):
+            return False
+
+        if stale_while_revalidate_enabled():
+            threading.Thread(
+                target=_refresh_in_background,
+                args=(user.id, start_date, end_date),
+                daemon=True,
+            ).start()
+            return True
+
+        AggregateJobQueue.refresh_range(user, start_date, end_date)
+        return AggregateJobQueue.is_dirty(user, start_date, end_date)
+
+    @staticmethod
+    def run_job(job):
+        """
+        Recompute the aggregates for a claimed job.
+        Returns True on success; failures are rescheduled with exponential backoff.
+        """
+        try:
+            SplitAggregateUpdateService.update_for_date(job.user, job.date)
+        except Exception as e:
+            logger.warning("Aggregate job %s for %s on %s failed: %s", job.id, job.user.username, job.date, e)
+            AggregateJobQueue._reschedule(job, str(e))
+            return False
+
+        # Done, unless another change was enqueued while we were running
+        deleted, _ = AggregateJob.objects.filter(pk=job.pk, requested_at__lte=job.started_at).delete()
+        if not deleted:
+            AggregateJob.objects.filter(pk=job.pk).update(
+                status='pending',
+                attempts=0,
+                run_after=timezone.now(),
+                last_error='',
+            )
+        return True
+
+    @staticmethod
+    def _reschedule(job, error):
+        max_attempts = getattr(settings, 'AGGREGATE_JOB_MAX_ATTEMPTS', 5)
+        backoff = getattr(settings, 'AGGREGATE_JOB_RETRY_BACKOFF_SECONDS', 30)
+
+        if job.attempts >= max_attempts:
+            AggregateJob.objects.filter(pk=job.pk).update(status='failed', last_error=error)
+            return
+
+        AggregateJob.objects.filter(pk=job.pk).update(
+            status='pending',
+            run_after=timezone.now() + timedelta(seconds=backoff * 2 ** (job.attempts - 1)),
+            last_error=error,
+        )
+
+    @staticmethod
+    def run_pending(batch_size=50):
+        """Claim and run one batch of due jobs. Returns (succeeded, failed) counts."""
+        succeeded = failed = 0
+        for job in AggregateJobQueue.claim(batch_size):
+            if AggregateJobQueue.run_job(job):
+                succeeded += 1
+            else:
+                failed += 1
+        return succeeded, failed
+
+    @staticmethod
+    def backlog_stats():
+        """
+        Queue depth and lag for monitoring.
+        lag_seconds is how long the oldest outstanding request has been waiting.
+        """
+        outstanding = AggregateJob.objects.exclude(status='failed')
+        oldest = outstanding.aggregate(oldest=Min('requested_at'))['oldest']
+        return {
+            'pending': AggregateJob.objects.filter(status='pending').count(),
+            'running': AggregateJob.objects.filter(status='running').count(),
+            'failed': AggregateJob.objects.filter(status='failed').count(),
+            'lag_seconds': (timezone.now() - oldest).total_seconds() if oldest else 0,
+        }
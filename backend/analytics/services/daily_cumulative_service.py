@@ -0,0 +1,101 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+
+from ..models import CustomUser, DailyAggregate, DailyCumulative
+
+logger = logging.getLogger(__name__)
+
+
+# DailyAggregate fields kept as running totals
+CUMULATIVE_FIELDS = ['total_duration', 'session_count', 'break_count', 'flow_weighted_sum', 'flow_weighted_duration']
+
+
+class DailyCumulativeService:
+    """Keeps DailyCumulative in step with DailyAggregate changes and answers range totals from it."""
+
+    @staticmethod
+    def rebuild(user):
+        """Recompute all of the user's running totals from their daily aggregates"""
+        running = dict.fromkeys(CUMULATIVE_FIELDS, 0)
+        rows = []
+        for daily in DailyAggregate.objects.filter(user=user).order_by('date').values('date', *CUMULATIVE_FIELDS):
+            for field in CUMULATIVE_FIELDS:
+                # Rows written before the running sums existed count as 0
+                running[field] += daily[field] or 0
+            rows.append(DailyCumulative(user=user, date=daily['date'], **running))
+
+        with transaction.atomic():
+            DailyCumulative.objects.filter(user=user).delete()
+            DailyCumulative.objects.bulk_create(rows, batch_size=1000)
+        logger.debug("Rebuilt %s cumulative rows for %s", len(rows), user.username)
+
+    @staticmethod
+    def apply_daily_delta(user, delta):
+        """
+        Add one daily aggregate change (see SplitAggregateUpdateService._build_daily_delta)
+        to the running totals of its day and every later day.
+        """
+        date = delta['date']
+        if any(delta[field] is None for field in CUMULATIVE_FIELDS):
+            # The day's previous row predates the running sums, so its old share is unknown
+            DailyCumulativeService.rebuild(user)
+            return
+
+        with transaction.atomic():
+            # Serialize a user's cumulative writes: inserting a day reads the total before it
+            list(CustomUser.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+
+            if not DailyCumulative.objects.filter(user=user, date=date).exists():
+                if (
+                    not DailyCumulative.objects.filter(user=user).exists()
+                    and DailyAggregate.objects.filter(user=user).exclude(date=date).exists()
+                ):
+                    # Never built for this user; the rebuild already includes this change
+                    DailyCumulativeService.rebuild(user)
+                    return
+                DailyCumulative.objects.create(
+                    user=user, date=date, **DailyCumulativeService._totals_before(user, date)
+                )
+
+            if any(delta[field] for field in CUMULATIVE_FIELDS):
+                DailyCumulative.objects.filter(user=user, date__gte=date).update(
+                    **{field: F(field) + delta[field] for field in CUMULATIVE_FIELDS}
+                )
+
+    @staticmethod
+    def _totals_before(user, date):
+        """Running totals through the day before date (zeros before the user's first day)"""
+        return DailyCumulativeService._totals_through(user, date - timedelta(days=1))
+
+    @staticmethod
+    def _totals_through(user, date):
+        row = DailyCumulative.objects.filter(user=user, date__lte=date).order_by('-date').values(*CUMULATIVE_FIELDS).first()
+        return row or dict.fromkeys(CUMULATIVE_FIELDS, 0)
+
+    @staticmethod
+    def get_range_totals(user, start_date, end_date):
+        """
+        Totals of the user's daily aggregates between two local dates (inclusive),
+        from two indexed lookups.
+
+        Returns:
+            dict: total_duration, session_count, break_count, flow_weighted_sum,
+            flow_weighted_duration and the duration-weighted flow_score
+        """
+        through_end = DailyCumulativeService._totals_through(user, end_date)
+        before_start = DailyCumulativeService._totals_before(user, start_date)
+
+        if not through_end['session_count'] and not DailyCumulative.objects.filter(user=user).exists():
+            if DailyAggregate.objects.filter(user=user).exists():
+                # First read since the table was added (or since rebuild_aggregates dropped it)
+                DailyCumulativeService.rebuild(user)
+                return DailyCumulativeService.get_range_totals(user, start_date, end_date)
+
+        totals = {field: through_end[field] - before_start[field] for field in CUMULATIVE_FIELDS}
+        totals['flow_score'] = None
+        if totals['flow_weighted_duration'] > 0:
+            totals['flow_score'] = totals['flow_weighted_sum'] / totals['flow_weighted_duration']
+        return totals
@@ -1,5 +1,83 @@
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta
 from django.utils import timezone
+import pytz
+
+
+def get_user_timezone(user):
+    """
+    Returns the pytz timezone for a user's timezone setting, falling back to UTC
+    Args:
+        user: CustomUser instance
+    Returns:
+        pytz timezone
+    """
+    user_timezone_str = getattr(user, 'timezone', 'UTC')
+    try:
+        return pytz.timezone(user_timezone_str)
+    except pytz.exceptions.UnknownTimeZoneError:
+        print(f"⚠️ Invalid timezone '{user_timezone_str}' for user {user.username}, falling back to UTC")
+        return pytz.UTC
+
+
+def get_timezone_today(timezone_name):
+    """
+    Returns the current date in a named timezone, falling back to UTC
+    Args:
+        timezone_name: e.g. 'America/New_York'
+    Returns:
+        date: today's local date
+    """
+    try:
+        tz = pytz.timezone(timezone_name or 'UTC')
+    except pytz.exceptions.UnknownTimeZoneError:
+        tz = pytz.UTC
+    return timezone.now().astimezone(tz).date()
+
+
+def get_user_today(user):
+    """
+    Returns the current date in the user's timezone
+    Args:
+        user: CustomUser instance
+    Returns:
+        date: today's local date for the user
+    """
+    return get_local_date(user, timezone.now())
+
+
+def get_local_date(user, moment):
+    """
+    Returns the date of an aware datetime in the user's timezone
+    Args:
+        user: CustomUser instance
+        moment: aware datetime (e.g. a session start_time)
+    Returns:
+        date: the user's local calendar date
+    """
+    return moment.astimezone(get_user_timezone(user)).date()
+
+
+def get_local_day_start(user, target_date):
+    """
+    Returns local midnight of a date in the user's timezone
+    Args:
+        user: CustomUser instance
+        target_date: date object
+    Returns:
+        datetime: aware datetime at the start of the user's local day
+    """
+    return get_user_timezone(user).localize(datetime.combine(target_date, time.min))
+
+
+def get_session_local_date(session):
+    """
+    Returns the local date a session belongs to, preferring the stored value
+    Args:
+        session: StudySession instance
+    Returns:
+        date: the session's start date in the user's timezone
+    """
+    return session.local_date or get_local_date(session.user, session.start_time)
 
 
 def get_week_boundaries(target_date):
@@ -72,4 +150,24 @@ def is_current_period(target_date, timeframe):
         target_month_start, _ = get_month_boundaries(target_date)
         return current_month_start == target_month_start
     
-    return False 
\ No newline at end of file
+    return False
+
+
+def has_period_ended(target_date, timeframe, today):
+    """
+    Check if the period containing the given date is over
+    Args:
+        target_date: date object
+        timeframe: 'daily', 'weekly', or 'monthly'
+        today: the current date in the user's timezone
+    Returns:
+        bool: True once the whole period lies before today
+    """
+    if timeframe == 'daily':
+        return target_date < today
+    elif timeframe == 'weekly':
+        return get_week_boundaries(target_date)[1] < today
+    elif timeframe == 'monthly':
+        return get_month_boundaries(target_date)[1] < today
+
+    return False
@@ -0,0 +1,163 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import CategoryBlock, CustomUser, StudySession
+from .aggregate_job_queue import AggregateJobQueue
+from .date_utils import get_local_date, get_session_local_date
+from .live_session_service import LiveSessionService
+
+logger = logging.getLogger(__name__)
+
+# Sessions still open this long after starting are treated as crashed at app launch
+HANGING_AFTER = timedelta(hours=1)
+# The periodic sweep can't tell a long session without heartbeats from a crashed one,
+# so it leaves those open much longer
+ABANDONED_AFTER = timedelta(hours=12)
+# Length given to a crashed session that never recorded an end time
+AUTO_END_DURATION = timedelta(hours=1)
+
+
+def open_sessions():
+    """Sessions never ended, or ended without leaving the active status"""
+    return StudySession.objects.filter(Q(end_time__isnull=True) | Q(status='active'))
+
+
+def earliest_open_start():
+    """Subquery for a CustomUser row: the start of its earliest open session, or null"""
+    return Subquery(open_sessions().filter(user=OuterRef('pk')).order_by('start_time').values('start_time')[:1])
+
+
+class HangingSessionService:
+    """
+    Closes sessions the app never ended (crashes, killed processes) and category blocks
+    left open in completed sessions.
+
+    Each user carries open_session_since, the start of their earliest open session, so
+    the launch-time check costs nothing when there is nothing to clean; the periodic
+    sweep_hanging_sessions command cleans every user with a few set-based statements.
+    """
+
+    @staticmethod
+    def mark_opened(session):
+        """Record a newly started session in its user's marker (one UPDATE)"""
+        CustomUser.objects.filter(
+            Q(open_session_since__isnull=True) | Q(open_session_since__gt=session.start_time),
+            pk=session.user_id,
+        ).update(open_session_since=session.start_time)
+
+        # Keep a loaded user in step, so a check later in the same request sees it
+        if StudySession.user.is_cached(session):
+            user = session.user
+            if user.open_session_since is None or user.open_session_since > session.start_time:
+                user.open_session_since = session.start_time
+
+    @staticmethod
+    def mark_closed(session):
+        """
+        Move the marker past a session that just ended. Only the user's earliest open
+        session moves it, so ending any other costs no query. The session's user should
+        be loaded.
+        """
+        marker = session.user.open_session_since
+        if marker is None or marker < session.start_time:
+            return
+        CustomUser.objects.filter(pk=session.user_id).update(open_session_since=earliest_open_start())
+
+    @staticmethod
+    def has_hanging_session(user, now=None):
+        """True when the user's marker says a session has been open too long; no query"""
+        marker = user.open_session_since
+        return marker is not None and marker < (now or timezone.now()) - HANGING_AFTER
+
+    @staticmethod
+    def cleanup_user(user):
+        """
+        Launch-time cleanup for one user: a marker check, and a sweep of the user's
+        sessions only when the marker shows one hanging. Returns (sessions, blocks) closed.
+        """
+        if not HangingSessionService.has_hanging_session(user):
+            return 0, 0
+
+        LiveSessionService.close_expired(user_ids=[user.id])
+        cleaned = HangingSessionService.sweep(user_ids=[user.id])
+        user.open_session_since = CustomUser.objects.filter(pk=user.pk).values_list('open_session_since', flat=True).first()
+        return cleaned
+
+    @staticmethod
+    def sweep(user_ids=None, now=None, hanging_after=HANGING_AFTER):
+        """
+        Close sessions open longer than hanging_after and orphaned category blocks for
+        all users (or only user_ids), then queue an aggregate refresh for every day touched.
+
+        Sessions with a recent persisted heartbeat are alive and left alone; ones whose
+        heartbeats stopped are best closed first by LiveSessionService.close_expired.
+        Hanging sessions get end_time = start + AUTO_END_DURATION when they have none and
+        active ones become cancelled; open blocks in them, and blocks left open in completed
+        sessions, end with their session. Returns (sessions, orphaned blocks) closed.
+        """
+        now = now or timezone.now()
+        cutoff = now - hanging_after
+        hanging = open_sessions().filter(start_time__lt=cutoff).exclude(
+            last_heartbeat_at__gte=now - LiveSessionService.heartbeat_timeout()
+        )
+        orphaned = Q(start_time__lt=now - HANGING_AFTER, study_session__status='completed')
+        markers = CustomUser.objects.filter(open_session_since__lt=cutoff)
+        if user_ids is not None:
+            hanging = hanging.filter(user_id__in=user_ids)
+            orphaned &= Q(study_session__user_id__in=user_ids)
+            markers = markers.filter(pk__in=user_ids)
+
+        with transaction.atomic():
+            sessions = list(
+                hanging.select_related('user').only('start_time', 'local_date', 'user__username', 'user__timezone')
+            )
+            session_ids = [session.id for session in sessions]
+
+            # Local dates for sessions that never reached save() with an end time, worked
+            # out by date_utils like everywhere else so the sweep refreshes the same days
+            undated = [session for session in sessions if session.local_date is None]
+            for session in undated:
+                session.local_date = get_local_date(session.user, session.start_time)
+            StudySession.objects.bulk_update(undated, ['local_date'], batch_size=500)
+            days = {(session.user_id, session.local_date) for session in sessions}
+
+            # Re-check the hanging condition so sessions ended meanwhile are left alone
+            closed = hanging.filter(id__in=session_ids).update(
+                end_time=Coalesce('end_time', F('start_time') + AUTO_END_DURATION),
+                total_duration=Case(
+                    When(end_time__isnull=True, then=Value(round(AUTO_END_DURATION.total_seconds()))),
+                    default=F('total_duration'),
+                ),
+                status=Case(When(status='active', then=Value('cancelled')), default=F('status')),
+            )
+
+            # Block durations depend on each block's own start, so these go out as
+            # one bulk UPDATE rather than an expression
+            blocks = list(
+                CategoryBlock.objects.filter(end_time__isnull=True)
+                .filter(Q(study_session_id__in=session_ids) | orphaned)
+                .select_related('study_session')
+            )
+            for block in blocks:
+                session = block.study_session
+                block.end_time = max(session.end_time or block.start_time + AUTO_END_DURATION, block.start_time)
+                block.duration = round((block.end_time - block.start_time).total_seconds())
+            CategoryBlock.objects.bulk_update(blocks, ['end_time', 'duration'], batch_size=500)
+
+            swept = set(session_ids)
+            orphaned_blocks = [block for block in blocks if block.study_session_id not in swept]
+            days |= {(block.study_session.user_id, get_session_local_date(block.study_session)) for block in orphaned_blocks}
+
+            markers.update(open_session_since=earliest_open_start())
+            AggregateJobQueue.enqueue_days(days)
+
+        for session_id in session_ids:
+            logger.info("Cleaned hanging session %s", session_id)
+        for block in orphaned_blocks:
+            logger.info("Cleaned orphaned category block %s in session %s", block.id, block.study_session_id)
+        return closed, len(orphaned_blocks)
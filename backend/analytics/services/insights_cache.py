@@ -0,0 +1,72 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from ..models import CustomUser
+
+
+class InsightsCache:
+    """
+    Per-user cache of insights response payloads.
+
+    Keys embed a per-user data version, so invalidation is a single write that
+    bumps the version: entries for older versions are never read again and
+    simply expire. The version lives on the user row (CustomUser.insights_version)
+    rather than in the cache, so a bump from any process - another web worker, the
+    aggregate worker, a management command - is seen by every reader, and a bump
+    made inside a write's transaction becomes visible exactly when the write does.
+    Versions are nanosecond timestamps of the user's last write.
+    """
+
+    @staticmethod
+    def _versions(user_id):
+        return CustomUser.objects.filter(pk=user_id).values_list('insights_version', flat=True)
+
+    @staticmethod
+    def get_version(user_id):
+        return InsightsCache._versions(user_id).first()
+
+    @staticmethod
+    async def aget_version(user_id):
+        return await InsightsCache._versions(user_id).afirst()
+
+    @staticmethod
+    def _next_version():
+        # Strictly increasing even if clocks on different hosts disagree
+        return Greatest(F('insights_version') + 1, Value(time.time_ns()))
+
+    @staticmethod
+    def bump(user_id):
+        """Invalidate every cached insights payload for the user"""
+        CustomUser.objects.filter(pk=user_id).update(insights_version=InsightsCache._next_version())
+
+    @staticmethod
+    def bump_many(user_ids):
+        CustomUser.objects.filter(pk__in=list(user_ids)).update(insights_version=InsightsCache._next_version())
+
+    @staticmethod
+    def key(user, endpoint, *period, version=None):
+        """Cache key for one endpoint/period of a user's insights at their current data version"""
+        if version is None:
+            version = InsightsCache.get_version(user.id)
+        period_key = ':'.join(str(part) for part in period)
+        return f"insights:{user.id}:{version}:{endpoint}:{period_key}"
+
+    @staticmethod
+    def get(key):
+        return cache.get(key)
+
+    @staticmethod
+    def set(key, response_data):
+        cache.set(key, response_data, getattr(settings, 'INSIGHTS_CACHE_TIMEOUT', 60 * 60 * 24))
+
+    @staticmethod
+    async def aget(key):
+        return await cache.aget(key)
+
+    @staticmethod
+    async def aset(key, response_data):
+        await cache.aset(key, response_data, getattr(settings, 'INSIGHTS_CACHE_TIMEOUT', 60 * 60 * 24))
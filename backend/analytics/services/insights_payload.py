@@ -0,0 +1,200 @@
+import json
+from datetime import datetime, timedelta
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from .date_utils import get_month_boundaries
+
+
+def wants(fields, name):
+    """Whether a payload section is selected (fields=None selects everything)"""
+    return fields is None or name in fields
+
+
+def daily_aggregate_payload(daily_aggregate, fields=None):
+    """Response fields for one precomputed DailyAggregate"""
+    payload = {}
+    if wants(fields, 'aggregate'):
+        payload['aggregate'] = {
+            'total_duration': daily_aggregate.total_duration,
+            'category_durations': daily_aggregate.category_durations,
+            'session_count': daily_aggregate.session_count,
+            'break_count': daily_aggregate.break_count,
+            'is_final': daily_aggregate.is_final,
+            'productivity_score': daily_aggregate.productivity_score,
+            'productivity_sessions_count': daily_aggregate.productivity_sessions_count,
+            'flow_score': daily_aggregate.flow_score,
+            'flow_score_details': daily_aggregate.flow_score_details,
+            'flow_coaching_message': daily_aggregate.flow_coaching_message
+        }
+    if wants(fields, 'timeline_data'):
+        payload['timeline_data'] = daily_aggregate.timeline_data  # Precomputed!
+    return payload
+
+
+def weekly_aggregate_payload(weekly_aggregate, fields=None):
+    """Response fields for one precomputed WeeklyAggregate"""
+    payload = {}
+    if wants(fields, 'aggregate'):
+        payload['aggregate'] = {
+            'total_duration': weekly_aggregate.total_duration,
+            'category_durations': weekly_aggregate.category_durations,
+            'session_count': weekly_aggregate.session_count,
+            'break_count': weekly_aggregate.break_count,
+            'is_final': weekly_aggregate.is_final,
+            'flow_score': weekly_aggregate.flow_score,
+            'flow_score_details': weekly_aggregate.flow_score_details,
+            'flow_coaching_message': weekly_aggregate.flow_coaching_message
+        }
+    if wants(fields, 'daily_breakdown'):
+        payload['daily_breakdown'] = weekly_aggregate.daily_breakdown  # Precomputed!
+    if wants(fields, 'session_times'):
+        payload['session_times'] = weekly_aggregate.session_times     # Precomputed!
+    return payload
+
+
+def monthly_aggregate_payload(monthly_aggregate, fields=None):
+    """Response fields for one precomputed MonthlyAggregate"""
+    payload = {}
+    if wants(fields, 'statistics'):
+        total_hours = monthly_aggregate.total_duration / 3600 if monthly_aggregate.total_duration else 0
+        payload['statistics'] = {
+            'total_hours': total_hours,
+            'total_sessions': monthly_aggregate.session_count
+        }
+    if wants(fields, 'monthly_aggregate'):
+        payload['monthly_aggregate'] = {
+            'total_duration': monthly_aggregate.total_duration,
+            'category_durations': monthly_aggregate.category_durations,
+            'session_count': monthly_aggregate.session_count,
+            'break_count': monthly_aggregate.break_count,
+            'is_final': monthly_aggregate.is_final,
+            'flow_score': monthly_aggregate.flow_score,
+            'flow_score_details': monthly_aggregate.flow_score_details,
+            'flow_coaching_message': monthly_aggregate.flow_coaching_message
+        }
+    if wants(fields, 'daily_breakdown'):
+        payload['daily_breakdown'] = monthly_aggregate.daily_breakdown  # Precomputed!
+    if wants(fields, 'heatmap_data'):
+        payload['heatmap_data'] = monthly_aggregate.heatmap_data       # Precomputed!
+    return payload
+
+
+def compact_category_metadata(category_metadata):
+    """v2 category list, ordered by id; v2 columns refer to categories by list index"""
+    return [
+        {'id': category_id, **metadata}
+        for category_id, metadata in sorted(category_metadata.items())
+    ]
+
+
+def _offset(value, origin):
+    """Whole seconds from origin (epoch seconds) to an ISO-8601 timestamp"""
+    if value is None:
+        return None
+    return round(datetime.fromisoformat(value).timestamp() - origin)
+
+
+def compact_timeline(timeline_data, day_start, categories):
+    """
+    v2 timeline: one array per attribute instead of one object per session, block
+    and break. Times are second offsets from day_start (local midnight), blocks and
+    breaks point at their session's row, and categories are indices into the v2
+    category list (-1 for a category that no longer exists).
+    """
+    origin = day_start.timestamp()
+    index_by_id = {category['id']: index for index, category in enumerate(categories)}
+    index_by_name = {}
+    for index, category in enumerate(categories):
+        index_by_name.setdefault(category['name'], index)
+
+    sessions = {'id': [], 'start': [], 'end': [], 'duration': []}
+    blocks = {'session': [], 'category': [], 'start': [], 'end': [], 'duration': []}
+    breaks = {'session': [], 'start': [], 'end': [], 'duration': []}
+    for row, entry in enumerate(timeline_data):
+        sessions['id'].append(entry['session_id'])
+        sessions['start'].append(_offset(entry['start_time'], origin))
+        sessions['end'].append(_offset(entry['end_time'], origin))
+        sessions['duration'].append(entry['total_duration'])
+        for block in entry['category_blocks']:
+            # Timelines written before category ids were stored only carry the name
+            if 'category_id' in block:
+                category_index = index_by_id.get(block['category_id'], -1)
+            else:
+                category_index = index_by_name.get(block['category'], -1)
+            blocks['session'].append(row)
+            blocks['category'].append(category_index)
+            blocks['start'].append(_offset(block['start_time'], origin))
+            blocks['end'].append(_offset(block['end_time'], origin))
+            blocks['duration'].append(block['duration'])
+        for session_break in entry['breaks']:
+            breaks['session'].append(row)
+            breaks['start'].append(_offset(session_break['start_time'], origin))
+            breaks['end'].append(_offset(session_break['end_time'], origin))
+            breaks['duration'].append(session_break['duration'])
+
+    return {'day_start': round(origin), 'sessions': sessions, 'blocks': blocks, 'breaks': breaks}
+
+
+def compact_session_times(session_times, period_start):
+    """v2 session times: start/end offsets in seconds from period_start (local midnight)"""
+    origin = period_start.timestamp()
+    return {
+        'period_start': round(origin),
+        'start': [_offset(times['start_time'], origin) for times in session_times],
+        'end': [_offset(times['end_time'], origin) for times in session_times],
+        'duration': [times['total_duration'] for times in session_times],
+    }
+
+
+def compact_heatmap(heatmap_data, month_start):
+    """v2 heatmap: hours for every day of the month, in order, anchored at month_start"""
+    days = (get_month_boundaries(month_start)[1] - month_start).days + 1
+    return {
+        'month_start': month_start.isoformat(),
+        'hours': [heatmap_data.get((month_start + timedelta(days=day)).isoformat(), 0) for day in range(days)],
+    }
+
+
+def compact_payload(payload, categories, period_origin, period_start):
+    """v2 form of the payload sections that have one"""
+    compact = dict(payload)
+    if 'timeline_data' in compact:
+        compact['timeline_data'] = compact_timeline(compact['timeline_data'], period_origin, categories)
+    if 'session_times' in compact:
+        compact['session_times'] = compact_session_times(compact['session_times'], period_origin)
+    if 'heatmap_data' in compact:
+        compact['heatmap_data'] = compact_heatmap(compact['heatmap_data'], period_start)
+    return compact
+
+
+def render_json(data):
+    """Encode a payload exactly as the API's JSON renderer would (compact, UTF-8)"""
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def render_aggregate_payload(aggregate):
+    """Pre-rendered JSON of every payload section of a daily, weekly or monthly aggregate"""
+    from analytics.models import DailyAggregate, WeeklyAggregate
+
+    if isinstance(aggregate, DailyAggregate):
+        return render_json(daily_aggregate_payload(aggregate))
+    if isinstance(aggregate, WeeklyAggregate):
+        return render_json(weekly_aggregate_payload(aggregate))
+    return render_json(monthly_aggregate_payload(aggregate))
+
+
+def get_rendered_payload(model, **lookup):
+    """
+    The stored pre-rendered payload of one aggregate, or None when the aggregate does
+    not exist. Rows whose blob was cleared (e.g. by finalize_aggregates) are rendered
+    and stored again on first read.
+    """
+    row = model.objects.filter(**lookup).values_list('id', 'rendered_payload').first()
+    if row is None:
+        return None
+    aggregate_id, rendered_payload = row
+    if rendered_payload is None:
+        rendered_payload = render_aggregate_payload(model.objects.get(pk=aggregate_id))
+        model.objects.filter(pk=aggregate_id).update(rendered_payload=rendered_payload)
+    return bytes(rendered_payload)
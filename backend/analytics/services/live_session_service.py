@@ -0,0 +1,130 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import StudySession
+
+logger = logging.getLogger(__name__)
+
+
+class LiveSessionService:
+    """
+    State of running sessions (current block, last heartbeat, elapsed focus time) kept in
+    the cache, so most of a timer's periodic heartbeats cost no database writes.
+
+    The heartbeat time also goes to StudySession.last_heartbeat_at, at most once every
+    SESSION_HEARTBEAT_PERSIST_SECONDS per session. close_expired and the hanging-session
+    sweep run in another process and only trust that column, so they work with a
+    process-local cache too. A session whose heartbeats stop is taken to have crashed
+    and is completed at its last heartbeat by close_expired.
+    """
+
+    @staticmethod
+    def _key(session_id):
+        return f"live_session:{session_id}"
+
+    @staticmethod
+    def heartbeat_timeout():
+        return timedelta(seconds=getattr(settings, 'SESSION_HEARTBEAT_TIMEOUT_SECONDS', 120))
+
+    @staticmethod
+    def persist_interval():
+        return timedelta(seconds=getattr(settings, 'SESSION_HEARTBEAT_PERSIST_SECONDS', 30))
+
+    @staticmethod
+    def get_state(session_id):
+        return cache.get(LiveSessionService._key(session_id))
+
+    @staticmethod
+    def record_heartbeat(session_id, user_id, category_block_id=None, focus_seconds=None, now=None):
+        """
+        Store the latest state reported for a running session and return it, or None when
+        the session has ended meanwhile (found when the heartbeat is next persisted).
+        """
+        now = now or timezone.now()
+        previous = LiveSessionService.get_state(session_id)
+        persisted_at = previous and previous.get('persisted_at')
+        if persisted_at is None or now - persisted_at >= LiveSessionService.persist_interval():
+            if not StudySession.objects.filter(
+                pk=session_id, status='active', end_time__isnull=True
+            ).update(last_heartbeat_at=now):
+                LiveSessionService.clear(session_id)
+                return None
+            persisted_at = now
+
+        state = {
+            'session_id': session_id,
+            'user_id': user_id,
+            'category_block_id': category_block_id,
+            'focus_seconds': focus_seconds,
+            'last_heartbeat': now,
+            'persisted_at': persisted_at,
+        }
+        # Kept well past the heartbeat timeout so the background step still sees expired state
+        cache.set(LiveSessionService._key(session_id), state, getattr(settings, 'LIVE_SESSION_STATE_TIMEOUT', 60 * 60 * 24))
+        return state
+
+    @staticmethod
+    def clear(session_id):
+        """Drop a session's live state once it has ended"""
+        cache.delete(LiveSessionService._key(session_id))
+
+    @staticmethod
+    def is_expired(state, now=None):
+        return state['last_heartbeat'] < (now or timezone.now()) - LiveSessionService.heartbeat_timeout()
+
+    @staticmethod
+    def expired_sessions(now=None):
+        """Running sessions whose last persisted heartbeat is older than the timeout"""
+        return StudySession.objects.filter(
+            status='active',
+            end_time__isnull=True,
+            last_heartbeat_at__lt=(now or timezone.now()) - LiveSessionService.heartbeat_timeout(),
+        )
+
+    @staticmethod
+    def close_expired(now=None, user_ids=None):
+        """
+        Complete every running session (of all users, or only user_ids) whose heartbeats
+        have stopped, ending it at its last heartbeat. Sessions that never sent one are
+        left to the hanging-session sweep. Returns the number of sessions closed.
+        """
+        from .session_completion_service import SessionCompletionService
+
+        now = now or timezone.now()
+        expired = LiveSessionService.expired_sessions(now)
+        if user_ids is not None:
+            expired = expired.filter(user_id__in=user_ids)
+
+        closed = 0
+        for session_id in list(expired.values_list('id', flat=True)):
+            try:
+                with transaction.atomic():
+                    # Locked and re-checked, so a heartbeat persisted meanwhile keeps the session
+                    session = LiveSessionService.expired_sessions(now).select_for_update().select_related('user').filter(
+                        pk=session_id
+                    ).first()
+                    if session is None:
+                        continue
+                    # A shared cache may hold a later heartbeat than the persisted one
+                    state = LiveSessionService.get_state(session_id)
+                    last_heartbeat = session.last_heartbeat_at
+                    if state is not None:
+                        if not LiveSessionService.is_expired(state, now):
+                            continue
+                        last_heartbeat = max(last_heartbeat, state['last_heartbeat'])
+                    SessionCompletionService.complete(session, {
+                        'end_time': max(last_heartbeat, session.start_time),
+                        'status': 'completed',
+                    })
+            except Exception as e:
+                logger.warning("Failed to close session %s after its last heartbeat: %s", session_id, e)
+                continue
+            closed += 1
+            logger.info("Closed session %s at its last heartbeat %s", session_id, last_heartbeat)
+            LiveSessionService.clear(session_id)
+        return closed
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+# Aggregate columns compared between two periods
+COMPARED_METRICS = ('total_duration', 'session_count', 'break_count', 'flow_score')
+
+
+def same_date_last_year(target_date):
+    """The same calendar date a year earlier; Feb 29 maps to Feb 28"""
+    try:
+        return target_date.replace(year=target_date.year - 1)
+    except ValueError:
+        return target_date.replace(year=target_date.year - 1, day=28)
+
+
+def get_baseline_date(period_start, against):
+    """A date inside the period a comparison is made against"""
+    if against == 'last_year':
+        return same_date_last_year(period_start)
+    # The period just before this one
+    return period_start - timedelta(days=1)
+
+
+def metric_delta(current, baseline):
+    """Absolute and percentage change; the percentage is None without a baseline to divide by"""
+    if current is None or baseline is None:
+        return {'change': None, 'percent_change': None}
+    return {
+        'change': current - baseline,
+        'percent_change': round((current - baseline) / baseline * 100, 1) if baseline else None,
+    }
+
+
+def period_summary(aggregate):
+    return {metric: getattr(aggregate, metric) for metric in COMPARED_METRICS}
+
+
+def compare_aggregates(current, baseline):
+    """
+    Deltas between two aggregates of the same timeframe: the headline metrics and the
+    time spent per category (keyed by category name, as in category_durations),
+    largest changes first.
+    """
+    current_categories = current.category_durations or {}
+    baseline_categories = baseline.category_durations or {}
+    category_deltas = [
+        {
+            'category': name,
+            'current': current_categories.get(name, 0),
+            'baseline': baseline_categories.get(name, 0),
+            **metric_delta(current_categories.get(name, 0), baseline_categories.get(name, 0)),
+        }
+        for name in current_categories.keys() | baseline_categories.keys()
+    ]
+    category_deltas.sort(key=lambda row: (-abs(row['change']), row['category']))
+
+    return {
+        'deltas': {
+            metric: metric_delta(getattr(current, metric), getattr(baseline, metric))
+            for metric in COMPARED_METRICS
+        },
+        'category_deltas': category_deltas,
+    }
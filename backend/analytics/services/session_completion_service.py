@@ -0,0 +1,104 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from ..models import CategoryBlock
+from .aggregate_job_queue import AggregateJobQueue, deferred_updates_enabled
+from .goal_progress_service import GoalProgressService
+from .hanging_session_service import HangingSessionService
+from .insights_cache import InsightsCache
+from .split_aggregate_service import SplitAggregateUpdateService
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCompletionService:
+    """
+    Ends a study session in one transaction: open blocks closed with one UPDATE, the flow
+    score computed from blocks loaded once, the session written once (plus the user's
+    open-session marker when this was their earliest open session), then aggregates
+    and goal progress updated (or queued) before commit.
+    """
+
+    @staticmethod
+    def complete(session, validated_data):
+        """
+        Apply end_time, status (default completed), and an optional corrected start_time
+        and focus_rating from validated StudySessionSerializer data. The session's user
+        should already be loaded (select_related) so the write path doesn't fetch it again.
+        """
+        # A corrected start can move the session to another local day
+        previous_date = session.local_date
+        if 'start_time' in validated_data:
+            session.start_time = validated_data['start_time']
+        session.end_time = validated_data.get('end_time')
+        session.status = validated_data.get('status', 'completed')
+        if 'focus_rating' in validated_data:
+            session.focus_rating = validated_data.get('focus_rating')
+
+        with transaction.atomic():
+            # Blocks with their categories in one query, breaks in another; the aggregate
+            # delta reuses both instead of reloading the session
+            prefetch_related_objects(
+                [session],
+                Prefetch('categoryblock_set', queryset=CategoryBlock.objects.select_related('category').order_by('start_time')),
+                'break_set',
+            )
+            blocks = session.categoryblock_set.all()
+
+            # End any open category blocks when completing the session
+            open_blocks = [block for block in blocks if block.end_time is None]
+            for block in open_blocks:
+                block.end_time = session.end_time
+                if block.end_time:
+                    block.duration = round((block.end_time - block.start_time).total_seconds())
+            if open_blocks:
+                CategoryBlock.objects.bulk_update(open_blocks, ['end_time', 'duration'])
+
+            # Score before the only write of the session
+            if session.status == 'completed' and session.end_time:
+                session.total_duration = round((session.end_time - session.start_time).total_seconds())
+                try:
+                    session.set_flow_score(blocks)
+                    logger.debug("Calculated flow score for session %s: %s", session.id, session.flow_score)
+                except Exception as e:
+                    logger.warning("Failed to calculate flow score for session %s: %s", session.id, e)
+            session.save()
+            HangingSessionService.mark_closed(session)
+
+            SessionCompletionService._update_aggregates(session, previous_date)
+
+        return session
+
+    @staticmethod
+    def _update_aggregates(session, previous_date=None):
+        # The day the session was counted under before its start moved, if it moved
+        left_date = previous_date if previous_date not in (None, session.local_date) else None
+
+        if deferred_updates_enabled():
+            # Recompute in the background; goal progress is a cheap per-session increment
+            AggregateJobQueue.enqueue_for_session(session)
+            if left_date is not None:
+                AggregateJobQueue.enqueue(session.user, left_date)
+            try:
+                GoalProgressService.update_for_session(session)
+            except Exception as e:
+                logger.warning("Failed to update goal progress for session %s: %s", session.id, e)
+            return
+
+        try:
+            # Savepoint, so a failure leaves the session itself committed
+            with transaction.atomic():
+                SplitAggregateUpdateService.update_for_session(session)
+                if left_date is not None:
+                    SplitAggregateUpdateService.update_for_date(session.user, left_date)
+            # Same transaction as the writes, so readers switch to the new version at commit
+            InsightsCache.bump(session.user_id)
+            logger.debug("Updated aggregates for session %s", session.id)
+        except Exception as e:
+            logger.warning("Failed to update aggregates for session %s: %s", session.id, e)
+            # The session is saved; mark the days dirty so the next read recomputes them
+            AggregateJobQueue.enqueue_for_session(session)
+            if left_date is not None:
+                AggregateJobQueue.enqueue(session.user, left_date)
@@ -0,0 +1,126 @@
+import logging
+
+from django.db import transaction
+
+from ..models import Break, CategoryBlock, StudySession
+from .aggregate_job_queue import AggregateJobQueue, deferred_updates_enabled
+from .date_utils import get_local_date
+from .goal_progress_service import GoalProgressService
+from .insights_cache import InsightsCache
+from .split_aggregate_service import SplitAggregateUpdateService
+
+logger = logging.getLogger(__name__)
+
+
+def _duration(record):
+    return round((record['end_time'] - record['start_time']).total_seconds())
+
+
+class SessionSyncService:
+    """Writes batches of complete sessions recorded offline."""
+
+    @staticmethod
+    def split_uploaded(user, sessions_data):
+        """
+        Separate sessions an earlier attempt already stored (matched by client_uuid, one
+        query) from those still to write. Returns ({client_uuid: session}, new session data);
+        a client_uuid repeated within the batch is written once.
+        """
+        client_uuids = {data['client_uuid'] for data in sessions_data if data.get('client_uuid')}
+        uploaded = {
+            session.client_uuid: session
+            for session in StudySession.objects.filter(user=user, client_uuid__in=client_uuids)
+        }
+        new_sessions_data = []
+        seen = set(uploaded)
+        for data in sessions_data:
+            client_uuid = data.get('client_uuid')
+            if client_uuid and client_uuid in seen:
+                continue
+            if client_uuid:
+                seen.add(client_uuid)
+            new_sessions_data.append(data)
+        return uploaded, new_sessions_data
+
+    @staticmethod
+    def create_sessions(user, sessions_data, categories):
+        """
+        Insert validated sessions with their category blocks and breaks: one bulk insert
+        per table, in one transaction. categories maps every referenced category id to
+        the user's Categories row. Returns the saved sessions in input order.
+
+        bulk_create skips the models' save(), so durations, local dates and flow scores
+        are filled in here first.
+        """
+        sessions, blocks, breaks = [], [], []
+        for data in sessions_data:
+            session = StudySession(
+                user=user,
+                start_time=data['start_time'],
+                end_time=data['end_time'],
+                total_duration=_duration(data),
+                local_date=get_local_date(user, data['start_time']),
+                status=data['status'],
+                focus_rating=data.get('focus_rating'),
+                client_uuid=data.get('client_uuid'),
+            )
+            session_blocks = [
+                CategoryBlock(
+                    category=categories[block['category']],
+                    start_time=block['start_time'],
+                    end_time=block['end_time'],
+                    duration=_duration(block),
+                    client_uuid=block.get('client_uuid'),
+                )
+                for block in sorted(data['category_blocks'], key=lambda block: block['start_time'])
+            ]
+            session_breaks = [
+                Break(start_time=item['start_time'], end_time=item['end_time'], duration=_duration(item))
+                for item in data['breaks']
+            ]
+
+            if session.status == 'completed':
+                try:
+                    session.set_flow_score(session_blocks)
+                except Exception as e:
+                    logger.warning("Failed to calculate flow score for synced session starting %s: %s", session.start_time, e)
+
+            sessions.append(session)
+            blocks.append(session_blocks)
+            breaks.append(session_breaks)
+
+        with transaction.atomic():
+            StudySession.objects.bulk_create(sessions)
+            for session, session_blocks, session_breaks in zip(sessions, blocks, breaks):
+                for record in [*session_blocks, *session_breaks]:
+                    record.study_session = session
+            CategoryBlock.objects.bulk_create([block for session_blocks in blocks for block in session_blocks])
+            Break.objects.bulk_create([item for session_breaks in breaks for item in session_breaks])
+
+        return sessions
+
+    @staticmethod
+    def refresh_aggregates(user, sessions):
+        """
+        One aggregate recompute per local date that gained completed sessions (queued
+        when deferred updates are enabled), plus goal progress for each of them.
+        """
+        InsightsCache.bump(user.id)
+        completed = [session for session in sessions if session.status == 'completed']
+
+        for date in sorted({session.local_date for session in completed}):
+            if deferred_updates_enabled():
+                AggregateJobQueue.enqueue(user, date)
+                continue
+            try:
+                SplitAggregateUpdateService.update_for_date(user, date)
+            except Exception as e:
+                logger.warning("Failed to update aggregates for %s on %s: %s", user.username, date, e)
+                # The sessions are saved; mark the day dirty so the next read recomputes it
+                AggregateJobQueue.enqueue(user, date)
+
+        for session in completed:
+            try:
+                GoalProgressService.update_for_session(session)
+            except Exception as e:
+                logger.warning("Failed to update goal progress for session %s: %s", session.id, e)
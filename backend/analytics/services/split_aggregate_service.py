@@ -1,14 +1,66 @@
-from django.db.models import Sum, Count
+import logging
+
+from django.db import transaction
+from django.db.models import Sum, Count, F
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from collections import defaultdict
 
-from ..models import StudySession, CategoryBlock, Break
-from ..models import DailyAggregate, WeeklyAggregate, MonthlyAggregate
-from .date_utils import get_week_boundaries, get_month_boundaries, is_current_period
+from ..models import StudySession, CategoryBlock, Break, CustomUser
+from ..models import DailyAggregate, WeeklyAggregate, MonthlyAggregate, CategoryDailyFact
+from .date_utils import get_week_boundaries, get_month_boundaries, has_period_ended, get_session_local_date, get_user_today
 from .goal_progress_service import GoalProgressService
+from .user_flow_stats_service import UserFlowStatsService
+from .daily_cumulative_service import DailyCumulativeService
+from .insights_payload import render_aggregate_payload
 from ..flow_score import get_aggregate_coaching_message
 
+logger = logging.getLogger(__name__)
+
+
+# Sessions shorter than 15 minutes are not included in productivity/flow scoring
+MIN_SESSION_LENGTH_FOR_SCORING = 900
+
+
+def _isoformat_utc(value):
+    """Serialize a datetime for timeline JSON, normalized to UTC"""
+    if value is None:
+        return None
+    return value.astimezone(dt_timezone.utc).isoformat()
+
+
+# DailyAggregate fields needed to describe a change to the day as a delta
+DAILY_DELTA_FIELDS = [
+    'total_duration', 'session_count', 'break_count', 'category_durations', 'flow_score', 'timeline_data',
+    'flow_weighted_sum', 'flow_weighted_duration',
+]
+
+
+def _session_times(timeline_data):
+    """Session start/end times as stored in WeeklyAggregate.session_times - skips hanging sessions"""
+    return [
+        {
+            'start_time': session_data['start_time'],
+            'end_time': session_data['end_time'],
+            'total_duration': session_data['total_duration']
+        }
+        for session_data in timeline_data
+        if session_data.get('end_time') is not None
+    ]
+
+
+def _flow_score_band(score):
+    """Distribution bucket used in flow_score_details"""
+    if score >= 850:
+        return 'excellent'  # 850-1000
+    if score >= 700:
+        return 'great'      # 700-849
+    if score >= 550:
+        return 'good'       # 550-699
+    if score >= 400:
+        return 'fair'       # 400-549
+    return 'poor'           # 0-399
+
 
 class SplitAggregateUpdateService:
     """
@@ -24,261 +76,644 @@ class SplitAggregateUpdateService:
             session: StudySession instance
         """
         try:
-            import pytz
-            
             user = session.user
             
-            # Convert session start time to user's timezone to get correct local date
-            user_timezone_str = getattr(user, 'timezone', 'UTC')
-            try:
-                user_tz = pytz.timezone(user_timezone_str)
-            except pytz.exceptions.UnknownTimeZoneError:
-                user_tz = pytz.UTC
-                print(f"⚠️ Invalid timezone '{user_timezone_str}' for user {user.username}, falling back to UTC")
-            
-            # Convert UTC session start time to user's local date
-            session_local_time = session.start_time.astimezone(user_tz)
-            session_date = session_local_time.date()
-            
-            print(f"Updating all aggregates for session {session.id} on {session_date} (user timezone: {user_timezone_str})")
+            # The session's date in the user's timezone
+            session_date = get_session_local_date(session)
             
-            # Update daily aggregate
-            SplitAggregateUpdateService._update_daily_aggregate(user, session_date)
+            logger.debug("Updating all aggregates for session %s on %s (user timezone: %s)", session.id, session_date, user.timezone)
             
-            # Update weekly aggregate
-            week_start, week_end = get_week_boundaries(session_date)
-            SplitAggregateUpdateService._update_weekly_aggregate(user, week_start, week_end)
-            
-            # Update monthly aggregate
-            month_start, month_end = get_month_boundaries(session_date)
-            SplitAggregateUpdateService._update_monthly_aggregate(user, month_start, month_end)
+            # The daily row stays locked until the change has been propagated, so
+            # overlapping updates of the same day can't apply one difference twice
+            with transaction.atomic():
+                SplitAggregateUpdateService._lock_user(user)
+                # Apply just this session to the daily aggregate, recomputing the day only if needed
+                delta = SplitAggregateUpdateService._apply_session_delta(user, session_date, session)
+                if delta is None:
+                    delta = SplitAggregateUpdateService._update_daily_aggregate(user, session_date)
+                
+                # Patch weekly and monthly aggregates with the day's change
+                SplitAggregateUpdateService._propagate_daily_delta(user, delta)
             
             # Update goal progress
             try:
                 GoalProgressService.update_for_session(session)
-                print(f"Updated goal progress for session {session.id}")
+                logger.debug("Updated goal progress for session %s", session.id)
             except Exception as e:
-                print(f"Failed to update goal progress: {str(e)}")
+                logger.warning("Failed to update goal progress: %s", e)
             
-            print(f"Successfully updated all aggregates for session {session.id}")
+            logger.debug("Successfully updated all aggregates for session %s", session.id)
             
         except Exception as e:
-            print(f"Error updating aggregates for session {session.id}: {str(e)}")
+            logger.warning("Error updating aggregates for session %s: %s", session.id, e)
             raise
     
+    @staticmethod
+    def update_for_date(user, date):
+        """
+        Recompute the daily aggregate for a user's local date and patch the
+        weekly and monthly aggregates that contain it.
+        
+        Used by the aggregate job queue, where several session changes on the
+        same day are coalesced into one recompute.
+        """
+        with transaction.atomic():
+            SplitAggregateUpdateService._lock_user(user)
+            delta = SplitAggregateUpdateService._update_daily_aggregate(user, date)
+            SplitAggregateUpdateService._propagate_daily_delta(user, delta)
+        return delta
+
+    @staticmethod
+    def _lock_user(user):
+        """
+        Lock the user row. Every aggregate write for a user takes this lock first, before
+        any daily, weekly, monthly or cumulative row, so two updates for the same user
+        queue here instead of each holding a row the other needs.
+        """
+        list(CustomUser.objects.select_for_update().filter(pk=user.pk).values_list('pk'))
+    
     @staticmethod
     def _update_daily_aggregate(user, date):
         """Update or create daily aggregate for a specific date"""
-        print(f"Updating daily aggregate for {user.username} on {date}")
+        logger.debug("Updating daily aggregate for %s on %s", user.username, date)
         
-        # Calculate fresh aggregate data for this day
-        aggregate_data = SplitAggregateUpdateService._calculate_daily_aggregate_data(user, date)
+        with transaction.atomic():
+            # The user row first (see _lock_user); it also serializes creating a missing row.
+            # Then snapshot the current row, locked, so the change can be propagated as a
+            # delta; callers propagate it inside their own transaction while the lock is held
+            SplitAggregateUpdateService._lock_user(user)
+            previous = SplitAggregateUpdateService._locked_daily_snapshot(user, date)
+            
+            # Calculate fresh aggregate data for this day
+            sessions = SplitAggregateUpdateService._get_daily_sessions(user, date)
+            aggregate_data = SplitAggregateUpdateService._build_daily_aggregate_data(sessions)
+            
+            # Update or create daily aggregate
+            daily_aggregate, created = DailyAggregate.objects.update_or_create(
+                user=user,
+                date=date,
+                defaults=SplitAggregateUpdateService._daily_aggregate_defaults(date, aggregate_data, get_user_today(user))
+            )
+            
+            # Replace the day's category facts
+            CategoryDailyFact.objects.filter(user=user, date=date).delete()
+            CategoryDailyFact.objects.bulk_create(
+                SplitAggregateUpdateService._build_category_facts(user, date, sessions)
+            )
         
-        # Determine if this period is final (not current day)
-        is_final = not is_current_period(date, 'daily')
+        action = "Created" if created else "Updated"
+        logger.debug("%s daily aggregate: %s sessions, %s seconds", action, aggregate_data['session_count'], aggregate_data['total_duration'])
+        
+        return SplitAggregateUpdateService._build_daily_delta(date, previous, aggregate_data)
+    
+    @staticmethod
+    def _locked_daily_snapshot(user, date):
+        return DailyAggregate.objects.select_for_update().filter(user=user, date=date).values(*DAILY_DELTA_FIELDS).first()
+    
+    @staticmethod
+    def _daily_aggregate_defaults(date, aggregate_data, today):
+        """DailyAggregate field values for freshly calculated aggregate data"""
+        # Final once the day is over in the user's timezone
+        is_final = has_period_ended(date, 'daily', today)
         
         # Generate coaching message if we have flow score
         flow_score = aggregate_data.get('flow_score')
         flow_details = aggregate_data.get('flow_score_details')
         coaching_message = get_aggregate_coaching_message(flow_score, flow_details, 'daily') if flow_score else None
         
-        # Update or create daily aggregate
-        daily_aggregate, created = DailyAggregate.objects.update_or_create(
-            user=user,
-            date=date,
-            defaults={
-                'total_duration': aggregate_data['total_duration'],
-                'category_durations': aggregate_data['category_durations'],
-                'session_count': aggregate_data['session_count'],
-                'break_count': aggregate_data['break_count'],
-                'timeline_data': aggregate_data['timeline_data'],
-                'productivity_score': aggregate_data.get('productivity_score'),
-                'productivity_sessions_count': aggregate_data.get('productivity_sessions_count', 0),
-                'flow_score': aggregate_data.get('flow_score'),
-                'flow_score_details': aggregate_data.get('flow_score_details'),
-                'flow_coaching_message': coaching_message,
-                'is_final': is_final
-            }
-        )
-        
-        action = "Created" if created else "Updated"
-        print(f"{action} daily aggregate: {aggregate_data['session_count']} sessions, {aggregate_data['total_duration']} seconds")
+        return {
+            'total_duration': aggregate_data['total_duration'],
+            'category_durations': aggregate_data['category_durations'],
+            'session_count': aggregate_data['session_count'],
+            'break_count': aggregate_data['break_count'],
+            'timeline_data': aggregate_data['timeline_data'],
+            'productivity_score': aggregate_data.get('productivity_score'),
+            'productivity_sessions_count': aggregate_data.get('productivity_sessions_count', 0),
+            'productivity_weighted_sum': aggregate_data['productivity_weighted_sum'],
+            'productivity_rated_duration': aggregate_data['productivity_rated_duration'],
+            'flow_score': aggregate_data.get('flow_score'),
+            'flow_score_details': aggregate_data.get('flow_score_details'),
+            'flow_weighted_sum': aggregate_data['flow_weighted_sum'],
+            'flow_weighted_duration': aggregate_data['flow_weighted_duration'],
+            'flow_coaching_message': coaching_message,
+            'is_final': is_final
+        }
     
     @staticmethod
     def _calculate_daily_aggregate_data(user, target_date):
+        """Calculate complete daily aggregate data including timeline"""
+        sessions = SplitAggregateUpdateService._get_daily_sessions(user, target_date)
+        return SplitAggregateUpdateService._build_daily_aggregate_data(sessions)
+    
+    @staticmethod
+    def _get_daily_sessions(user, target_date):
         """
-        Calculate complete daily aggregate data including timeline
-        Uses 3-day buffer query + Python filtering to avoid timezone boundary bugs
+        A day's completed sessions with blocks and breaks prefetched.
+        Sessions are matched on their stored local_date (user's timezone)
         """
-        from django.utils import timezone as django_timezone
-        import pytz
-        from datetime import datetime, time, timedelta
-        
-        # Get user's timezone
-        user_timezone_str = getattr(user, 'timezone', 'UTC')
-        try:
-            user_tz = pytz.timezone(user_timezone_str)
-        except pytz.exceptions.UnknownTimeZoneError:
-            user_tz = pytz.UTC
-            print(f"⚠️ Invalid timezone '{user_timezone_str}' for user {user.username}, falling back to UTC")
-        
-        # Query a generous 3-day window to capture any timezone edge cases
-        buffer_start = target_date - timedelta(days=1)  # Yesterday
-        buffer_end = target_date + timedelta(days=1)    # Tomorrow  
-        
-        print(f"🕒 Filtering sessions for {user.username} on {target_date} ({user_timezone_str})")
-        print(f"   Querying buffer: {buffer_start} to {buffer_end} (UTC dates)")
-        
-        # Simple UTC date query - no complex timezone boundary math
-        candidate_sessions = StudySession.objects.filter(
+        sessions = list(StudySession.objects.filter(
             user=user,
-            start_time__date__gte=buffer_start,
-            start_time__date__lte=buffer_end,
             status='completed',
+            local_date=target_date,
             end_time__isnull=False  # Defensive: exclude any hanging sessions
-        ).prefetch_related('categoryblock_set__category', 'break_set')
-        
-        # Filter in Python with reliable timezone conversion
-        sessions = []
-        for session in candidate_sessions:
-            session_local_date = session.start_time.astimezone(user_tz).date()
-            if session_local_date == target_date:
-                sessions.append(session)
-        
-        print(f"   Found {candidate_sessions.count()} candidates, {len(sessions)} match target date")
-        
-        if not sessions:
-            return {
-                'total_duration': 0,
-                'category_durations': {},
-                'session_count': 0,
-                'break_count': 0,
-                'timeline_data': [],
-                'productivity_score': None,
-                'productivity_sessions_count': 0
-            }
-        
-        # Filter sessions with valid durations  
-        valid_sessions = [s for s in sessions if s.total_duration and s.total_duration > 0]
+        ).prefetch_related('categoryblock_set__category', 'break_set'))
         
-        # Calculate basic metrics (already in seconds)
-        total_duration = sum(s.total_duration for s in valid_sessions)
-        session_count = len(valid_sessions)
+        logger.debug("Found %s sessions for %s on %s (%s)", len(sessions), user.username, target_date, user.timezone)
+        return sessions
+    
+    @staticmethod
+    def _session_category_facts(session):
+        """{category_id: (seconds, block_count)} for one session's finished blocks"""
+        facts = {}
+        for block in session.categoryblock_set.all():
+            if block.duration and block.duration > 0:
+                seconds, block_count = facts.get(block.category_id, (0, 0))
+                facts[block.category_id] = (seconds + block.duration, block_count + 1)
+        return facts
+    
+    @staticmethod
+    def _build_category_facts(user, date, sessions):
+        """Unsaved CategoryDailyFact rows for a day's sessions"""
+        totals = defaultdict(lambda: [0, 0, 0])
+        for session in sessions:
+            if not session.total_duration or session.total_duration <= 0:
+                continue
+            for category_id, (seconds, block_count) in SplitAggregateUpdateService._session_category_facts(session).items():
+                totals[category_id][0] += seconds
+                totals[category_id][1] += block_count
+                totals[category_id][2] += 1
         
-        # Calculate break count
-        break_count = Break.objects.filter(
-            study_session__in=valid_sessions
-        ).count()
+        return [
+            CategoryDailyFact(
+                user=user,
+                date=date,
+                category_id=category_id,
+                seconds=seconds,
+                block_count=block_count,
+                session_count=session_count,
+            )
+            for category_id, (seconds, block_count, session_count) in totals.items()
+        ]
+    
+    @staticmethod
+    def _add_session_category_facts(user, date, session):
+        """Add one session's blocks to the day's category facts"""
+        for category_id, (seconds, block_count) in SplitAggregateUpdateService._session_category_facts(session).items():
+            updated = CategoryDailyFact.objects.filter(user=user, date=date, category_id=category_id).update(
+                seconds=F('seconds') + seconds,
+                block_count=F('block_count') + block_count,
+                session_count=F('session_count') + 1,
+            )
+            if not updated:
+                CategoryDailyFact.objects.create(
+                    user=user,
+                    date=date,
+                    category_id=category_id,
+                    seconds=seconds,
+                    block_count=block_count,
+                    session_count=1,
+                )
+    
+    @staticmethod
+    def _build_daily_aggregate_data(sessions):
+        """
+        Fold the contributions of a day's completed sessions into aggregate data.
+        Sessions must have categoryblock_set__category and break_set prefetched.
+        """
+        data = SplitAggregateUpdateService._empty_daily_aggregate_data()
         
-        # Calculate category durations (already in seconds)
-        category_durations = defaultdict(int)
-        for session in valid_sessions:
-            for block in session.categoryblock_set.all():
-                if block.duration and block.duration > 0:
-                    category_durations[block.category.name] += block.duration
+        for session in sessions:
+            contribution = SplitAggregateUpdateService._session_contribution(session)
+            if contribution:
+                SplitAggregateUpdateService._add_contribution(data, contribution)
         
-        # Calculate weighted focus score for flow calculation
-        # Only include sessions >= 15 minutes (900 seconds) for scoring
-        MIN_SESSION_LENGTH_FOR_SCORING = 900  # 15 minutes in seconds
-        total_weighted_score = 0
-        total_rated_duration = 0
-        sessions_with_ratings = 0
-        
-        # Flow score aggregation
-        total_weighted_flow_score = 0
-        total_flow_duration = 0
-        flow_scores = []
-        
-        for session in valid_sessions:
-            # Skip sessions shorter than 25 minutes
-            if session.total_duration < MIN_SESSION_LENGTH_FOR_SCORING:
-                continue
-                
-            if session.focus_rating:
-                try:
-                    # Convert rating string to integer (1-5)
-                    rating = int(session.focus_rating)
-                    # Convert to percentage: 1=20%, 2=40%, 3=60%, 4=80%, 5=100%
-                    score = rating * 20
-                    # Weight by session duration
-                    total_weighted_score += score * session.total_duration
-                    total_rated_duration += session.total_duration
-                    sessions_with_ratings += 1
-                except (ValueError, TypeError):
-                    # Skip sessions with invalid ratings
-                    print(f"Invalid focus rating for session {session.id}: {session.focus_rating}")
-                    continue
-            
-            # Aggregate flow scores (duration-weighted average)
-            if session.flow_score is not None:
-                total_weighted_flow_score += session.flow_score * session.total_duration
-                total_flow_duration += session.total_duration
-                flow_scores.append(session.flow_score)
+        SplitAggregateUpdateService._finalize_daily_scores(data)
+        return data
+    
+    @staticmethod
+    def _empty_daily_aggregate_data():
+        return {
+            'total_duration': 0,
+            'category_durations': {},
+            'session_count': 0,
+            'break_count': 0,
+            'timeline_data': [],
+            'productivity_score': None,
+            'productivity_sessions_count': 0,
+            'productivity_weighted_sum': 0,
+            'productivity_rated_duration': 0,
+            'flow_score': None,
+            'flow_score_details': None,
+            'flow_weighted_sum': 0,
+            'flow_weighted_duration': 0,
+        }
+    
+    @staticmethod
+    def _session_contribution(session):
+        """
+        Calculate what a single completed session adds to its day's aggregate.
+        Returns None for sessions that are not counted (no valid duration).
+        """
+        if not session.total_duration or session.total_duration <= 0:
+            return None
         
-        # Calculate final productivity score (weighted average)
-        productivity_score = None
-        if total_rated_duration > 0:
-            productivity_score = total_weighted_score / total_rated_duration
+        duration = session.total_duration
+        blocks = session.categoryblock_set.all()
+        breaks = session.break_set.all()
         
-        # Calculate flow score metrics
-        flow_score = None
-        flow_score_details = None
-        if total_flow_duration > 0:
-            flow_score = total_weighted_flow_score / total_flow_duration
-            flow_score_details = {
-                'min': min(flow_scores) if flow_scores else None,
-                'max': max(flow_scores) if flow_scores else None,
-                'avg': flow_score,
-                'count': len(flow_scores),
-                'distribution': {
-                    'excellent': len([s for s in flow_scores if s >= 850]),  # 850-1000
-                    'great': len([s for s in flow_scores if 700 <= s < 850]),  # 700-849
-                    'good': len([s for s in flow_scores if 550 <= s < 700]),   # 550-699
-                    'fair': len([s for s in flow_scores if 400 <= s < 550]),   # 400-549
-                    'poor': len([s for s in flow_scores if s < 400])           # 0-399
-                }
-            }
+        # Category durations (already in seconds)
+        category_durations = defaultdict(int)
+        for block in blocks:
+            if block.duration and block.duration > 0:
+                category_durations[block.category.name] += block.duration
         
-        # Build timeline data for API
-        timeline_data = []
-        for session in valid_sessions:
-            session_data = {
+        contribution = {
+            'session_id': session.id,
+            'total_duration': duration,
+            'break_count': len(breaks),
+            'category_durations': dict(category_durations),
+            'productivity_weighted_sum': 0,
+            'productivity_rated_duration': 0,
+            'productivity_sessions_count': 0,
+            'flow_score': None,
+            'flow_weighted_sum': 0,
+            'flow_weighted_duration': 0,
+            'timeline_entry': {
                 'session_id': session.id,
-                'start_time': session.start_time.isoformat(),
-                'end_time': session.end_time.isoformat() if session.end_time else None,
-                'total_duration': session.total_duration,
+                'start_time': _isoformat_utc(session.start_time),
+                'end_time': _isoformat_utc(session.end_time),
+                'total_duration': duration,
                 'breaks': [
                     {
-                        'start_time': br.start_time.isoformat(),
-                        'end_time': br.end_time.isoformat(),
+                        'start_time': _isoformat_utc(br.start_time),
+                        'end_time': _isoformat_utc(br.end_time),
                         'duration': br.duration
                     }
-                    for br in session.break_set.all()
+                    for br in breaks
                 ],
                 'category_blocks': [
                     {
                         'category': block.category.name,
-                        'start_time': block.start_time.isoformat(),
-                        'end_time': block.end_time.isoformat() if block.end_time else None,
+                        'category_id': block.category_id,
+                        'start_time': _isoformat_utc(block.start_time),
+                        'end_time': _isoformat_utc(block.end_time),
                         'duration': block.duration
                     }
-                    for block in session.categoryblock_set.all()
+                    for block in blocks
                 ]
             }
-            timeline_data.append(session_data)
+        }
+        
+        # Only include sessions >= 15 minutes (900 seconds) for scoring
+        if duration < MIN_SESSION_LENGTH_FOR_SCORING:
+            return contribution
+        
+        if session.focus_rating:
+            try:
+                # Convert rating string to integer (1-5)
+                rating = int(session.focus_rating)
+                # Convert to percentage: 1=20%, 2=40%, 3=60%, 4=80%, 5=100%
+                score = rating * 20
+                # Weight by session duration
+                contribution['productivity_weighted_sum'] = score * duration
+                contribution['productivity_rated_duration'] = duration
+                contribution['productivity_sessions_count'] = 1
+            except (ValueError, TypeError):
+                # Skip sessions with invalid ratings
+                logger.warning("Invalid focus rating for session %s: %s", session.id, session.focus_rating)
+        
+        # Flow scores are aggregated as a duration-weighted average
+        if session.flow_score is not None:
+            contribution['flow_score'] = session.flow_score
+            contribution['flow_weighted_sum'] = session.flow_score * duration
+            contribution['flow_weighted_duration'] = duration
+        
+        return contribution
+    
+    @staticmethod
+    def _add_contribution(data, contribution):
+        """Add one session contribution to daily aggregate data in place"""
+        data['total_duration'] += contribution['total_duration']
+        data['session_count'] += 1
+        data['break_count'] += contribution['break_count']
+        
+        category_durations = dict(data['category_durations'])
+        for category, duration in contribution['category_durations'].items():
+            category_durations[category] = category_durations.get(category, 0) + duration
+        data['category_durations'] = category_durations
+        
+        # Keep timeline ordered like the StudySession default ordering (newest first)
+        timeline_data = list(data['timeline_data'])
+        timeline_data.append(contribution['timeline_entry'])
+        timeline_data.sort(key=lambda entry: datetime.fromisoformat(entry['start_time']), reverse=True)
+        data['timeline_data'] = timeline_data
+        
+        data['productivity_weighted_sum'] += contribution['productivity_weighted_sum']
+        data['productivity_rated_duration'] += contribution['productivity_rated_duration']
+        data['productivity_sessions_count'] += contribution['productivity_sessions_count']
+        
+        data['flow_weighted_sum'] += contribution['flow_weighted_sum']
+        data['flow_weighted_duration'] += contribution['flow_weighted_duration']
+        
+        flow_score = contribution['flow_score']
+        if flow_score is not None:
+            details = dict(data['flow_score_details'] or {
+                'min': None,
+                'max': None,
+                'count': 0,
+                'distribution': {'excellent': 0, 'great': 0, 'good': 0, 'fair': 0, 'poor': 0}
+            })
+            details['min'] = flow_score if details['min'] is None else min(details['min'], flow_score)
+            details['max'] = flow_score if details['max'] is None else max(details['max'], flow_score)
+            details['count'] += 1
+            distribution = dict(details['distribution'])
+            distribution[_flow_score_band(flow_score)] += 1
+            details['distribution'] = distribution
+            data['flow_score_details'] = details
+    
+    @staticmethod
+    def _finalize_daily_scores(data):
+        """Derive the weighted averages from the running sums"""
+        # Calculate final productivity score (weighted average)
+        data['productivity_score'] = None
+        if data['productivity_rated_duration'] > 0:
+            data['productivity_score'] = data['productivity_weighted_sum'] / data['productivity_rated_duration']
+        
+        # Calculate flow score metrics
+        data['flow_score'] = None
+        if data['flow_weighted_duration'] > 0:
+            data['flow_score'] = data['flow_weighted_sum'] / data['flow_weighted_duration']
+            data['flow_score_details']['avg'] = data['flow_score']
+        else:
+            data['flow_score_details'] = None
+    
+    @staticmethod
+    def _apply_session_delta(user, date, session):
+        """
+        Apply only the finished session's contribution to an existing DailyAggregate.
+        
+        Returns the resulting daily delta, or None when the caller should fall back
+        to a full recompute (no row yet, row predates the running sums, or the
+        session is already part of the row).
+        """
+        if session.status != 'completed' or not session.end_time:
+            return None
+        
+        # Reload blocks and breaks so we see blocks closed after the session was saved,
+        # unless the caller loaded them after closing the blocks (SessionCompletionService)
+        if not {'categoryblock_set', 'break_set'} <= getattr(session, '_prefetched_objects_cache', {}).keys():
+            session = StudySession.objects.prefetch_related(
+                'categoryblock_set__category', 'break_set'
+            ).get(pk=session.pk)
+        contribution = SplitAggregateUpdateService._session_contribution(session)
+        if not contribution:
+            return None
+        
+        with transaction.atomic():
+            daily_aggregate = DailyAggregate.objects.select_for_update().filter(user=user, date=date).first()
+            if daily_aggregate is None:
+                return None
+            
+            if daily_aggregate.flow_weighted_sum is None or daily_aggregate.productivity_weighted_sum is None:
+                # Row was written before running sums were tracked
+                return None
+            
+            if any(entry.get('session_id') == session.id for entry in daily_aggregate.timeline_data):
+                # Session already counted - a delta would double count it
+                return None
+            
+            data = {
+                field: getattr(daily_aggregate, field)
+                for field in SplitAggregateUpdateService._empty_daily_aggregate_data()
+            }
+            previous = {field: data[field] for field in DAILY_DELTA_FIELDS}
+            SplitAggregateUpdateService._add_contribution(data, contribution)
+            SplitAggregateUpdateService._finalize_daily_scores(data)
+            
+            flow_score = data['flow_score']
+            for field, value in data.items():
+                setattr(daily_aggregate, field, value)
+            daily_aggregate.flow_coaching_message = get_aggregate_coaching_message(
+                flow_score, data['flow_score_details'], 'daily'
+            ) if flow_score else None
+            daily_aggregate.is_final = has_period_ended(date, 'daily', get_user_today(user))
+            daily_aggregate.save()
+            
+            # The daily row lock also serializes fact updates for the day
+            SplitAggregateUpdateService._add_session_category_facts(user, date, session)
+        
+        logger.debug("Applied session %s delta to daily aggregate: %s sessions, %s seconds", session.id, data['session_count'], data['total_duration'])
+        return SplitAggregateUpdateService._build_daily_delta(date, previous, data)
+    
+    @staticmethod
+    def _build_daily_delta(date, previous, current):
+        """
+        Describe how one DailyAggregate changed, compactly enough to patch the
+        weekly and monthly rows without re-reading the other days.
+        
+        Args:
+            date: The local date of the daily aggregate
+            previous: Daily field values before the change (None if the row was new)
+            current: Daily field values after the change
+        """
+        previous = previous or {
+            'total_duration': 0,
+            'session_count': 0,
+            'break_count': 0,
+            'category_durations': {},
+            'flow_score': None,
+            'timeline_data': [],
+            'flow_weighted_sum': 0,
+            'flow_weighted_duration': 0,
+        }
+        
+        category_durations = defaultdict(int)
+        for category, duration in current['category_durations'].items():
+            category_durations[category] += duration
+        for category, duration in previous['category_durations'].items():
+            category_durations[category] -= duration
+        
+        previous_times = _session_times(previous['timeline_data'])
+        current_times = _session_times(current['timeline_data'])
         
         return {
-            'total_duration': total_duration,
-            'category_durations': dict(category_durations),
-            'session_count': session_count,
-            'break_count': break_count,
-            'timeline_data': timeline_data,
-            'productivity_score': productivity_score,
-            'productivity_sessions_count': sessions_with_ratings,
-            'flow_score': flow_score,
-            'flow_score_details': flow_score_details
+            'date': date,
+            'total_duration': current['total_duration'] - previous['total_duration'],
+            'session_count': current['session_count'] - previous['session_count'],
+            'break_count': current['break_count'] - previous['break_count'],
+            'category_durations': {k: v for k, v in category_durations.items() if v},
+            'old_flow_score': previous['flow_score'],
+            'new_flow_score': current['flow_score'],
+            # None when the previous row predates the running sums
+            'flow_weighted_sum': None if previous['flow_weighted_sum'] is None
+                else current['flow_weighted_sum'] - previous['flow_weighted_sum'],
+            'flow_weighted_duration': None if previous['flow_weighted_duration'] is None
+                else current['flow_weighted_duration'] - previous['flow_weighted_duration'],
+            # The day's breakdown cell after the change
+            'day_total': current['total_duration'],
+            'day_categories': current['category_durations'],
+            'removed_session_times': [t for t in previous_times if t not in current_times],
+            'added_session_times': [t for t in current_times if t not in previous_times],
         }
     
+    @staticmethod
+    def _propagate_daily_delta(user, delta):
+        """Patch the weekly and monthly aggregates containing the delta's day, the lifetime stats and the running totals in place"""
+        date = delta['date']
+        
+        week_start, week_end = get_week_boundaries(date)
+        if not SplitAggregateUpdateService._apply_delta_to_weekly(user, week_start, delta):
+            SplitAggregateUpdateService._update_weekly_aggregate(user, week_start, week_end)
+        
+        month_start, month_end = get_month_boundaries(date)
+        if not SplitAggregateUpdateService._apply_delta_to_monthly(user, month_start, delta):
+            SplitAggregateUpdateService._update_monthly_aggregate(user, month_start, month_end)
+        
+        UserFlowStatsService.apply_daily_delta(user, delta)
+        DailyCumulativeService.apply_daily_delta(user, delta)
+    
+    @staticmethod
+    def _patch_period_flow_score(details, old_score, new_score):
+        """
+        Update a period's flow score (plain average of daily scores) for one day's change.
+        
+        Returns (applied, flow_score, flow_score_details). applied is False when the
+        day held the period's min or max and moved away from it, since the new
+        extreme can't be known without the other days.
+        """
+        count = details['daily_count'] if details else 0
+        score_sum = details['avg'] * count if details else 0
+        min_score = details['min'] if details else None
+        max_score = details['max'] if details else None
+        
+        if old_score is not None:
+            count -= 1
+            score_sum -= old_score
+            if count <= 0:
+                count, score_sum, min_score, max_score = 0, 0, None, None
+            elif (old_score == min_score and (new_score is None or new_score > old_score)) or \
+                    (old_score == max_score and (new_score is None or new_score < old_score)):
+                return False, None, None
+        
+        if new_score is not None:
+            count += 1
+            score_sum += new_score
+            min_score = new_score if min_score is None else min(min_score, new_score)
+            max_score = new_score if max_score is None else max(max_score, new_score)
+        
+        if count == 0:
+            return True, None, None
+        
+        flow_score = score_sum / count
+        return True, flow_score, {
+            'min': min_score,
+            'max': max_score,
+            'avg': flow_score,
+            'daily_count': count
+        }
+    
+    @staticmethod
+    def _patch_period_totals(aggregate, delta):
+        """Apply the day's count, duration and category changes to a weekly/monthly row"""
+        aggregate.total_duration += delta['total_duration']
+        aggregate.session_count += delta['session_count']
+        aggregate.break_count += delta['break_count']
+        
+        category_durations = dict(aggregate.category_durations)
+        for category, duration in delta['category_durations'].items():
+            category_durations[category] = category_durations.get(category, 0) + duration
+            if category_durations[category] <= 0:
+                del category_durations[category]
+        aggregate.category_durations = category_durations
+    
+    @staticmethod
+    def _apply_delta_to_weekly(user, week_start, delta):
+        """Patch an existing WeeklyAggregate in place. Returns False if a full recompute is needed."""
+        with transaction.atomic():
+            weekly_aggregate = WeeklyAggregate.objects.select_for_update().filter(
+                user=user, week_start=week_start
+            ).first()
+            if weekly_aggregate is None:
+                return False
+            
+            applied, flow_score, flow_score_details = SplitAggregateUpdateService._patch_period_flow_score(
+                weekly_aggregate.flow_score_details, delta['old_flow_score'], delta['new_flow_score']
+            )
+            if not applied:
+                return False
+            
+            SplitAggregateUpdateService._patch_period_totals(weekly_aggregate, delta)
+            
+            day_code = delta['date'].strftime('%A')[:2].upper()
+            daily_breakdown = dict(weekly_aggregate.daily_breakdown)
+            daily_breakdown[day_code] = {
+                'total': delta['day_total'],
+                'categories': delta['day_categories']
+            }
+            weekly_aggregate.daily_breakdown = daily_breakdown
+            
+            session_times = [
+                t for t in weekly_aggregate.session_times if t not in delta['removed_session_times']
+            ] + delta['added_session_times']
+            session_times.sort(key=lambda t: datetime.fromisoformat(t['start_time']))
+            weekly_aggregate.session_times = session_times
+            
+            weekly_aggregate.flow_score = flow_score
+            weekly_aggregate.flow_score_details = flow_score_details
+            weekly_aggregate.flow_coaching_message = get_aggregate_coaching_message(
+                flow_score, flow_score_details, 'weekly'
+            ) if flow_score else None
+            weekly_aggregate.is_final = has_period_ended(week_start, 'weekly', get_user_today(user))
+            weekly_aggregate.save()
+        
+        logger.debug("Patched weekly aggregate for week of %s: %s sessions, %s seconds", week_start, weekly_aggregate.session_count, weekly_aggregate.total_duration)
+        return True
+    
+    @staticmethod
+    def _apply_delta_to_monthly(user, month_start, delta):
+        """Patch an existing MonthlyAggregate in place. Returns False if a full recompute is needed."""
+        with transaction.atomic():
+            monthly_aggregate = MonthlyAggregate.objects.select_for_update().filter(
+                user=user, month_start=month_start
+            ).first()
+            if monthly_aggregate is None:
+                return False
+            
+            applied, flow_score, flow_score_details = SplitAggregateUpdateService._patch_period_flow_score(
+                monthly_aggregate.flow_score_details, delta['old_flow_score'], delta['new_flow_score']
+            )
+            if not applied:
+                return False
+            
+            SplitAggregateUpdateService._patch_period_totals(monthly_aggregate, delta)
+            
+            date_str = delta['date'].isoformat()
+            daily_breakdown = [
+                day for day in monthly_aggregate.daily_breakdown if day['date'] != date_str
+            ]
+            daily_breakdown.append({
+                'date': date_str,
+                'total_duration': round(delta['day_total'] / 3600, 2),  # Convert to hours
+                'category_durations': delta['day_categories']
+            })
+            daily_breakdown.sort(key=lambda day: day['date'])
+            monthly_aggregate.daily_breakdown = daily_breakdown
+            
+            heatmap_data = dict(monthly_aggregate.heatmap_data)
+            heatmap_data[date_str] = round(delta['day_total'] / 3600, 2)
+            monthly_aggregate.heatmap_data = heatmap_data
+            
+            monthly_aggregate.flow_score = flow_score
+            monthly_aggregate.flow_score_details = flow_score_details
+            monthly_aggregate.flow_coaching_message = get_aggregate_coaching_message(
+                flow_score, flow_score_details, 'monthly'
+            ) if flow_score else None
+            monthly_aggregate.is_final = has_period_ended(month_start, 'monthly', get_user_today(user))
+            monthly_aggregate.save()
+        
+        logger.debug("Patched monthly aggregate for month of %s: %s sessions, %s seconds", month_start, monthly_aggregate.session_count, monthly_aggregate.total_duration)
+        return True
+    
     @staticmethod
     def update_weekly_aggregates_for_date(date):
         """
@@ -294,14 +729,13 @@ class SplitAggregateUpdateService:
         ).values_list('user', flat=True).distinct()
         
         for user_id in users:
-            from ..models import CustomUser
             user = CustomUser.objects.get(id=user_id)
             SplitAggregateUpdateService._update_weekly_aggregate(user, week_start, week_end)
     
     @staticmethod
     def _update_weekly_aggregate(user, week_start, week_end):
         """Update weekly aggregate by summing daily aggregates"""
-        print(f"Updating weekly aggregate for {user.username} from {week_start} to {week_end}")
+        logger.debug("Updating weekly aggregate for %s from %s to %s", user.username, week_start, week_end)
         
         # Get all daily aggregates for this week
         daily_aggregates = DailyAggregate.objects.filter(
@@ -311,9 +745,29 @@ class SplitAggregateUpdateService:
         ).order_by('date')
         
         if not daily_aggregates.exists():
-            print(f"No daily aggregates found for week {week_start}")
+            logger.debug("No daily aggregates found for week %s", week_start)
             return
         
+        weekly_data = SplitAggregateUpdateService._build_weekly_aggregate_data(week_start, daily_aggregates, get_user_today(user))
+        session_count = weekly_data['session_count']
+        total_duration = weekly_data['total_duration']
+        
+        # Update weekly aggregate
+        weekly_aggregate, created = WeeklyAggregate.objects.update_or_create(
+            user=user,
+            week_start=week_start,
+            defaults=weekly_data
+        )
+        
+        action = "Created" if created else "Updated"
+        logger.debug("%s weekly aggregate: %s sessions, %s seconds", action, session_count, total_duration)
+    
+    @staticmethod
+    def _build_weekly_aggregate_data(week_start, daily_aggregates, today):
+        """
+        Calculate WeeklyAggregate field values from the week's daily aggregates.
+        daily_aggregates may be unsaved DailyAggregate instances (used by rebuild_aggregates).
+        """
         # Sum up daily data
         total_duration = sum(d.total_duration for d in daily_aggregates)
         session_count = sum(d.session_count for d in daily_aggregates)
@@ -360,41 +814,27 @@ class SplitAggregateUpdateService:
         # Build session times from daily timeline data - filter out hanging sessions
         session_times = []
         for daily in daily_aggregates:
-            for session_data in daily.timeline_data:
-                # Only include sessions with valid end_time
-                if session_data.get('end_time') is not None:
-                    session_times.append({
-                        'start_time': session_data['start_time'],
-                        'end_time': session_data['end_time'],
-                        'total_duration': session_data['total_duration']
-                    })
-        
-        # Determine if week is final
-        is_final = not is_current_period(week_start, 'weekly')
+            session_times.extend(_session_times(daily.timeline_data))
+        session_times.sort(key=lambda t: datetime.fromisoformat(t['start_time']))
+        
+        # Final once the week is over in the user's timezone
+        is_final = has_period_ended(week_start, 'weekly', today)
         
         # Generate coaching message if we have flow score
         coaching_message = get_aggregate_coaching_message(flow_score, flow_score_details, 'weekly') if flow_score else None
         
-        # Update weekly aggregate
-        weekly_aggregate, created = WeeklyAggregate.objects.update_or_create(
-            user=user,
-            week_start=week_start,
-            defaults={
-                'total_duration': total_duration,
-                'category_durations': dict(category_durations),
-                'session_count': session_count,
-                'break_count': break_count,
-                'daily_breakdown': daily_breakdown,
-                'session_times': session_times,
-                'flow_score': flow_score,
-                'flow_score_details': flow_score_details,
-                'flow_coaching_message': coaching_message,
-                'is_final': is_final
-            }
-        )
-        
-        action = "Created" if created else "Updated"
-        print(f"{action} weekly aggregate: {session_count} sessions, {total_duration} seconds")
+        return {
+            'total_duration': total_duration,
+            'category_durations': dict(category_durations),
+            'session_count': session_count,
+            'break_count': break_count,
+            'daily_breakdown': daily_breakdown,
+            'session_times': session_times,
+            'flow_score': flow_score,
+            'flow_score_details': flow_score_details,
+            'flow_coaching_message': coaching_message,
+            'is_final': is_final
+        }
     
     @staticmethod
     def update_monthly_aggregates_for_date(date):
@@ -411,14 +851,13 @@ class SplitAggregateUpdateService:
         ).values_list('user', flat=True).distinct()
         
         for user_id in users:
-            from ..models import CustomUser
             user = CustomUser.objects.get(id=user_id)
             SplitAggregateUpdateService._update_monthly_aggregate(user, month_start, month_end)
     
     @staticmethod
     def _update_monthly_aggregate(user, month_start, month_end):
         """Update monthly aggregate by summing daily aggregates"""
-        print(f"Updating monthly aggregate for {user.username} from {month_start} to {month_end}")
+        logger.debug("Updating monthly aggregate for %s from %s to %s", user.username, month_start, month_end)
         
         # Get all daily aggregates for this month
         daily_aggregates = DailyAggregate.objects.filter(
@@ -428,9 +867,29 @@ class SplitAggregateUpdateService:
         ).order_by('date')
         
         if not daily_aggregates.exists():
-            print(f"No daily aggregates found for month {month_start}")
+            logger.debug("No daily aggregates found for month %s", month_start)
             return
         
+        monthly_data = SplitAggregateUpdateService._build_monthly_aggregate_data(month_start, month_end, daily_aggregates, get_user_today(user))
+        session_count = monthly_data['session_count']
+        total_duration = monthly_data['total_duration']
+        
+        # Update monthly aggregate
+        monthly_aggregate, created = MonthlyAggregate.objects.update_or_create(
+            user=user,
+            month_start=month_start,
+            defaults=monthly_data
+        )
+        
+        action = "Created" if created else "Updated"
+        logger.debug("%s monthly aggregate: %s sessions, %s seconds", action, session_count, total_duration)
+    
+    @staticmethod
+    def _build_monthly_aggregate_data(month_start, month_end, daily_aggregates, today):
+        """
+        Calculate MonthlyAggregate field values from the month's daily aggregates.
+        daily_aggregates may be unsaved DailyAggregate instances (used by rebuild_aggregates).
+        """
         # Sum up daily data
         total_duration = sum(d.total_duration for d in daily_aggregates)
         session_count = sum(d.session_count for d in daily_aggregates)
@@ -477,29 +936,136 @@ class SplitAggregateUpdateService:
             date_str = daily.date.strftime('%Y-%m-%d')
             heatmap_data[date_str] = round(daily.total_duration / 3600, 2)
         
-        # Determine if month is final
-        is_final = not is_current_period(month_start, 'monthly')
+        # Final once the month is over in the user's timezone
+        is_final = has_period_ended(month_start, 'monthly', today)
         
         # Generate coaching message if we have flow score
         coaching_message = get_aggregate_coaching_message(flow_score, flow_score_details, 'monthly') if flow_score else None
         
-        # Update monthly aggregate
-        monthly_aggregate, created = MonthlyAggregate.objects.update_or_create(
+        return {
+            'total_duration': total_duration,
+            'category_durations': dict(category_durations),
+            'session_count': session_count,
+            'break_count': break_count,
+            'daily_breakdown': daily_breakdown,
+            'heatmap_data': heatmap_data,
+            'flow_score': flow_score,
+            'flow_score_details': flow_score_details,
+            'flow_coaching_message': coaching_message,
+            'is_final': is_final
+        }
+    
+    @staticmethod
+    def rebuild_user_month(user_id, month_start, range_start=None, range_end=None):
+        """
+        Recompute one user's daily, weekly and monthly aggregates for a month straight
+        from completed sessions, writing rows with bulk upserts. This is the unit of
+        work for the rebuild_aggregates command.
+        
+        Each week belongs to the month containing its Monday, so every weekly row is
+        written by exactly one chunk. Only rows overlapping [range_start, range_end]
+        are written, but weekly and monthly totals always cover the full period.
+        
+        Returns:
+            tuple: (daily_rows, weekly_rows, monthly_rows) written
+        """
+        user = CustomUser.objects.get(id=user_id)
+        today = get_user_today(user)
+        month_start, month_end = get_month_boundaries(month_start)
+        span_start = get_week_boundaries(month_start)[0]
+        span_end = get_week_boundaries(month_end)[1]
+        range_start = range_start or span_start
+        range_end = range_end or span_end
+        
+        # One indexed query for the whole span
+        candidate_sessions = StudySession.objects.filter(
             user=user,
-            month_start=month_start,
-            defaults={
-                'total_duration': total_duration,
-                'category_durations': dict(category_durations),
-                'session_count': session_count,
-                'break_count': break_count,
-                'daily_breakdown': daily_breakdown,
-                'heatmap_data': heatmap_data,
-                'flow_score': flow_score,
-                'flow_score_details': flow_score_details,
-                'flow_coaching_message': coaching_message,
-                'is_final': is_final
-            }
-        )
+            status='completed',
+            local_date__gte=span_start,
+            local_date__lte=span_end,
+            end_time__isnull=False
+        ).prefetch_related('categoryblock_set__category', 'break_set')
         
-        action = "Created" if created else "Updated"
-        print(f"{action} monthly aggregate: {session_count} sessions, {total_duration} seconds")
\ No newline at end of file
+        sessions_by_date = defaultdict(list)
+        for session in candidate_sessions:
+            sessions_by_date[session.local_date].append(session)
+        
+        # Days that already have rows are rewritten too, so stale rows get zeroed
+        existing_dates = set(DailyAggregate.objects.filter(
+            user=user, date__gte=span_start, date__lte=span_end
+        ).values_list('date', flat=True))
+        
+        daily_aggregates = {}
+        current_date = span_start
+        while current_date <= span_end:
+            if current_date in sessions_by_date or current_date in existing_dates:
+                aggregate_data = SplitAggregateUpdateService._build_daily_aggregate_data(sessions_by_date[current_date])
+                daily_aggregates[current_date] = DailyAggregate(
+                    user=user,
+                    date=current_date,
+                    **SplitAggregateUpdateService._daily_aggregate_defaults(current_date, aggregate_data, today)
+                )
+            current_date += timedelta(days=1)
+        
+        daily_rows = [
+            daily_aggregates[d] for d in sorted(daily_aggregates)
+            if month_start <= d <= month_end and range_start <= d <= range_end
+        ]
+        
+        weekly_rows = []
+        week_start = span_start if span_start >= month_start else span_start + timedelta(days=7)
+        while week_start <= month_end:
+            week_end = week_start + timedelta(days=6)
+            week_dailies = [daily_aggregates[d] for d in sorted(daily_aggregates) if week_start <= d <= week_end]
+            if week_dailies and week_start <= range_end and week_end >= range_start:
+                weekly_rows.append(WeeklyAggregate(
+                    user=user,
+                    week_start=week_start,
+                    **SplitAggregateUpdateService._build_weekly_aggregate_data(week_start, week_dailies, today)
+                ))
+            week_start += timedelta(days=7)
+        
+        fact_start = max(month_start, range_start)
+        fact_end = min(month_end, range_end)
+        fact_rows = []
+        for current_date in sorted(sessions_by_date):
+            if fact_start <= current_date <= fact_end:
+                fact_rows.extend(SplitAggregateUpdateService._build_category_facts(
+                    user, current_date, sessions_by_date[current_date]
+                ))
+        
+        monthly_rows = []
+        month_dailies = [daily_aggregates[d] for d in sorted(daily_aggregates) if month_start <= d <= month_end]
+        if month_dailies:
+            monthly_rows.append(MonthlyAggregate(
+                user=user,
+                month_start=month_start,
+                **SplitAggregateUpdateService._build_monthly_aggregate_data(month_start, month_end, month_dailies, today)
+            ))
+        
+        with transaction.atomic():
+            CategoryDailyFact.objects.filter(user=user, date__gte=fact_start, date__lte=fact_end).delete()
+            CategoryDailyFact.objects.bulk_create(fact_rows)
+            
+            for model, rows, unique_field in (
+                (DailyAggregate, daily_rows, 'date'),
+                (WeeklyAggregate, weekly_rows, 'week_start'),
+                (MonthlyAggregate, monthly_rows, 'month_start'),
+            ):
+                if not rows:
+                    continue
+                # bulk_create skips save(), which normally renders the payload
+                for row in rows:
+                    row.rendered_payload = render_aggregate_payload(row)
+                update_fields = [
+                    field.name for field in model._meta.concrete_fields
+                    if not field.primary_key and field.name not in ('user', unique_field)
+                ]
+                model.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['user', unique_field],
+                    update_fields=update_fields,
+                )
+        
+        return len(daily_rows), len(weekly_rows), len(monthly_rows)
@@ -0,0 +1,98 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from ..models import DailyAggregate, UserFlowStats
+
+
+class UserFlowStatsService:
+    """Keeps UserFlowStats in step with DailyAggregate changes."""
+
+    @staticmethod
+    def get_for_user(user):
+        """Return the user's lifetime stats, building them from daily aggregates on first use"""
+        stats = UserFlowStats.objects.filter(user=user).first()
+        if stats is None:
+            stats = UserFlowStatsService.rebuild(user)
+        return stats
+
+    @staticmethod
+    async def aget_for_user(user):
+        """Async get_for_user; the first-use rebuild still runs in a worker thread"""
+        stats = await UserFlowStats.objects.filter(user=user).afirst()
+        if stats is None:
+            stats = await sync_to_async(UserFlowStatsService.rebuild)(user)
+        return stats
+
+    @staticmethod
+    def rebuild(user):
+        """Recompute the user's lifetime stats from all of their daily aggregates"""
+        totals = DailyAggregate.objects.filter(user=user).aggregate(
+            total_duration=Sum('total_duration'),
+            total_sessions=Sum('session_count'),
+        )
+        flow = DailyAggregate.objects.filter(user=user, flow_score__isnull=False).aggregate(
+            flow_score_sum=Sum('flow_score'),
+            flow_score_count=Count('id'),
+            flow_score_min=Min('flow_score'),
+            flow_score_max=Max('flow_score'),
+        )
+        stats, _ = UserFlowStats.objects.update_or_create(
+            user=user,
+            defaults={
+                'flow_score_sum': flow['flow_score_sum'] or 0,
+                'flow_score_count': flow['flow_score_count'],
+                'flow_score_min': flow['flow_score_min'],
+                'flow_score_max': flow['flow_score_max'],
+                'total_duration': totals['total_duration'] or 0,
+                'total_sessions': totals['total_sessions'] or 0,
+            }
+        )
+        return stats
+
+    @staticmethod
+    def apply_daily_delta(user, delta):
+        """
+        Fold one daily aggregate change (see SplitAggregateUpdateService._build_daily_delta)
+        into the user's lifetime stats.
+        """
+        old_score = delta['old_flow_score']
+        new_score = delta['new_flow_score']
+
+        with transaction.atomic():
+            stats = UserFlowStats.objects.select_for_update().filter(user=user).first()
+            if stats is None:
+                # Nothing materialized yet; the first read builds it from the (already saved) rows
+                return
+
+            stats.total_duration += delta['total_duration']
+            stats.total_sessions += delta['session_count']
+
+            if old_score is not None:
+                stats.flow_score_sum -= old_score
+                stats.flow_score_count -= 1
+            if new_score is not None:
+                stats.flow_score_sum += new_score
+                stats.flow_score_count += 1
+
+            # Min/max can't be un-applied: if the day held an extreme and moved away
+            # from it, rescan for the new extreme
+            extreme_lost = old_score is not None and old_score != new_score and old_score in (
+                stats.flow_score_min, stats.flow_score_max
+            )
+            if extreme_lost:
+                extremes = DailyAggregate.objects.filter(user=user, flow_score__isnull=False).aggregate(
+                    flow_score_min=Min('flow_score'),
+                    flow_score_max=Max('flow_score'),
+                )
+                stats.flow_score_min = extremes['flow_score_min']
+                stats.flow_score_max = extremes['flow_score_max']
+            elif new_score is not None:
+                if stats.flow_score_min is None or new_score < stats.flow_score_min:
+                    stats.flow_score_min = new_score
+                if stats.flow_score_max is None or new_score > stats.flow_score_max:
+                    stats.flow_score_max = new_score
+
+            if not stats.flow_score_count:
+                stats.flow_score_sum = 0
+            stats.save()
@@ -0,0 +1,167 @@
+"""
+Aggregate Job Queue Tests
+
+Focus: Deferred aggregate recomputes through the AggregateJob table
+Scope: Coalescing, worker processing, retries, session endpoints
+
+Key Testing Areas:
+1. Enqueues for the same (user, date) coalesce into one job
+2. Changes enqueued while a job runs trigger another run
+3. Failures back off and eventually stop retrying
+4. Ending a session with deferred updates only enqueues
+5. Insights reads recompute dirty days, or serve stale and refresh in the background
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import CustomUser, Categories, CategoryBlock, StudySession
+from analytics.models import AggregateJob, DailyAggregate
+from analytics.services.aggregate_job_queue import AggregateJobQueue
+from analytics.services.split_aggregate_service import SplitAggregateUpdateService
+
+
+class AggregateJobQueueTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.category = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.date = datetime(2025, 3, 10).date()
+
+    def add_session(self, hour=9, minutes=30):
+        start = datetime(2025, 3, 10, hour, 0, tzinfo=dt_timezone.utc)
+        session = StudySession.objects.create(
+            user=self.user,
+            start_time=start,
+            end_time=start + timedelta(minutes=minutes),
+            status='completed',
+        )
+        CategoryBlock.objects.create(
+            study_session=session, category=self.category, start_time=start, end_time=session.end_time
+        )
+        return session
+
+    def test_enqueues_for_same_day_coalesce(self):
+        for hour in (9, 11, 14):
+            AggregateJobQueue.enqueue_for_session(self.add_session(hour))
+
+        self.assertEqual(AggregateJob.objects.count(), 1)
+        self.assertEqual(AggregateJobQueue.backlog_stats()['pending'], 1)
+
+    def test_worker_recomputes_and_clears_job(self):
+        self.add_session(9)
+        self.add_session(11)
+        AggregateJobQueue.enqueue(self.user, self.date)
+
+        succeeded, failed = AggregateJobQueue.run_pending()
+
+        self.assertEqual((succeeded, failed), (1, 0))
+        self.assertFalse(AggregateJob.objects.exists())
+        self.assertEqual(DailyAggregate.objects.get(user=self.user, date=self.date).session_count, 2)
+
+    def test_change_during_run_requeues_job(self):
+        AggregateJobQueue.enqueue(self.user, self.date)
+        job = AggregateJobQueue.claim()[0]
+
+        AggregateJob.objects.filter(pk=job.pk).update(requested_at=timezone.now() + timedelta(seconds=1))
+        AggregateJobQueue.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+
+    @override_settings(AGGREGATE_JOB_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_stop(self):
+        AggregateJobQueue.enqueue(self.user, self.date)
+
+        with mock.patch.object(SplitAggregateUpdateService, 'update_for_date', side_effect=RuntimeError('boom')):
+            self.assertEqual(AggregateJobQueue.run_pending(), (0, 1))
+            job = AggregateJob.objects.get()
+            self.assertEqual(job.status, 'pending')
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(job.last_error, 'boom')
+
+            AggregateJob.objects.update(run_after=timezone.now())
+            AggregateJobQueue.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(AggregateJobQueue.backlog_stats()['failed'], 1)
+
+        # A new change revives the failed job
+        AggregateJobQueue.enqueue(self.user, self.date)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('pending', 0))
+
+
+@override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+class DeferredSessionEndTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_end_session_enqueues_instead_of_recomputing(self):
+        start = timezone.now() - timedelta(hours=1)
+        session = StudySession.objects.create(user=self.user, start_time=start)
+
+        response = self.client.put(
+            reverse('end-session', args=[session.id]),
+            {'end_time': timezone.now().isoformat(), 'status': 'completed'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AggregateJob.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(DailyAggregate.objects.filter(user=self.user).exists())
+
+
+@override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+class ReadThroughInsightsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.date = datetime(2025, 3, 10).date()
+        start = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+        self.session = StudySession.objects.create(
+            user=self.user, start_time=start, end_time=start + timedelta(minutes=30), status='completed'
+        )
+        AggregateJobQueue.request_update(self.session)
+
+    def test_daily_read_recomputes_dirty_day(self):
+        response = self.client.get(reverse('daily-insights'), {'date': '2025-03-10'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_stale'])
+        self.assertEqual(response.json()['aggregate']['session_count'], 1)
+        self.assertFalse(AggregateJob.objects.exists())
+
+    def test_weekly_read_recomputes_dirty_days_in_range(self):
+        response = self.client.get(
+            reverse('weekly-insights'), {'start_date': '2025-03-10', 'end_date': '2025-03-16'}
+        )
+
+        self.assertFalse(response.json()['is_stale'])
+        self.assertEqual(response.json()['aggregate']['session_count'], 1)
+
+    @override_settings(AGGREGATE_STALE_WHILE_REVALIDATE=True)
+    def test_stale_while_revalidate_serves_then_refreshes_in_background(self):
+        with mock.patch('analytics.services.aggregate_job_queue.threading.Thread') as thread:
+            response = self.client.get(reverse('daily-insights'), {'date': '2025-03-10'})
+
+        self.assertTrue(response.json()['is_stale'])
+        thread.return_value.start.assert_called_once()
+        self.assertFalse(DailyAggregate.objects.filter(user=self.user).exists())
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=False)
+    def test_failed_inline_update_leaves_day_dirty(self):
+        AggregateJob.objects.all().delete()
+
+        with mock.patch.object(SplitAggregateUpdateService, 'update_for_date', side_effect=RuntimeError('boom')):
+            AggregateJobQueue.request_update(self.session)
+
+        self.assertTrue(AggregateJobQueue.is_dirty(self.user, self.date, self.date))
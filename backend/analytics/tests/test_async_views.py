@@ -0,0 +1,127 @@
+"""
+Async Read View Tests
+
+Focus: Async (ASGI) versions of the insights, category and goal read endpoints
+Scope: Native async read paths and hand-off to the sync views
+
+Key Testing Areas:
+1. Async insights responses match the sync views byte for byte, ETag included
+2. Cache hits cost only the token's user lookup
+3. Dirty periods, field selection and auth failures are answered by the sync view
+4. Category and goal reads match the sync views and still create the break category
+"""
+
+import json
+from datetime import date
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from analytics.models import Categories
+from analytics.services.insights_cache import InsightsCache
+from analytics.tests.test_insights_cache import InsightsTestMixin
+from analytics.views.async_api import (
+    AsyncDailyInsights, AsyncWeeklyInsights, AsyncCategoryList, AsyncBreakCategory,
+    AsyncWeeklyGoalView, AsyncHasGoalsView,
+)
+
+
+class AsyncViewTestMixin(InsightsTestMixin):
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def async_get(self, view_class, params=None, headers=None):
+        request = self.factory.get('/', params or {}, headers=self.headers if headers is None else headers)
+        return await view_class.as_view()(request)
+
+    @staticmethod
+    def data(response):
+        return json.loads(response.content)
+
+
+class AsyncInsightsTest(AsyncViewTestMixin, TestCase):
+    async def test_daily_matches_sync_view(self):
+        await sync_to_async(self.end_session)(await sync_to_async(self.start_session)(9))
+        expected = await sync_to_async(self.daily)()
+        # Drop the cached body but keep the data version, so the ETag must match too
+        await cache.adelete(await sync_to_async(InsightsCache.key)(self.user, 'daily', date(2025, 3, 10), 'all:v1'))
+
+        response = await self.async_get(AsyncDailyInsights, {'date': '2025-03-10'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+    async def test_weekly_matches_sync_view(self):
+        await sync_to_async(self.end_session)(await sync_to_async(self.start_session)(9))
+        params = {'start_date': '2025-03-10', 'end_date': '2025-03-16'}
+        expected = await sync_to_async(self.client.get)(reverse('weekly-insights'), params)
+        await cache.aclear()
+
+        response = await self.async_get(AsyncWeeklyInsights, params)
+
+        self.assertEqual(response.content, expected.content)
+
+    def test_cache_hit_only_looks_up_user(self):
+        self.end_session(self.start_session(9))
+        self.daily()
+
+        # The user and their insights version
+        with self.assertNumQueries(2):
+            response = async_to_sync(self.async_get)(AsyncDailyInsights, {'date': '2025-03-10'})
+
+        self.assertEqual(response.status_code, 200)
+
+    async def test_dirty_day_is_recomputed(self):
+        await sync_to_async(self.end_session)(await sync_to_async(self.start_session)(9))
+
+        response = await self.async_get(AsyncDailyInsights, {'date': '2025-03-10'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.data(response)['aggregate']['session_count'], 1)
+
+    async def test_field_selection_uses_sync_view(self):
+        await sync_to_async(self.end_session)(await sync_to_async(self.start_session)(9))
+        params = {'date': '2025-03-10', 'fields': 'aggregate'}
+        expected = await sync_to_async(self.client.get)(reverse('daily-insights'), params)
+
+        response = await self.async_get(AsyncDailyInsights, params)
+
+        self.assertEqual(self.data(response), expected.json())
+
+    async def test_missing_token_is_rejected(self):
+        response = await self.async_get(AsyncDailyInsights, {'date': '2025-03-10'}, headers={})
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_invalid_date_is_rejected(self):
+        response = await self.async_get(AsyncDailyInsights, {'date': 'tomorrow'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncCategoryAndGoalTest(AsyncViewTestMixin, TestCase):
+    async def test_category_list_matches_sync_view(self):
+        response = await self.async_get(AsyncCategoryList)
+        expected = await sync_to_async(self.client.get)(reverse('category-list'))
+
+        self.assertEqual(self.data(response), expected.json())
+        self.assertEqual(self.data(response), [{'id': self.category.id, 'name': 'Math', 'color': '#5A4FCF'}])
+
+    async def test_break_category_is_created_on_first_read(self):
+        response = await self.async_get(AsyncBreakCategory)
+
+        break_category = await Categories.objects.aget(user=self.user, category_type='break')
+        self.assertEqual(self.data(response)['id'], break_category.id)
+
+    async def test_goal_reads(self):
+        has_goals = await self.async_get(AsyncHasGoalsView)
+        goal = await self.async_get(AsyncWeeklyGoalView, {'week_start': '2025-03-12'})
+
+        self.assertEqual(self.data(has_goals), {'has_goals': False})
+        self.assertEqual(goal.status_code, 404)
@@ -0,0 +1,80 @@
+"""
+Batch Insights Tests
+
+Focus: Multi-period insights endpoint used while swiping through history
+Scope: Gap filling, period normalization, query count independent of period count
+
+Key Testing Areas:
+1. Every requested period is returned, with zeroed payloads for empty ones
+2. Weekly and monthly dates are normalized to their period start
+3. The number of queries does not grow with the number of periods
+4. Invalid or oversized requests are rejected
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from analytics.tests.test_insights_cache import InsightsTestMixin
+
+
+class BatchInsightsTest(InsightsTestMixin, TestCase):
+    def batch(self, **params):
+        return self.client.get(reverse('batch-insights'), params)
+
+    def test_daily_range_fills_gaps(self):
+        self.end_session(self.start_session(9))
+
+        response = self.batch(timeframe='daily', start_date='2025-03-09', end_date='2025-03-11')
+
+        self.assertEqual(response.status_code, 200)
+        periods = {str(period['period_start']): period for period in response.data['periods']}
+        self.assertEqual(list(periods), ['2025-03-09', '2025-03-10', '2025-03-11'])
+        self.assertEqual(periods['2025-03-10']['aggregate']['total_duration'], 1800)
+        self.assertEqual(periods['2025-03-09']['aggregate']['total_duration'], 0)
+        self.assertEqual(periods['2025-03-11']['timeline_data'], [])
+        self.assertEqual(len(response.data['category_metadata']), 1)
+
+    def test_single_day_matches_daily_endpoint(self):
+        self.end_session(self.start_session(9))
+
+        batch = self.batch(timeframe='daily', dates='2025-03-10')
+        daily = self.daily()
+
+        self.assertEqual(batch.data['periods'][0]['aggregate'], daily.json()['aggregate'])
+        self.assertEqual(batch.data['periods'][0]['timeline_data'], daily.json()['timeline_data'])
+
+    def test_weekly_and_monthly_dates_are_normalized(self):
+        self.end_session(self.start_session(9))
+
+        weekly = self.batch(timeframe='weekly', dates='2025-03-12,2025-03-10,2025-03-17')
+        monthly = self.batch(timeframe='monthly', start_date='2025-02-15', end_date='2025-03-20')
+
+        self.assertEqual([str(p['period_start']) for p in weekly.data['periods']], ['2025-03-10', '2025-03-17'])
+        self.assertEqual(weekly.data['periods'][0]['aggregate']['total_duration'], 1800)
+        self.assertEqual(weekly.data['periods'][1]['daily_breakdown']['MO'], {'total': 0, 'categories': {}})
+        self.assertEqual([str(p['period_start']) for p in monthly.data['periods']], ['2025-02-01', '2025-03-01'])
+        self.assertEqual(len(monthly.data['periods'][0]['heatmap_data']), 28)
+        self.assertTrue(monthly.data['periods'][0]['monthly_aggregate']['is_final'])
+
+    def test_query_count_does_not_grow_with_periods(self):
+        self.end_session(self.start_session(9))
+        self.batch(timeframe='daily', start_date='2025-03-10', end_date='2025-03-10')
+
+        with CaptureQueriesContext(connection) as short:
+            self.batch(timeframe='daily', start_date='2025-03-09', end_date='2025-03-11')
+        with CaptureQueriesContext(connection) as long:
+            self.batch(timeframe='daily', start_date='2025-03-01', end_date='2025-03-31')
+
+        self.assertEqual(len(long), len(short))
+
+    def test_rejects_bad_requests(self):
+        self.assertEqual(self.batch(timeframe='yearly', dates='2025-03-10').status_code, 400)
+        self.assertEqual(self.batch(timeframe='daily', dates='2025-03-10,nope').status_code, 400)
+        self.assertEqual(self.batch(timeframe='daily', dates='2025-02-30').status_code, 400)
+        self.assertEqual(self.batch(timeframe='daily', start_date='2025-02-30', end_date='2025-03-10').status_code, 400)
+        self.assertEqual(self.batch(timeframe='daily', start_date='2025-03-10').status_code, 400)
+        self.assertEqual(
+            self.batch(timeframe='daily', start_date='2025-01-01', end_date='2025-12-31').status_code, 400
+        )
@@ -0,0 +1,92 @@
+"""
+Period Comparison Tests
+
+Focus: Period-over-period deltas served from aggregates
+Scope: Previous-period and year-over-year comparisons for weeks and months
+
+Key Testing Areas:
+1. Deltas and percentages for totals, sessions and flow score
+2. Per-category changes, including categories only present in one period
+3. Periods without an aggregate compare as zero with no percentage
+4. Comparisons read aggregates only, never raw sessions
+"""
+
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import CustomUser, MonthlyAggregate, WeeklyAggregate
+
+
+class CompareInsightsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def compare(self, **params):
+        return self.client.get(reverse('compare-insights'), params)
+
+    def test_week_over_week(self):
+        WeeklyAggregate.objects.create(
+            user=self.user, week_start=date(2025, 3, 3), total_duration=3600, session_count=2,
+            flow_score=400.0, category_durations={'Math': 3600},
+        )
+        WeeklyAggregate.objects.create(
+            user=self.user, week_start=date(2025, 3, 10), total_duration=5400, session_count=3,
+            flow_score=500.0, category_durations={'Math': 1800, 'Physics': 3600},
+        )
+
+        response = self.compare(timeframe='weekly', date='2025-03-12')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['current']['period_start'], date(2025, 3, 10))
+        self.assertEqual(data['baseline']['period_start'], date(2025, 3, 3))
+        self.assertEqual(data['deltas']['total_duration'], {'change': 1800, 'percent_change': 50.0})
+        self.assertEqual(data['deltas']['session_count'], {'change': 1, 'percent_change': 50.0})
+        self.assertEqual(data['deltas']['flow_score'], {'change': 100.0, 'percent_change': 25.0})
+        self.assertEqual(data['category_deltas'], [
+            {'category': 'Physics', 'current': 3600, 'baseline': 0, 'change': 3600, 'percent_change': None},
+            {'category': 'Math', 'current': 1800, 'baseline': 3600, 'change': -1800, 'percent_change': -50.0},
+        ])
+
+    def test_month_against_last_year(self):
+        MonthlyAggregate.objects.create(
+            user=self.user, month_start=date(2024, 3, 1), total_duration=7200, session_count=4,
+        )
+        MonthlyAggregate.objects.create(
+            user=self.user, month_start=date(2025, 3, 1), total_duration=3600, session_count=2,
+        )
+
+        response = self.compare(timeframe='monthly', date='2025-03-20', against='last_year')
+
+        self.assertEqual(response.data['baseline']['period_start'], date(2024, 3, 1))
+        self.assertEqual(response.data['deltas']['total_duration'], {'change': -3600, 'percent_change': -50.0})
+
+    def test_missing_baseline_compares_as_zero(self):
+        WeeklyAggregate.objects.create(user=self.user, week_start=date(2025, 3, 10), total_duration=1200)
+
+        response = self.compare(timeframe='weekly', date='2025-03-10')
+
+        self.assertEqual(response.data['baseline']['total_duration'], 0)
+        self.assertEqual(response.data['deltas']['total_duration'], {'change': 1200, 'percent_change': None})
+        self.assertEqual(response.data['deltas']['flow_score'], {'change': None, 'percent_change': None})
+
+    def test_reads_aggregates_only(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.compare(timeframe='monthly', date='2025-03-20', against='last_year')
+
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('analytics_studysession', sql)
+        self.assertEqual(sql.count('FROM "analytics_monthlyaggregate"'), 1)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.compare(timeframe='yearly').status_code, 400)
+        self.assertEqual(self.compare(timeframe='weekly', against='tomorrow').status_code, 400)
+        self.assertEqual(self.compare(timeframe='weekly', date='March').status_code, 400)
+        self.assertEqual(self.compare(timeframe='weekly', date='2025-02-30').status_code, 400)
@@ -0,0 +1,95 @@
+"""
+Dashboard API Tests
+
+Focus: Single-request app bootstrap payload
+Scope: Response contents and a fixed query budget
+
+Key Testing Areas:
+1. One response carries profile, categories, insights, goal and cleanup results
+2. Hanging sessions are closed as part of the bootstrap
+3. The query count is fixed and does not grow with the user's history
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import CustomUser, Categories, CategoryBlock, StudySession
+from analytics.services.date_utils import get_user_today, get_week_boundaries
+from analytics.services.goal_service import GoalService
+from analytics.utils import ensure_break_category
+
+
+class DashboardApiTest(TestCase):
+    def setUp(self):
+        # Midday on a Wednesday, so the fixtures never straddle a day or week boundary
+        self.now = datetime(2025, 3, 12, 12, 0, tzinfo=dt_timezone.utc)
+        patcher = mock.patch('django.utils.timezone.now', return_value=self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.category = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        ensure_break_category(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def study(self, start, minutes=20):
+        session = StudySession.objects.create(user=self.user, start_time=start)
+        CategoryBlock.objects.create(study_session=session, category=self.category, start_time=start)
+        self.client.put(
+            reverse('end-session', args=[session.id]),
+            {'end_time': (start + timedelta(minutes=minutes)).isoformat(), 'status': 'completed'},
+            format='json'
+        )
+
+    def dashboard(self):
+        return self.client.get(reverse('dashboard'))
+
+    def test_returns_everything_needed_on_launch(self):
+        today = get_user_today(self.user)
+        GoalService.create_or_update_weekly_goal(
+            user=self.user, week_start=get_week_boundaries(today)[0], total_minutes=300,
+            active_weekdays=list(range(7)), carry_over_enabled=False
+        )
+        self.study(self.now - timedelta(minutes=21))
+
+        response = self.dashboard()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['profile']['username'], 'student')
+        self.assertEqual([c['name'] for c in response.data['categories']], ['Math'])
+        self.assertEqual(response.data['break_category']['name'], 'Break')
+        self.assertEqual(response.data['daily_insights']['aggregate']['total_duration'], 1200)
+        self.assertEqual(response.data['weekly_insights']['aggregate']['total_duration'], 1200)
+        self.assertEqual(response.data['weekly_goal']['total_minutes'], 300)
+        self.assertTrue(response.data['has_goals'])
+
+    def test_closes_hanging_sessions(self):
+        StudySession.objects.create(user=self.user, start_time=self.now - timedelta(hours=3))
+
+        response = self.dashboard()
+
+        self.assertEqual(response.data['cleanup']['cleaned_sessions'], 1)
+        self.assertFalse(StudySession.objects.filter(user=self.user, status='active').exists())
+
+    def test_query_count_is_fixed(self):
+        self.study(self.now - timedelta(minutes=21))
+        self.dashboard()
+
+        # Categories, dirty-day check, daily and weekly aggregates, lifetime flow
+        # stats, current goal, has-goals; no hanging sessions, so no cleanup query
+        with self.assertNumQueries(7):
+            self.dashboard()
+
+        # More history must not change the budget
+        for days_ago in range(1, 6):
+            self.study(self.now - timedelta(days=days_ago))
+        self.dashboard()
+
+        with self.assertNumQueries(7):
+            self.dashboard()
@@ -0,0 +1,132 @@
+"""
+Hanging Session Sweep Tests
+
+Focus: Closing sessions the app never ended, off the launch path
+Scope: HangingSessionService, the sweep_hanging_sessions command and the cleanup endpoint
+
+Key Testing Areas:
+1. The per-user open-session marker follows sessions being started and ended
+2. The sweep closes hanging sessions and orphaned blocks for every user with set-based writes
+   (the periodic command only once sessions without heartbeats have been open for hours)
+3. Affected days are queued for an aggregate refresh
+4. The cleanup endpoint costs no query unless the marker shows a hanging session
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import AggregateJob, Categories, CategoryBlock, CustomUser, StudySession
+from analytics.services.hanging_session_service import HangingSessionService
+
+
+class HangingSessionTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.category = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.now = timezone.now()
+
+    def open_session(self, user, start):
+        session = StudySession.objects.create(user=user, start_time=start)
+        CategoryBlock.objects.create(study_session=session, category=self.category, start_time=start)
+        return session
+
+    def marker(self, user):
+        return CustomUser.objects.get(pk=user.pk).open_session_since
+
+    def test_marker_tracks_earliest_open_session(self):
+        earlier = self.now - timedelta(minutes=30)
+        later = self.now - timedelta(minutes=10)
+
+        self.open_session(self.user, later)
+        first = self.open_session(self.user, earlier)
+        self.assertEqual(self.marker(self.user), earlier)
+
+        self.client.put(
+            reverse('end-session', args=[first.id]),
+            {'end_time': self.now.isoformat(), 'status': 'completed'},
+            format='json'
+        )
+        self.assertEqual(self.marker(self.user), later)
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_sweep_closes_sessions_for_all_users(self):
+        other = CustomUser.objects.create_user(username='other', password='testpass123', timezone='America/New_York')
+        start = datetime(2025, 3, 11, 2, 0, tzinfo=dt_timezone.utc)  # Still March 10th in New York
+        mine = self.open_session(self.user, start)
+        theirs = self.open_session(other, start)
+        recent = self.open_session(self.user, self.now - timedelta(minutes=10))
+
+        sessions, blocks = HangingSessionService.sweep()
+
+        self.assertEqual((sessions, blocks), (2, 0))
+        for session in (mine, theirs):
+            session.refresh_from_db()
+            self.assertEqual(session.status, 'cancelled')
+            self.assertEqual(session.end_time, start + timedelta(hours=1))
+            self.assertEqual(session.total_duration, 3600)
+            block = session.categoryblock_set.get()
+            self.assertEqual(block.end_time, start + timedelta(hours=1))
+            self.assertEqual(block.duration, 3600)
+        self.assertEqual(mine.local_date, date(2025, 3, 11))
+        self.assertEqual(theirs.local_date, date(2025, 3, 10))
+        self.assertEqual(StudySession.objects.get(pk=recent.pk).status, 'active')
+        self.assertEqual(
+            set(AggregateJob.objects.values_list('user_id', 'date')),
+            {(self.user.id, date(2025, 3, 11)), (other.id, date(2025, 3, 10))}
+        )
+        # Markers move on to what is still open
+        self.assertEqual(self.marker(self.user), recent.start_time)
+        self.assertIsNone(self.marker(other))
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_sweep_closes_orphaned_blocks(self):
+        start = self.now - timedelta(hours=3)
+        session = StudySession.objects.create(
+            user=self.user, start_time=start, end_time=start + timedelta(minutes=40), status='completed'
+        )
+        block = CategoryBlock.objects.create(study_session=session, category=self.category, start_time=start)
+
+        call_command('sweep_hanging_sessions', stdout=StringIO())
+
+        block.refresh_from_db()
+        self.assertEqual(block.end_time, session.end_time)
+        self.assertEqual(block.duration, 2400)
+        self.assertTrue(AggregateJob.objects.filter(user=self.user, date=session.local_date).exists())
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_periodic_sweep_waits_longer_for_sessions_without_heartbeats(self):
+        long_running = self.open_session(self.user, self.now - timedelta(minutes=90))
+        abandoned = self.open_session(self.user, self.now - timedelta(hours=13))
+
+        call_command('sweep_hanging_sessions', stdout=StringIO())
+
+        self.assertEqual(StudySession.objects.get(pk=long_running.pk).status, 'active')
+        self.assertEqual(StudySession.objects.get(pk=abandoned.pk).status, 'cancelled')
+        self.assertEqual(self.marker(self.user), long_running.start_time)
+
+    def test_cleanup_endpoint_is_free_without_hanging_sessions(self):
+        self.open_session(self.user, self.now - timedelta(minutes=10))
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('cleanup-hanging-sessions'))
+
+        self.assertEqual(response.data['total_cleaned'], 0)
+
+    def test_cleanup_endpoint_sweeps_only_requesting_user(self):
+        other = CustomUser.objects.create_user(username='other', password='testpass123')
+        self.open_session(self.user, self.now - timedelta(hours=3))
+        theirs = self.open_session(other, self.now - timedelta(hours=3))
+
+        response = self.client.post(reverse('cleanup-hanging-sessions'))
+
+        self.assertEqual(response.data['cleaned_sessions'], 1)
+        self.assertIsNone(self.user.open_session_since)
+        self.assertEqual(StudySession.objects.get(pk=theirs.pk).status, 'active')
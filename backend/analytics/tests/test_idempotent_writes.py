@@ -0,0 +1,141 @@
+"""
+Idempotent Write Tests
+
+Focus: Client-generated UUIDs on sessions and category blocks
+Scope: Create endpoints and offline sync retries
+
+Key Testing Areas:
+1. Retrying create-session or create-category-block returns the first attempt's row
+2. client_uuids are scoped per user and per session
+3. Replaying a sync batch writes nothing new and returns the same ids
+4. Requests without a client_uuid behave as before
+5. client_uuid and local_date can't be set or changed by later requests
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import Categories, CategoryBlock, CustomUser, StudySession
+
+
+class IdempotentWriteTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.category = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+
+    def create_session(self, client, client_uuid=None):
+        data = {'start_time': self.start.isoformat()}
+        if client_uuid:
+            data['client_uuid'] = str(client_uuid)
+        return client.post(reverse('create-session'), data, format='json')
+
+    def test_session_retry_returns_existing_row(self):
+        client_uuid = uuid.uuid4()
+
+        first = self.create_session(self.client, client_uuid)
+        retry = self.create_session(self.client, client_uuid)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(StudySession.objects.count(), 1)
+
+    def test_session_uuid_is_per_user(self):
+        other = CustomUser.objects.create_user(username='other', password='testpass123')
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        client_uuid = uuid.uuid4()
+
+        mine = self.create_session(self.client, client_uuid)
+        theirs = self.create_session(other_client, client_uuid)
+
+        self.assertEqual(theirs.status_code, 201)
+        self.assertNotEqual(theirs.data['id'], mine.data['id'])
+
+    def test_without_uuid_each_request_creates(self):
+        self.create_session(self.client)
+        self.create_session(self.client)
+
+        self.assertEqual(StudySession.objects.count(), 2)
+
+    def test_malformed_uuid_is_rejected(self):
+        self.assertEqual(self.create_session(self.client, 'not-a-uuid').status_code, 400)
+
+    def test_client_cannot_set_local_date_or_change_uuid(self):
+        client_uuid = uuid.uuid4()
+        response = self.client.post(
+            reverse('create-session'),
+            {'start_time': self.start.isoformat(), 'client_uuid': str(client_uuid), 'local_date': '2030-01-01'},
+            format='json'
+        )
+        session = StudySession.objects.get(pk=response.data['id'])
+        self.assertNotEqual(str(session.local_date), '2030-01-01')
+
+        changed = self.client.put(
+            reverse('end-session', args=[session.id]),
+            {'end_time': (self.start + timedelta(hours=1)).isoformat(), 'client_uuid': str(uuid.uuid4())},
+            format='json'
+        )
+        self.assertEqual(changed.status_code, 400)
+        unchanged = self.client.put(
+            reverse('end-session', args=[session.id]),
+            {'end_time': (self.start + timedelta(hours=1)).isoformat(), 'client_uuid': str(client_uuid)},
+            format='json'
+        )
+        self.assertEqual(unchanged.status_code, 200)
+        self.assertEqual(unchanged.data['local_date'], '2025-03-10')
+
+    def test_block_retry_returns_existing_row(self):
+        session_id = self.create_session(self.client).data['id']
+        data = {
+            'study_session': session_id,
+            'category': self.category.id,
+            'start_time': self.start.isoformat(),
+            'client_uuid': str(uuid.uuid4()),
+        }
+
+        first = self.client.post(reverse('create-category-block'), data, format='json')
+        retry = self.client.post(reverse('create-category-block'), data, format='json')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(CategoryBlock.objects.count(), 1)
+
+    def test_sync_replay_writes_nothing_new(self):
+        end = self.start + timedelta(hours=1)
+        batch = {'sessions': [
+            {
+                'client_uuid': str(uuid.uuid4()),
+                'start_time': (self.start + timedelta(hours=offset)).isoformat(),
+                'end_time': (end + timedelta(hours=offset)).isoformat(),
+                'category_blocks': [{
+                    'category': self.category.id,
+                    'start_time': (self.start + timedelta(hours=offset)).isoformat(),
+                    'end_time': (end + timedelta(hours=offset)).isoformat(),
+                }],
+            }
+            for offset in (0, 2)
+        ]}
+
+        first = self.client.post(reverse('session-sync'), batch, format='json')
+        # The replay also carries one session the first attempt never sent
+        batch['sessions'].append({
+            'start_time': (self.start + timedelta(hours=4)).isoformat(),
+            'end_time': (end + timedelta(hours=4)).isoformat(),
+        })
+        replay = self.client.post(reverse('session-sync'), batch, format='json')
+
+        self.assertEqual(replay.status_code, 201)
+        first_ids = [session['id'] for session in first.data['sessions']]
+        replay_ids = [session['id'] for session in replay.data['sessions']]
+        self.assertEqual(replay_ids[:2], first_ids)
+        self.assertEqual(StudySession.objects.count(), 3)
+        self.assertEqual(CategoryBlock.objects.count(), 2)
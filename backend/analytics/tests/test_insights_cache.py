@@ -0,0 +1,141 @@
+"""
+Insights Cache Tests
+
+Focus: Per-user versioned caching of insights payloads
+Scope: Cache hits, invalidation by session and category writes
+
+Key Testing Areas:
+1. A repeated insights request is answered with a single version lookup
+2. Session writes bump the user's version so the next read sees new data, in every process
+3. Category edits invalidate the cached category metadata
+4. One user's writes leave other users' cached payloads alone
+5. Conditional GETs get 304 until the aggregate or the user's data version changes
+"""
+
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import CustomUser, Categories, CategoryBlock, StudySession
+from analytics.services.insights_cache import InsightsCache
+
+
+class InsightsTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.category = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start_session(self, hour):
+        start = datetime(2025, 3, 10, hour, 0, tzinfo=dt_timezone.utc)
+        session = StudySession.objects.create(user=self.user, start_time=start)
+        CategoryBlock.objects.create(study_session=session, category=self.category, start_time=start)
+        return session
+
+    def end_session(self, session, minutes=30):
+        return self.client.put(
+            reverse('end-session', args=[session.id]),
+            {'end_time': (session.start_time + timedelta(minutes=minutes)).isoformat(), 'status': 'completed'},
+            format='json'
+        )
+
+    def daily(self, **headers):
+        return self.client.get(reverse('daily-insights'), {'date': '2025-03-10'}, **headers)
+
+
+class InsightsCacheTest(InsightsTestMixin, TestCase):
+    def test_repeat_request_is_served_from_cache(self):
+        self.end_session(self.start_session(9))
+        first = self.daily()
+
+        # Only the user's data version is read
+        with self.assertNumQueries(1):
+            second = self.daily()
+
+        self.assertEqual(second.json(), first.json())
+
+    def test_session_write_invalidates(self):
+        self.end_session(self.start_session(9))
+        self.assertEqual(self.daily().json()['aggregate']['session_count'], 1)
+
+        self.end_session(self.start_session(11))
+
+        self.assertEqual(self.daily().json()['aggregate']['session_count'], 2)
+
+    def test_category_edit_invalidates(self):
+        self.end_session(self.start_session(9))
+        self.daily()
+
+        self.client.put(
+            reverse('category-detail', args=[self.category.id]),
+            {'name': 'Calculus', 'color': '#5A4FCF'},
+            format='json'
+        )
+
+        self.assertEqual(self.daily().json()['category_metadata'][str(self.category.id)]['name'], 'Calculus')
+
+    def test_bump_is_per_user(self):
+        other = CustomUser.objects.create_user(username='other', password='testpass123')
+        user_key = InsightsCache.key(self.user, 'daily', '2025-03-10')
+        other_key = InsightsCache.key(other, 'daily', '2025-03-10')
+
+        InsightsCache.bump(self.user.id)
+
+        self.assertNotEqual(InsightsCache.key(self.user, 'daily', '2025-03-10'), user_key)
+        self.assertEqual(InsightsCache.key(other, 'daily', '2025-03-10'), other_key)
+
+    def test_version_is_not_held_in_the_cache(self):
+        # Other processes bump the database row, not this process's cache
+        key = InsightsCache.key(self.user, 'daily', '2025-03-10')
+        cache.clear()
+        self.assertEqual(InsightsCache.key(self.user, 'daily', '2025-03-10'), key)
+
+        CustomUser.objects.filter(pk=self.user.pk).update(insights_version=time.time_ns())
+        self.assertNotEqual(InsightsCache.key(self.user, 'daily', '2025-03-10'), key)
+
+
+class ConditionalInsightsTest(InsightsTestMixin, TestCase):
+    def test_if_none_match_returns_304(self):
+        self.end_session(self.start_session(9))
+        etag = self.daily()['ETag']
+
+        response = self.daily(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_304_without_cached_payload_skips_building_it(self):
+        self.end_session(self.start_session(9))
+        etag = self.daily()['ETag']
+        cache.delete(InsightsCache.key(self.user, 'daily', datetime(2025, 3, 10).date(), 'all:v1'))
+
+        # Version, dirty-day check and the last_updated lookup only
+        with self.assertNumQueries(3):
+            response = self.daily(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        self.end_session(self.start_session(9))
+        etag = self.daily()['ETag']
+
+        self.end_session(self.start_session(11))
+        response = self.daily(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_returns_304(self):
+        self.end_session(self.start_session(9))
+        params = {'start_date': '2025-03-10', 'end_date': '2025-03-16'}
+        last_modified = self.client.get(reverse('weekly-insights'), params)['Last-Modified']
+
+        response = self.client.get(reverse('weekly-insights'), params, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,80 @@
+"""
+Sparse Insights Fields Tests
+
+Focus: fields= / exclude= selection on insights payloads
+Scope: Response trimming, column pruning, cache and ETag separation
+
+Key Testing Areas:
+1. Only the requested sections are returned
+2. Unrequested JSON columns are never read from the database
+3. Each field selection is cached and validated separately
+4. Unknown sections and mixing fields with exclude are rejected
+"""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from analytics.tests.test_insights_cache import InsightsTestMixin
+
+
+class InsightsFieldsTest(InsightsTestMixin, TestCase):
+    def monthly(self, **params):
+        return self.client.get(
+            reverse('monthly-insights'), {'start_date': '2025-03-01', 'end_date': '2025-03-31', **params}
+        )
+
+    def test_fields_limits_sections_and_columns(self):
+        self.end_session(self.start_session(9))
+        self.daily()  # Run the deferred aggregate refresh first
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('daily-insights'), {'date': '2025-03-10', 'fields': 'aggregate'})
+
+        self.assertEqual(set(response.json()), {'aggregate', 'is_stale'})
+        self.assertEqual(response.json()['aggregate']['total_duration'], 1800)
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('timeline_data', sql)
+        self.assertNotIn('analytics_categories', sql)
+
+    def test_exclude_drops_heavy_monthly_columns(self):
+        self.end_session(self.start_session(9))
+        self.monthly()  # Run the deferred aggregate refresh first
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.monthly(exclude='heatmap_data,daily_breakdown')
+
+        self.assertEqual(
+            set(response.json()), {'statistics', 'monthly_aggregate', 'category_metadata', 'is_stale'}
+        )
+        self.assertEqual(response.json()['statistics']['total_sessions'], 1)
+        sql = ' '.join(query['sql'] for query in queries if 'monthlyaggregate' in query['sql'])
+        self.assertNotIn('heatmap_data', sql)
+        self.assertNotIn('daily_breakdown', sql)
+
+    def test_selections_are_cached_and_tagged_separately(self):
+        self.end_session(self.start_session(9))
+
+        sparse = self.monthly(fields='statistics')
+        full = self.monthly()
+
+        self.assertNotIn('heatmap_data', sparse.json())
+        self.assertIn('heatmap_data', full.json())
+        self.assertNotEqual(sparse['ETag'], full['ETag'])
+        self.assertEqual(self.monthly(fields='statistics').json(), sparse.json())
+
+    def test_batch_accepts_fields(self):
+        self.end_session(self.start_session(9))
+
+        response = self.client.get(reverse('batch-insights'), {
+            'timeframe': 'daily', 'start_date': '2025-03-09', 'end_date': '2025-03-10', 'fields': 'aggregate',
+        })
+
+        self.assertEqual(set(response.data), {'timeframe', 'periods', 'is_stale'})
+        self.assertEqual(set(response.data['periods'][1]), {'period_start', 'aggregate'})
+        self.assertEqual(response.data['periods'][1]['aggregate']['total_duration'], 1800)
+
+    def test_rejects_unknown_or_conflicting_fields(self):
+        self.assertEqual(self.monthly(fields='timeline_data').status_code, 400)
+        self.assertEqual(self.monthly(fields='statistics', exclude='heatmap_data').status_code, 400)
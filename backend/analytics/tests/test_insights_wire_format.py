@@ -0,0 +1,96 @@
+"""
+Insights Wire Format Tests
+
+Focus: Compact version=2 insights payloads
+Scope: Columnar timelines, dense heatmaps, coexistence with v1
+
+Key Testing Areas:
+1. v2 timelines carry the same sessions, blocks and breaks as v1, as offsets from local midnight
+2. Category indices point into the v2 category list, including for legacy name-only timelines
+3. v2 heatmaps are dense arrays anchored at month_start
+4. v1 stays the default and v1/v2 are cached and tagged separately
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+
+from analytics.models import Break, DailyAggregate
+from analytics.tests.test_insights_cache import InsightsTestMixin
+
+
+class WireFormatTest(InsightsTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.timezone = 'America/New_York'
+        self.user.save()
+
+    def daily_v2(self, **params):
+        return self.client.get(reverse('daily-insights'), {'date': '2025-03-10', 'version': '2', **params})
+
+    def study(self):
+        for hour in (14, 18, 21):
+            session = self.start_session(hour)
+            Break.objects.create(
+                study_session=session,
+                start_time=session.start_time + timedelta(minutes=10),
+                end_time=session.start_time + timedelta(minutes=15),
+            )
+            self.end_session(session)
+
+    def test_timeline_columns_match_v1(self):
+        self.study()
+
+        v1 = self.daily().json()
+        v2 = self.daily_v2().json()
+
+        timeline = v2['timeline_data']
+        # Local midnight on 2025-03-10 in New York is 04:00 UTC
+        midnight = datetime(2025, 3, 10, 4, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(timeline['day_start'], midnight.timestamp())
+        starts = [datetime.fromisoformat(entry['start_time']) for entry in v1['timeline_data']]
+        self.assertEqual(timeline['sessions']['start'], [round((s - midnight).total_seconds()) for s in starts])
+        self.assertEqual(timeline['sessions']['duration'], [1800, 1800, 1800])
+        self.assertEqual(timeline['blocks']['session'], [0, 1, 2])
+        self.assertEqual(timeline['breaks']['duration'], [300, 300, 300])
+        category = v2['category_metadata'][timeline['blocks']['category'][0]]
+        self.assertEqual(category['name'], 'Math')
+        self.assertEqual(v2['aggregate'], v1['aggregate'])
+        self.assertEqual(v2['version'], 2)
+
+    def test_legacy_timeline_maps_categories_by_name(self):
+        self.end_session(self.start_session(14))
+        self.daily()
+        daily = DailyAggregate.objects.get(user=self.user)
+        for entry in daily.timeline_data:
+            for block in entry['category_blocks']:
+                del block['category_id']
+        daily.save()
+
+        v2 = self.daily_v2().json()
+
+        self.assertEqual(v2['category_metadata'][v2['timeline_data']['blocks']['category'][0]]['id'], self.category.id)
+
+    def test_dense_heatmap(self):
+        self.end_session(self.start_session(14))
+
+        v2 = self.client.get(
+            reverse('monthly-insights'), {'start_date': '2025-03-01', 'end_date': '2025-03-31', 'version': '2'}
+        ).json()
+
+        self.assertEqual(v2['heatmap_data']['month_start'], '2025-03-01')
+        self.assertEqual(len(v2['heatmap_data']['hours']), 31)
+        self.assertEqual(v2['heatmap_data']['hours'][9], 0.5)
+
+    def test_v2_is_smaller_and_separately_cached(self):
+        self.study()
+
+        v1 = self.daily()
+        v2 = self.daily_v2()
+
+        self.assertNotIn('version', v1.json())
+        self.assertLess(len(v2.content), len(v1.content))
+        self.assertNotEqual(v1['ETag'], v2['ETag'])
+        self.assertEqual(self.daily_v2().content, v2.content)
+        self.assertEqual(self.daily_v2(version='3').status_code, 400)
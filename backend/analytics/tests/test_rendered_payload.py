@@ -0,0 +1,87 @@
+"""
+Pre-rendered Insights Payload Tests
+
+Focus: JSON payload bytes stored with each aggregate
+Scope: Rendering on write, splicing on read, gzip delivery, invalidation
+
+Key Testing Areas:
+1. Every aggregate write stores the payload it would otherwise be rendered into
+2. Full insights reads never load the aggregate's JSON columns
+3. Clients accepting gzip get the cached pre-compressed body with a weak ETag
+4. Finalizing clears the stored payload so is_final is re-rendered on next read
+"""
+
+import gzip
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from analytics.models import DailyAggregate, MonthlyAggregate
+from analytics.services.insights_payload import render_json, daily_aggregate_payload
+from analytics.services.split_aggregate_service import SplitAggregateUpdateService
+from analytics.tests.test_insights_cache import InsightsTestMixin
+
+
+class RenderedPayloadTest(InsightsTestMixin, TestCase):
+    def test_writes_store_rendered_payload(self):
+        self.end_session(self.start_session(9))
+        self.daily()
+
+        daily = DailyAggregate.objects.get(user=self.user, date=date(2025, 3, 10))
+        self.assertEqual(bytes(daily.rendered_payload), render_json(daily_aggregate_payload(daily)))
+
+        # Bulk rebuilds bypass save() and render explicitly
+        DailyAggregate.objects.update(rendered_payload=None)
+        SplitAggregateUpdateService.rebuild_user_month(self.user.id, date(2025, 3, 1))
+        self.assertIsNotNone(DailyAggregate.objects.get(user=self.user).rendered_payload)
+
+    def test_full_read_skips_json_columns(self):
+        self.end_session(self.start_session(9))
+        expected = self.daily().json()
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.daily()
+
+        self.assertEqual(response.json(), expected)
+        self.assertEqual(response.json()['aggregate']['total_duration'], 1800)
+        aggregate_sql = [query['sql'] for query in queries if 'analytics_dailyaggregate' in query['sql']]
+        self.assertTrue(aggregate_sql)
+        for sql in aggregate_sql:
+            self.assertNotIn('timeline_data', sql)
+
+    @override_settings(INSIGHTS_GZIP_MIN_BYTES=0)
+    def test_gzip_clients_get_precompressed_body(self):
+        self.end_session(self.start_session(9))
+        plain = self.daily()
+
+        compressed = self.daily(HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(compressed['ETag'], 'W/' + plain['ETag'])
+        self.assertIn('Accept-Encoding', compressed['Vary'])
+        revalidated = self.daily(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_finalize_rerenders_is_final(self):
+        self.end_session(self.start_session(9))
+        self.daily()
+        # As if written while the month was still running
+        for model in (DailyAggregate, MonthlyAggregate):
+            aggregate = model.objects.get(user=self.user)
+            aggregate.is_final = False
+            aggregate.save()
+        cache.clear()
+        self.assertFalse(self.daily().json()['aggregate']['is_final'])
+
+        call_command('finalize_aggregates', stdout=StringIO())
+
+        self.assertIsNone(MonthlyAggregate.objects.get(user=self.user).rendered_payload)
+        self.assertTrue(self.daily().json()['aggregate']['is_final'])
+        self.assertIsNotNone(DailyAggregate.objects.get(user=self.user).rendered_payload)
@@ -0,0 +1,155 @@
+"""
+Session Completion Pipeline Tests
+
+Focus: Ending a study session in one transaction with a fixed number of queries
+Scope: EndStudySession through SessionCompletionService
+
+Key Testing Areas:
+1. Open category blocks are closed in one UPDATE with their durations
+2. The flow score is computed before the session's single write and matches calculate_flow_score
+3. The query count is pinned and does not grow with the number of blocks
+4. Aggregates and goal progress are updated in the same transaction
+5. A corrected start_time moves the session to its new local day in the aggregates
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import Break, Categories, CategoryBlock, CustomUser, DailyAggregate, StudySession, WeeklyGoal
+
+# Session load, blocks+categories, breaks, block UPDATE, session UPDATE, open-session
+# marker UPDATE, job upsert (2), insights version bump, goal lookup in its savepoint (3),
+# transaction begin/end (2)
+DEFERRED_COMPLETION_QUERIES = 14
+# The same up to the session write, then the user row lock taken before any aggregate row,
+# the daily/weekly/monthly deltas, category facts, lifetime stats and daily cumulative,
+# goal progress, each in a savepoint, and the insights version bump
+INLINE_COMPLETION_QUERIES = 39
+
+
+class SessionCompletionTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.math = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.physics = Categories.objects.create(user=self.user, name='Physics', color='#4F9DDE')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.day_start = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+
+    def start_session(self, hour, blocks=2):
+        start = self.day_start + timedelta(hours=hour)
+        session = StudySession.objects.create(user=self.user, start_time=start)
+        for index in range(blocks):
+            CategoryBlock.objects.create(
+                study_session=session,
+                category=self.math if index % 2 == 0 else self.physics,
+                start_time=start + timedelta(minutes=10 * index),
+                # All but the last block were closed on subject switches
+                end_time=start + timedelta(minutes=10 * (index + 1)) if index < blocks - 1 else None,
+            )
+        Break.objects.create(study_session=session, start_time=start, end_time=start + timedelta(minutes=2))
+        return session
+
+    def end_session(self, session, minutes=60):
+        return self.client.put(
+            reverse('end-session', args=[session.id]),
+            {
+                'end_time': (session.start_time + timedelta(minutes=minutes)).isoformat(),
+                'status': 'completed',
+                'focus_rating': '4',
+            },
+            format='json'
+        )
+
+    def test_open_blocks_closed_and_flow_score_set(self):
+        session = self.start_session(0, blocks=3)
+
+        response = self.end_session(session)
+
+        self.assertEqual(response.status_code, 200)
+        last_block = CategoryBlock.objects.get(study_session=session, start_time=session.start_time + timedelta(minutes=20))
+        self.assertEqual(last_block.end_time, session.start_time + timedelta(minutes=60))
+        self.assertEqual(last_block.duration, 2400)
+        session.refresh_from_db()
+        self.assertEqual(session.total_duration, 3600)
+        self.assertIsNotNone(session.flow_score)
+        self.assertEqual(response.data['flow_score'], session.flow_score)
+        self.assertEqual(session.calculate_flow_score(), response.data['flow_score'])
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_deferred_completion_query_count(self):
+        # A job already queued for the day, as for every session after the first
+        self.end_session(self.start_session(0))
+        few_blocks = self.start_session(2, blocks=2)
+        many_blocks = self.start_session(4, blocks=6)
+
+        with self.assertNumQueries(DEFERRED_COMPLETION_QUERIES):
+            self.end_session(few_blocks)
+        with self.assertNumQueries(DEFERRED_COMPLETION_QUERIES):
+            self.end_session(many_blocks)
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=False)
+    def test_inline_completion_query_count(self):
+        # The day's aggregates exist, so later sessions are applied as deltas
+        self.end_session(self.start_session(0))
+        few_blocks = self.start_session(2, blocks=2)
+        many_blocks = self.start_session(4, blocks=6)
+
+        with self.assertNumQueries(INLINE_COMPLETION_QUERIES):
+            self.end_session(few_blocks)
+        with self.assertNumQueries(INLINE_COMPLETION_QUERIES):
+            self.end_session(many_blocks)
+
+        daily = DailyAggregate.objects.get(user=self.user, date=date(2025, 3, 10))
+        self.assertEqual(daily.session_count, 3)
+        self.assertEqual(daily.total_duration, 3 * 3600)
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=False)
+    def test_goal_progress_in_same_transaction(self):
+        goal = WeeklyGoal.objects.create(user=self.user, week_start=date(2025, 3, 10), total_minutes=600)
+
+        session = self.start_session(0)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.end_session(session)
+
+        goal.refresh_from_db()
+        self.assertEqual(goal.accumulated_minutes, 60)
+        # Everything after loading the session runs inside one outer transaction/savepoint
+        statements = [query['sql'] for query in queries][1:]
+        self.assertTrue(statements[0].startswith('SAVEPOINT') or statements[0] == 'BEGIN')
+        self.assertTrue(statements[-1].startswith('RELEASE SAVEPOINT') or statements[-1] == 'COMMIT')
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=False)
+    def test_start_time_moved_across_midnight(self):
+        start = datetime(2025, 3, 10, 23, 30, tzinfo=dt_timezone.utc)
+        session = StudySession.objects.create(user=self.user, start_time=start)
+        CategoryBlock.objects.create(study_session=session, category=self.math, start_time=start)
+        self.end_session(session)
+        self.assertEqual(DailyAggregate.objects.get(user=self.user, date=date(2025, 3, 10)).session_count, 1)
+
+        # The client corrects the start to just after midnight
+        corrected = datetime(2025, 3, 11, 0, 10, tzinfo=dt_timezone.utc)
+        response = self.client.put(
+            reverse('end-session', args=[session.id]),
+            {
+                'start_time': corrected.isoformat(),
+                'end_time': (corrected + timedelta(minutes=50)).isoformat(),
+                'status': 'completed',
+            },
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        session.refresh_from_db()
+        self.assertEqual(session.start_time, corrected)
+        self.assertEqual(session.local_date, date(2025, 3, 11))
+        before = DailyAggregate.objects.get(user=self.user, date=date(2025, 3, 10))
+        self.assertEqual((before.session_count, before.total_duration), (0, 0))
+        after = DailyAggregate.objects.get(user=self.user, date=date(2025, 3, 11))
+        self.assertEqual((after.session_count, after.total_duration), (1, 3000))
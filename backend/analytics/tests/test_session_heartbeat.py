@@ -0,0 +1,156 @@
+"""
+Session Heartbeat Tests
+
+Focus: Live session state kept in the cache and crash detection from missed heartbeats
+Scope: SessionHeartbeat endpoint, LiveSessionService and the sweep_hanging_sessions command
+
+Key Testing Areas:
+1. Heartbeats record block and focus time, writing the session row at most once per interval
+2. Heartbeats for sessions that are not the user's or no longer active, or naming another
+   session's block, are refused
+3. Sessions whose heartbeats stop are completed at the last heartbeat
+4. The one-hour hanging heuristic leaves sessions that send heartbeats alone
+5. The sweeper judges sessions by the persisted heartbeat, not another process's cache
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import Categories, CategoryBlock, CustomUser, StudySession
+from analytics.services.live_session_service import LiveSessionService
+
+
+@override_settings(SESSION_HEARTBEAT_TIMEOUT_SECONDS=120)
+class SessionHeartbeatTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.category = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = timezone.now() - timedelta(hours=2)
+        self.session = StudySession.objects.create(user=self.user, start_time=self.start)
+        self.block = CategoryBlock.objects.create(study_session=self.session, category=self.category, start_time=self.start)
+
+    def heartbeat(self, session_id=None, **data):
+        return self.client.post(
+            reverse('session-heartbeat', args=[session_id or self.session.id]),
+            {'category_block': self.block.id, 'focus_seconds': 600, **data},
+            format='json'
+        )
+
+    def test_heartbeat_records_state_without_writes(self):
+        self.heartbeat()
+
+        # Ownership is known from the cached state after the first heartbeat
+        with self.assertNumQueries(0):
+            response = self.heartbeat(focus_seconds=660)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['category_block_id'], self.block.id)
+        self.assertEqual(response.data['focus_seconds'], 660)
+        self.assertEqual(response.data['timeout_seconds'], 120)
+        self.assertEqual(
+            self.client.get(reverse('session-heartbeat', args=[self.session.id])).data['focus_seconds'],
+            660
+        )
+
+    def test_heartbeat_refused_for_other_users_and_ended_sessions(self):
+        other = CustomUser.objects.create_user(username='other', password='testpass123')
+        theirs = StudySession.objects.create(user=other, start_time=self.start)
+        self.assertEqual(self.heartbeat(theirs.id).status_code, 404)
+
+        self.heartbeat()
+        self.client.put(
+            reverse('end-session', args=[self.session.id]),
+            {'end_time': timezone.now().isoformat(), 'status': 'completed'},
+            format='json'
+        )
+
+        response = self.heartbeat()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'completed')
+
+    def test_heartbeat_refused_once_session_ended_elsewhere(self):
+        # State cached in this process while the sweeper, in another, ended the session
+        LiveSessionService.record_heartbeat(
+            self.session.id, self.user.id, self.block.id, 600, now=timezone.now() - timedelta(minutes=1)
+        )
+        StudySession.objects.filter(pk=self.session.pk).update(status='completed', end_time=timezone.now())
+
+        response = self.heartbeat()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertIsNone(LiveSessionService.get_state(self.session.id))
+
+    def test_malformed_heartbeat_rejected(self):
+        self.assertEqual(self.heartbeat(focus_seconds='soon').status_code, 400)
+        self.assertEqual(self.heartbeat(focus_seconds=-5).status_code, 400)
+
+    def test_block_from_another_session_rejected(self):
+        other_session = StudySession.objects.create(user=self.user, start_time=self.start)
+        other_block = CategoryBlock.objects.create(study_session=other_session, category=self.category, start_time=self.start)
+        self.heartbeat()
+
+        self.assertEqual(self.heartbeat(category_block=other_block.id).status_code, 400)
+        self.assertEqual(LiveSessionService.get_state(self.session.id)['category_block_id'], self.block.id)
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_expired_heartbeat_completes_session_at_last_heartbeat(self):
+        last_heartbeat = timezone.now() - timedelta(minutes=10)
+        LiveSessionService.record_heartbeat(self.session.id, self.user.id, self.block.id, 6000, now=last_heartbeat)
+
+        call_command('sweep_hanging_sessions', stdout=StringIO())
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'completed')
+        self.assertEqual(self.session.end_time, last_heartbeat)
+        self.block.refresh_from_db()
+        self.assertEqual(self.block.end_time, last_heartbeat)
+        self.assertIsNone(LiveSessionService.get_state(self.session.id))
+        self.assertIsNone(CustomUser.objects.get(pk=self.user.pk).open_session_since)
+
+    def test_live_session_outlasts_hanging_heuristic(self):
+        # Two hours in, but still sending heartbeats
+        self.heartbeat()
+
+        call_command('sweep_hanging_sessions', stdout=StringIO())
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'active')
+        self.assertIsNone(self.session.end_time)
+
+    def test_sweeper_does_not_need_the_web_process_cache(self):
+        self.heartbeat()
+        expired = StudySession.objects.create(user=self.user, start_time=self.start)
+        last_heartbeat = timezone.now() - timedelta(minutes=10)
+        LiveSessionService.record_heartbeat(expired.id, self.user.id, now=last_heartbeat)
+        # The sweeper runs in its own process, with its own local-memory cache
+        cache.clear()
+
+        call_command('sweep_hanging_sessions', stdout=StringIO())
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'active')
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'completed')
+        self.assertEqual(expired.end_time, last_heartbeat)
+
+    def test_ninety_minute_session_with_recent_heartbeat_is_left_alone(self):
+        session = StudySession.objects.create(user=self.user, start_time=timezone.now() - timedelta(minutes=90))
+        self.assertEqual(self.heartbeat(session.id, category_block=None).status_code, 200)
+
+        call_command('sweep_hanging_sessions', stdout=StringIO())
+        # The launch-time check uses the shorter one-hour cutoff
+        self.client.post(reverse('cleanup-hanging-sessions'))
+
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'active')
+        self.assertIsNone(session.end_time)
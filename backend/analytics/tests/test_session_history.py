@@ -0,0 +1,105 @@
+"""
+Session History API Tests
+
+Focus: Keyset-paginated session history
+Scope: Cursor pagination, filters, prefetching
+
+Key Testing Areas:
+1. Paging through history returns every session once, newest first, including start_time ties
+2. Status, category, focus rating and duration filters narrow the results
+3. Each page costs the same number of queries however deep it is
+4. Malformed cursors are rejected
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import CustomUser, Categories, CategoryBlock, StudySession, Break
+
+
+class SessionHistoryTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.math = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.physics = Categories.objects.create(user=self.user, name='Physics', color='#4F9DDE')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_session(self, start, minutes=30, category=None, focus_rating=None, status='completed'):
+        session = StudySession.objects.create(
+            user=self.user, start_time=start, end_time=start + timedelta(minutes=minutes),
+            focus_rating=focus_rating, status=status
+        )
+        CategoryBlock.objects.create(
+            study_session=session, category=category or self.math,
+            start_time=start, end_time=start + timedelta(minutes=minutes)
+        )
+        Break.objects.create(study_session=session, start_time=start, end_time=start + timedelta(minutes=1))
+        return session
+
+    def history(self, **params):
+        return self.client.get(reverse('session-history'), params)
+
+    def test_pages_cover_history_once_newest_first(self):
+        base = datetime(2025, 3, 1, 9, 0, tzinfo=dt_timezone.utc)
+        sessions = [self.create_session(base + timedelta(days=day)) for day in range(7)]
+        # Two sessions sharing a start time must both be returned
+        sessions.append(self.create_session(base + timedelta(days=3)))
+
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.history(**params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.data['results'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+
+        expected = sorted(sessions, key=lambda s: (s.start_time, s.id), reverse=True)
+        self.assertEqual([s['id'] for s in seen], [s.id for s in expected])
+        self.assertEqual(seen[0]['category_blocks'][0]['category_name'], 'Math')
+        self.assertEqual(seen[0]['breaks'][0]['duration'], 60)
+
+    def test_filters(self):
+        base = datetime(2025, 3, 1, 9, 0, tzinfo=dt_timezone.utc)
+        short = self.create_session(base, minutes=10, focus_rating='2')
+        physics = self.create_session(base + timedelta(days=1), minutes=60, category=self.physics, focus_rating='5')
+        cancelled = self.create_session(base + timedelta(days=2), status='cancelled')
+
+        def ids(**params):
+            return [s['id'] for s in self.history(**params).data['results']]
+
+        self.assertEqual(ids(status='cancelled'), [cancelled.id])
+        self.assertEqual(ids(category=self.physics.id), [physics.id])
+        self.assertEqual(ids(min_focus=4), [physics.id])
+        self.assertEqual(ids(max_focus=3), [short.id])
+        self.assertEqual(ids(max_duration=900), [short.id])
+        self.assertEqual(ids(min_duration=3000, status='completed'), [physics.id])
+
+    def test_deep_pages_cost_the_same_queries(self):
+        base = datetime(2025, 1, 1, 9, 0, tzinfo=dt_timezone.utc)
+        for day in range(30):
+            self.create_session(base + timedelta(days=day))
+
+        first = self.history(limit=5)
+        cursor = first.data['next_cursor']
+        for _ in range(4):
+            cursor = self.history(limit=5, cursor=cursor).data['next_cursor']
+
+        # Sessions, category blocks with categories, breaks
+        with self.assertNumQueries(3):
+            self.history(limit=5)
+        with self.assertNumQueries(3):
+            self.history(limit=5, cursor=cursor)
+
+    def test_rejects_invalid_params(self):
+        self.assertEqual(self.history(cursor='not-a-cursor').status_code, 400)
+        self.assertEqual(self.history(limit='many').status_code, 400)
+        self.assertEqual(self.history(status='finished').status_code, 400)
@@ -0,0 +1,131 @@
+"""
+Session Sync API Tests
+
+Focus: Bulk upload of sessions recorded offline
+Scope: Validation, bulk inserts, flow scores, aggregate refresh
+
+Key Testing Areas:
+1. Sessions, category blocks and breaks are written with one insert per table
+2. Durations, local dates and flow scores match what the per-call endpoints store
+3. Each affected local date is recomputed once, however many sessions it gained
+4. Batches referencing another user's category or malformed records write nothing
+"""
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import AggregateJob, Break, Categories, CategoryBlock, CustomUser, DailyAggregate, StudySession
+
+
+class SessionSyncTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.math = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.physics = Categories.objects.create(user=self.user, name='Physics', color='#4F9DDE')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def session_data(self, start, minutes=60, **overrides):
+        middle = start + timedelta(minutes=minutes // 2)
+        end = start + timedelta(minutes=minutes)
+        return {
+            'start_time': start.isoformat(),
+            'end_time': end.isoformat(),
+            'focus_rating': '4',
+            'category_blocks': [
+                {'category': self.math.id, 'start_time': start.isoformat(), 'end_time': middle.isoformat()},
+                {'category': self.physics.id, 'start_time': middle.isoformat(), 'end_time': end.isoformat()},
+            ],
+            'breaks': [
+                {'start_time': middle.isoformat(), 'end_time': (middle + timedelta(minutes=5)).isoformat()},
+            ],
+            **overrides,
+        }
+
+    def sync(self, sessions):
+        return self.client.post(reverse('session-sync'), {'sessions': sessions}, format='json')
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_batch_is_bulk_inserted(self):
+        base = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.sync([self.session_data(base + timedelta(hours=hour)) for hour in range(4)])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['sessions']), 4)
+        self.assertEqual(StudySession.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(CategoryBlock.objects.count(), 8)
+        self.assertEqual(Break.objects.count(), 4)
+        for table in ('analytics_studysession', 'analytics_categoryblock', 'analytics_break'):
+            inserts = [query for query in queries if query['sql'].startswith(f'INSERT INTO "{table}"')]
+            self.assertEqual(len(inserts), 1)
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_derived_fields_match_per_call_writes(self):
+        start = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+
+        response = self.sync([self.session_data(start)])
+
+        session = StudySession.objects.get(pk=response.data['sessions'][0]['id'])
+        synced_flow_score = session.flow_score
+        self.assertEqual(session.total_duration, 3600)
+        self.assertEqual(session.local_date, date(2025, 3, 10))
+        self.assertEqual(session.categoryblock_set.get(category=self.math).duration, 1800)
+        self.assertIsNotNone(synced_flow_score)
+        self.assertEqual(session.calculate_flow_score(), synced_flow_score)
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=True)
+    def test_one_recompute_per_local_date(self):
+        monday = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+        tuesday = monday + timedelta(days=1)
+
+        self.sync([
+            self.session_data(monday),
+            self.session_data(monday + timedelta(hours=2)),
+            self.session_data(tuesday),
+            self.session_data(tuesday + timedelta(hours=2), status='cancelled'),
+        ])
+
+        self.assertEqual(
+            sorted(AggregateJob.objects.filter(user=self.user).values_list('date', flat=True)),
+            [date(2025, 3, 10), date(2025, 3, 11)]
+        )
+
+    @override_settings(AGGREGATE_UPDATES_DEFERRED=False)
+    def test_inline_updates_recompute_aggregates(self):
+        monday = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+
+        self.sync([self.session_data(monday), self.session_data(monday + timedelta(hours=2))])
+
+        daily = DailyAggregate.objects.get(user=self.user, date=date(2025, 3, 10))
+        self.assertEqual(daily.session_count, 2)
+        self.assertEqual(daily.total_duration, 7200)
+
+    def test_foreign_category_rejects_batch(self):
+        other = CustomUser.objects.create_user(username='other', password='testpass123')
+        foreign = Categories.objects.create(user=other, name='History', color='#F3C44B')
+        start = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+        data = self.session_data(start)
+        data['category_blocks'][0]['category'] = foreign.id
+
+        response = self.sync([self.session_data(start + timedelta(hours=2)), data])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['categories'], [foreign.id])
+        self.assertFalse(StudySession.objects.exists())
+
+    def test_invalid_records_are_rejected(self):
+        start = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+        data = self.session_data(start)
+        data['breaks'][0]['end_time'] = (start + timedelta(hours=2)).isoformat()
+
+        self.assertEqual(self.sync([data]).status_code, 400)
+        self.assertEqual(self.sync([]).status_code, 400)
+        self.assertEqual(self.sync([self.session_data(start, status='active')]).status_code, 400)
+        self.assertFalse(StudySession.objects.exists())
@@ -0,0 +1,475 @@
+"""
+Split Aggregate Service Tests
+
+Focus: Keeping DailyAggregate/WeeklyAggregate/MonthlyAggregate in sync with sessions
+Scope: Incremental session deltas, daily -> weekly/monthly propagation, full recompute fallback
+
+Key Testing Areas:
+1. A session delta produces the same row as a full recompute
+2. Fallback to a full recompute when a delta can't be applied safely
+3. Weekly and monthly rows patched from daily deltas match a full rebuild
+4. rebuild_aggregates reproduces the same rows and resumes from checkpoints
+5. finalize_aggregates closes periods by each user's local date
+6. Lifetime flow stats kept from deltas match a rebuild from daily rows
+7. Category facts kept from deltas match a recompute and survive renames
+8. Running totals kept from deltas match a rebuild and answer range queries
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from analytics.models import CustomUser, Categories, CategoryBlock, Break, StudySession
+from analytics.models import AggregateJob, DailyAggregate, WeeklyAggregate, MonthlyAggregate, UserFlowStats
+from analytics.models import CategoryDailyFact, DailyCumulative
+from analytics.queries import StudyAnalytics
+from analytics.services.date_utils import get_week_boundaries, get_month_boundaries
+from analytics.services.split_aggregate_service import SplitAggregateUpdateService
+from analytics.services.user_flow_stats_service import UserFlowStatsService
+from analytics.services.daily_cumulative_service import DailyCumulativeService
+
+
+DAILY_FIELDS = [
+    'total_duration', 'session_count', 'break_count', 'category_durations', 'timeline_data',
+    'productivity_score', 'productivity_sessions_count', 'productivity_weighted_sum',
+    'productivity_rated_duration', 'flow_score', 'flow_score_details', 'flow_weighted_sum',
+    'flow_weighted_duration',
+]
+
+PERIOD_FIELDS = ['total_duration', 'session_count', 'break_count', 'category_durations', 'daily_breakdown', 'flow_score', 'flow_score_details']
+
+
+class SplitAggregateTestMixin:
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', password='testpass123')
+        self.math = Categories.objects.create(user=self.user, name='Math', color='#5A4FCF')
+        self.physics = Categories.objects.create(user=self.user, name='Physics', color='#4F9DDE')
+        self.day = datetime(2025, 3, 10, 9, 0, tzinfo=dt_timezone.utc)
+
+    def complete_session(self, start_offset_hours, minutes, category=None, focus_rating='4', flow_score=700, breaks=0):
+        start = self.day + timedelta(hours=start_offset_hours)
+        end = start + timedelta(minutes=minutes)
+        session = StudySession.objects.create(
+            user=self.user,
+            start_time=start,
+            end_time=end,
+            status='completed',
+            focus_rating=focus_rating,
+            flow_score=flow_score,
+        )
+        CategoryBlock.objects.create(
+            study_session=session,
+            category=category or self.math,
+            start_time=start,
+            end_time=end,
+        )
+        for i in range(breaks):
+            break_start = start + timedelta(minutes=i * 5)
+            Break.objects.create(study_session=session, start_time=break_start, end_time=break_start + timedelta(minutes=2))
+        return session
+
+    def daily_snapshot(self, date=None):
+        daily = DailyAggregate.objects.get(user=self.user, date=date or self.day.date())
+        return {field: getattr(daily, field) for field in DAILY_FIELDS}
+
+
+class DailySessionDeltaTest(SplitAggregateTestMixin, TestCase):
+    def test_delta_matches_full_recompute(self):
+        sessions = [
+            self.complete_session(0, 30, focus_rating='4', flow_score=720, breaks=1),
+            self.complete_session(2, 50, category=self.physics, focus_rating='2', flow_score=450),
+            self.complete_session(4, 10, focus_rating='5', flow_score=None),
+        ]
+        for session in sessions:
+            SplitAggregateUpdateService.update_for_session(session)
+        incremental = self.daily_snapshot()
+
+        SplitAggregateUpdateService._update_daily_aggregate(self.user, self.day.date())
+        full = self.daily_snapshot()
+
+        self.assertEqual(incremental, full)
+        self.assertEqual(full['session_count'], 3)
+        self.assertEqual(full['category_durations'], {'Math': 40 * 60, 'Physics': 50 * 60})
+        self.assertEqual([entry['session_id'] for entry in full['timeline_data']], [s.id for s in reversed(sessions)])
+
+    def test_delta_applied_to_existing_row(self):
+        first = self.complete_session(0, 30)
+        SplitAggregateUpdateService.update_for_session(first)
+
+        second = self.complete_session(1, 30)
+        delta = SplitAggregateUpdateService._apply_session_delta(self.user, self.day.date(), second)
+
+        self.assertIsNotNone(delta)
+        self.assertEqual(delta['session_count'], 1)
+        self.assertEqual(delta['total_duration'], 30 * 60)
+        self.assertEqual(self.daily_snapshot()['session_count'], 2)
+
+    def test_already_counted_session_is_not_applied_twice(self):
+        session = self.complete_session(0, 30)
+        SplitAggregateUpdateService.update_for_session(session)
+
+        delta = SplitAggregateUpdateService._apply_session_delta(self.user, self.day.date(), session)
+
+        self.assertIsNone(delta)
+        self.assertEqual(self.daily_snapshot()['session_count'], 1)
+
+    def test_legacy_row_without_running_sums_falls_back(self):
+        first = self.complete_session(0, 30)
+        SplitAggregateUpdateService.update_for_session(first)
+        DailyAggregate.objects.filter(user=self.user).update(flow_weighted_sum=None)
+
+        second = self.complete_session(1, 30)
+        self.assertIsNone(SplitAggregateUpdateService._apply_session_delta(self.user, self.day.date(), second))
+
+        SplitAggregateUpdateService.update_for_session(second)
+        snapshot = self.daily_snapshot()
+        self.assertEqual(snapshot['session_count'], 2)
+        self.assertIsNotNone(snapshot['flow_weighted_sum'])
+
+
+class PeriodDeltaPropagationTest(SplitAggregateTestMixin, TestCase):
+    def period_snapshots(self):
+        date = self.day.date()
+        weekly = WeeklyAggregate.objects.get(user=self.user, week_start=get_week_boundaries(date)[0])
+        monthly = MonthlyAggregate.objects.get(user=self.user, month_start=get_month_boundaries(date)[0])
+        snapshots = (
+            {field: getattr(weekly, field) for field in PERIOD_FIELDS + ['session_times']},
+            {field: getattr(monthly, field) for field in PERIOD_FIELDS + ['heatmap_data']},
+        )
+        # Patched averages are maintained as running sums, so compare them rounded
+        for snapshot in snapshots:
+            if snapshot['flow_score'] is not None:
+                snapshot['flow_score'] = round(snapshot['flow_score'], 6)
+                snapshot['flow_score_details']['avg'] = round(snapshot['flow_score_details']['avg'], 6)
+        return snapshots
+
+    def rebuild_periods(self):
+        date = self.day.date()
+        SplitAggregateUpdateService._update_weekly_aggregate(self.user, *get_week_boundaries(date))
+        SplitAggregateUpdateService._update_monthly_aggregate(self.user, *get_month_boundaries(date))
+
+    def test_patched_periods_match_full_rebuild(self):
+        # Spread sessions over two days of the same week and month
+        sessions = [
+            self.complete_session(0, 30, flow_score=720, breaks=2),
+            self.complete_session(24, 45, category=self.physics, flow_score=480),
+            self.complete_session(26, 20, flow_score=900),
+        ]
+        for session in sessions:
+            SplitAggregateUpdateService.update_for_session(session)
+        patched = self.period_snapshots()
+
+        self.rebuild_periods()
+        rebuilt = self.period_snapshots()
+
+        self.assertEqual(patched, rebuilt)
+        self.assertEqual(rebuilt[0]['session_count'], 3)
+
+    def test_day_recompute_propagates_replacement(self):
+        session = self.complete_session(0, 30, flow_score=720)
+        SplitAggregateUpdateService.update_for_session(session)
+        other_day = self.complete_session(24, 30, flow_score=500)
+        SplitAggregateUpdateService.update_for_session(other_day)
+
+        # Rating edit changes the day's flow score; recompute and propagate
+        StudySession.objects.filter(pk=session.pk).update(flow_score=600)
+        delta = SplitAggregateUpdateService._update_daily_aggregate(self.user, self.day.date())
+        self.assertEqual(delta['session_count'], 0)
+        self.assertEqual(delta['old_flow_score'], 720)
+        SplitAggregateUpdateService._propagate_daily_delta(self.user, delta)
+        patched = self.period_snapshots()
+
+        self.rebuild_periods()
+        self.assertEqual(patched, self.period_snapshots())
+
+    def test_losing_period_extreme_falls_back_to_rebuild(self):
+        low = self.complete_session(0, 30, flow_score=400)
+        SplitAggregateUpdateService.update_for_session(low)
+        SplitAggregateUpdateService.update_for_session(self.complete_session(24, 30, flow_score=800))
+
+        weekly = WeeklyAggregate.objects.get(user=self.user)
+        applied, _, _ = SplitAggregateUpdateService._patch_period_flow_score(weekly.flow_score_details, 400, 900)
+        self.assertFalse(applied)
+
+        StudySession.objects.filter(pk=low.pk).update(flow_score=900)
+        delta = SplitAggregateUpdateService._update_daily_aggregate(self.user, self.day.date())
+        SplitAggregateUpdateService._propagate_daily_delta(self.user, delta)
+
+        weekly.refresh_from_db()
+        self.assertEqual(weekly.flow_score_details['min'], 800)
+        self.assertEqual(weekly.flow_score_details['max'], 900)
+
+
+class RebuildAggregatesCommandTest(SplitAggregateTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'checkpoint.json')
+
+    def rebuild(self, *args):
+        call_command('rebuild_aggregates', '--workers=1', f'--checkpoint={self.checkpoint}', *args, stdout=StringIO())
+
+    def test_rebuild_matches_incremental_updates(self):
+        # The week of Monday 2025-03-31 spills into April
+        self.day = datetime(2025, 3, 31, 9, 0, tzinfo=dt_timezone.utc)
+        sessions = [
+            self.complete_session(0, 30, flow_score=720),
+            self.complete_session(26, 45, category=self.physics, flow_score=480, breaks=1),
+        ]
+        for session in sessions:
+            SplitAggregateUpdateService.update_for_session(session)
+        expected_daily = self.daily_snapshot()
+        expected_weekly = WeeklyAggregate.objects.values('week_start', 'total_duration', 'session_count').get()
+
+        DailyAggregate.objects.all().delete()
+        WeeklyAggregate.objects.all().delete()
+        MonthlyAggregate.objects.all().delete()
+        self.rebuild()
+
+        self.assertEqual(self.daily_snapshot(), expected_daily)
+        self.assertEqual(WeeklyAggregate.objects.values('week_start', 'total_duration', 'session_count').get(), expected_weekly)
+        self.assertEqual(
+            list(MonthlyAggregate.objects.order_by('month_start').values_list('session_count', flat=True)),
+            [1, 1]
+        )
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_from_checkpoint(self):
+        session = self.complete_session(0, 30)
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'run': json.dumps([[], None, None]), 'done': [f'{self.user.id}:2025-03-01']}, f)
+
+        self.rebuild()
+
+        self.assertFalse(DailyAggregate.objects.filter(user=self.user, date=session.start_time.date()).exists())
+
+        self.rebuild('--restart')
+        self.assertTrue(DailyAggregate.objects.filter(user=self.user, date=session.start_time.date()).exists())
+
+
+class SessionLocalDateTest(SplitAggregateTestMixin, TestCase):
+    def test_local_date_uses_user_timezone(self):
+        self.user.timezone = 'America/Los_Angeles'
+        self.user.save()
+        # 03:00 UTC on the 11th is still the evening of the 10th in Los Angeles
+        self.day = datetime(2025, 3, 11, 3, 0, tzinfo=dt_timezone.utc)
+
+        session = self.complete_session(0, 30)
+        SplitAggregateUpdateService.update_for_session(session)
+
+        self.assertEqual(session.local_date, datetime(2025, 3, 10).date())
+        self.assertEqual(self.daily_snapshot(datetime(2025, 3, 10).date())['session_count'], 1)
+
+    def test_backfill_command_fills_missing_dates(self):
+        session = self.complete_session(0, 30)
+        StudySession.objects.filter(pk=session.pk).update(local_date=None)
+
+        call_command('backfill_session_local_dates', stdout=StringIO())
+
+        session.refresh_from_db()
+        self.assertEqual(session.local_date, self.day.date())
+
+
+class FinalizeAggregatesCommandTest(TestCase):
+    def setUp(self):
+        # 12:00 UTC on Tuesday 11 March: already the 12th in Auckland, still the 11th in Los Angeles
+        self.now = datetime(2025, 3, 11, 12, 0, tzinfo=dt_timezone.utc)
+        self.auckland = CustomUser.objects.create_user(username='kiwi', password='testpass123', timezone='Pacific/Auckland')
+        self.los_angeles = CustomUser.objects.create_user(username='angeleno', password='testpass123', timezone='America/Los_Angeles')
+        for user in (self.auckland, self.los_angeles):
+            for day in (10, 11):
+                DailyAggregate.objects.create(user=user, date=datetime(2025, 3, day).date())
+            WeeklyAggregate.objects.create(user=user, week_start=datetime(2025, 3, 3).date())
+            WeeklyAggregate.objects.create(user=user, week_start=datetime(2025, 3, 10).date())
+            MonthlyAggregate.objects.create(user=user, month_start=datetime(2025, 2, 1).date())
+
+    def finalized_days(self, user):
+        return sorted(
+            d.day for d in DailyAggregate.objects.filter(user=user, is_final=True).values_list('date', flat=True)
+        )
+
+    def run_command(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            call_command('finalize_aggregates', batch_size=1, stdout=StringIO())
+
+    def test_finalizes_by_local_date(self):
+        self.run_command()
+
+        self.assertEqual(self.finalized_days(self.auckland), [10, 11])
+        self.assertEqual(self.finalized_days(self.los_angeles), [10])
+        for user in (self.auckland, self.los_angeles):
+            self.assertEqual(
+                list(WeeklyAggregate.objects.filter(user=user, is_final=True).values_list('week_start', flat=True)),
+                [datetime(2025, 3, 3).date()]
+            )
+            self.assertTrue(MonthlyAggregate.objects.get(user=user).is_final)
+
+    def test_dirty_periods_stay_open(self):
+        AggregateJob.objects.create(user=self.los_angeles, date=datetime(2025, 3, 10).date())
+
+        self.run_command()
+
+        self.assertEqual(self.finalized_days(self.los_angeles), [])
+        self.assertTrue(MonthlyAggregate.objects.get(user=self.los_angeles).is_final)
+
+    def test_recompute_uses_user_local_today(self):
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            SplitAggregateUpdateService.update_for_date(self.auckland, datetime(2025, 3, 11).date())
+            SplitAggregateUpdateService.update_for_date(self.los_angeles, datetime(2025, 3, 11).date())
+
+        self.assertTrue(DailyAggregate.objects.get(user=self.auckland, date=datetime(2025, 3, 11).date()).is_final)
+        self.assertFalse(DailyAggregate.objects.get(user=self.los_angeles, date=datetime(2025, 3, 11).date()).is_final)
+
+
+class UserFlowStatsTest(SplitAggregateTestMixin, TestCase):
+    STATS_FIELDS = ['flow_score_count', 'flow_score_min', 'flow_score_max', 'total_duration', 'total_sessions']
+
+    def stats_snapshot(self, stats):
+        snapshot = {field: getattr(stats, field) for field in self.STATS_FIELDS}
+        snapshot['flow_score_sum'] = round(stats.flow_score_sum, 6)
+        return snapshot
+
+    def test_deltas_match_rebuild(self):
+        self.assertIsNone(UserFlowStatsService.get_for_user(self.user).flow_score_avg)
+
+        SplitAggregateUpdateService.update_for_session(self.complete_session(0, 30, flow_score=400))
+        SplitAggregateUpdateService.update_for_session(self.complete_session(24, 45, flow_score=900))
+        low = self.complete_session(48, 30, flow_score=200)
+        SplitAggregateUpdateService.update_for_session(low)
+
+        # The day holding the minimum moves up, so the minimum has to be rescanned
+        StudySession.objects.filter(pk=low.pk).update(flow_score=950)
+        SplitAggregateUpdateService.update_for_date(self.user, low.local_date)
+
+        incremental = self.stats_snapshot(UserFlowStats.objects.get(user=self.user))
+        rebuilt = self.stats_snapshot(UserFlowStatsService.rebuild(self.user))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(incremental['flow_score_count'], 3)
+        self.assertEqual(incremental['total_sessions'], 3)
+
+    def test_built_lazily_from_existing_rows(self):
+        SplitAggregateUpdateService.update_for_session(self.complete_session(0, 30))
+        self.assertFalse(UserFlowStats.objects.filter(user=self.user).exists())
+
+        stats = UserFlowStatsService.get_for_user(self.user)
+
+        daily = DailyAggregate.objects.get(user=self.user)
+        self.assertEqual(stats.flow_score_avg, daily.flow_score)
+        self.assertEqual(stats.total_duration, daily.total_duration)
+
+
+class CategoryDailyFactTest(SplitAggregateTestMixin, TestCase):
+    def facts(self):
+        return sorted(CategoryDailyFact.objects.filter(user=self.user).values_list(
+            'date', 'category_id', 'seconds', 'block_count', 'session_count'
+        ))
+
+    def test_delta_facts_match_full_recompute(self):
+        for session in (
+            self.complete_session(0, 30),
+            self.complete_session(2, 45, category=self.physics),
+            self.complete_session(4, 20),
+            self.complete_session(24, 60, category=self.physics),
+        ):
+            SplitAggregateUpdateService.update_for_session(session)
+        incremental = self.facts()
+
+        for day in {fact[0] for fact in incremental}:
+            SplitAggregateUpdateService.update_for_date(self.user, day)
+
+        self.assertEqual(self.facts(), incremental)
+        self.assertIn((self.day.date(), self.math.id, 50 * 60, 2, 2), incremental)
+
+    def test_range_breakdown_uses_current_category_names(self):
+        SplitAggregateUpdateService.update_for_session(self.complete_session(0, 30))
+        SplitAggregateUpdateService.update_for_session(self.complete_session(24, 30))
+        self.math.name = 'Calculus'
+        self.math.save()
+
+        breakdown = list(StudyAnalytics.get_category_breakdown_in_range(
+            self.user, self.day.date(), self.day.date() + timedelta(days=1)
+        ))
+
+        self.assertEqual(len(breakdown), 1)
+        self.assertEqual(breakdown[0]['category__name'], 'Calculus')
+        self.assertEqual(breakdown[0]['total_duration'], 60 * 60)
+        self.assertEqual(breakdown[0]['session_count'], 2)
+
+    def test_rebuild_command_writes_facts(self):
+        for session in (self.complete_session(0, 30), self.complete_session(2, 45, category=self.physics)):
+            SplitAggregateUpdateService.update_for_session(session)
+        expected = self.facts()
+        CategoryDailyFact.objects.all().delete()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command(
+                'rebuild_aggregates', workers=1, checkpoint=os.path.join(tmp, 'checkpoint.json'), stdout=StringIO()
+            )
+
+        self.assertEqual(self.facts(), expected)
+
+
+class DailyCumulativeTest(SplitAggregateTestMixin, TestCase):
+    def cumulative_rows(self):
+        rows = DailyCumulative.objects.filter(user=self.user).order_by('date').values(
+            'date', 'total_duration', 'session_count', 'break_count', 'flow_weighted_sum', 'flow_weighted_duration'
+        )
+        return [dict(row, flow_weighted_sum=round(row['flow_weighted_sum'], 6)) for row in rows]
+
+    def add_sessions(self):
+        # Days arrive out of order so earlier days shift later running totals
+        for session in (
+            self.complete_session(48, 30, breaks=1),
+            self.complete_session(0, 45, flow_score=500),
+            self.complete_session(24, 60, breaks=2, flow_score=900),
+            self.complete_session(1, 20),
+        ):
+            SplitAggregateUpdateService.update_for_session(session)
+
+    def test_deltas_match_rebuild(self):
+        SplitAggregateUpdateService.update_for_session(self.complete_session(0, 30))
+        DailyCumulativeService.get_range_totals(self.user, self.day.date(), self.day.date())
+        self.add_sessions()
+        incremental = self.cumulative_rows()
+
+        DailyCumulativeService.rebuild(self.user)
+
+        self.assertEqual(self.cumulative_rows(), incremental)
+        self.assertEqual(len(incremental), 3)
+
+    def test_range_totals_match_daily_rows(self):
+        self.add_sessions()
+        start, end = self.day.date() + timedelta(days=1), self.day.date() + timedelta(days=2)
+
+        totals = StudyAnalytics.get_custom_aggregate(self.user, start, end)
+
+        dailies = DailyAggregate.objects.filter(user=self.user, date__gte=start, date__lte=end)
+        self.assertEqual(totals['total_duration'], sum(d.total_duration for d in dailies))
+        self.assertEqual(totals['session_count'], 2)
+        self.assertEqual(totals['break_count'], 3)
+
+    def test_range_endpoint(self):
+        self.add_sessions()
+        DailyCumulative.objects.all().delete()  # Built lazily on first read
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get(reverse('range-insights'), {'start_date': '2025-03-01', 'end_date': '2025-03-31'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['aggregate']['session_count'], 4)
+        self.assertEqual(response.data['aggregate']['total_duration'], (30 + 45 + 60 + 20) * 60)
+        self.assertEqual(response.data['category_breakdown'][0]['name'], 'Math')
+
+        response = client.get(reverse('range-insights'), {'start_date': '2025-03-31', 'end_date': '2025-03-01'})
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get(reverse('range-insights'), {'start_date': '2025-02-30', 'end_date': '2025-03-01'})
+        self.assertEqual(response.status_code, 400)
@@ -1,10 +1,14 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views.insights_api import DailyInsights, WeeklyInsights, MonthlyInsights
+from .views.insights_api import DailyInsights, WeeklyInsights, MonthlyInsights, RangeInsights, BatchInsights, CompareInsights
 from .views.create_api import CreateStudySession, EndStudySession, CreateSubject, CreateCategoryBlock, EndCategoryBlock, CancelStudySession, CleanupHangingSessions, UpdateSessionRating
 from .views.category_api import CategoryList, CategoryDetail, BreakCategory
 from .views.goal_api import WeeklyGoalView, HasGoalsView
+from .views.dashboard_api import DashboardView
+from .views.session_api import SessionHistory, SessionHeartbeat
+from .views.sync_api import SyncSessions
 from .views.user_api import UserProfileView, UserTimezoneView, AccountDeletionView
 from .views.auth_api import (
     custom_token_obtain_pair,
@@ -17,6 +21,18 @@ from .views.auth_api import (
 )
 from .views.feedback_api import submit_feedback, get_feedback_types
 
+if settings.ASYNC_READ_VIEWS:
+    # Same URLs and responses, served natively under ASGI
+    from .views.async_api import (
+        AsyncDailyInsights as DailyInsights,
+        AsyncWeeklyInsights as WeeklyInsights,
+        AsyncMonthlyInsights as MonthlyInsights,
+        AsyncCategoryList as CategoryList,
+        AsyncBreakCategory as BreakCategory,
+        AsyncWeeklyGoalView as WeeklyGoalView,
+        AsyncHasGoalsView as HasGoalsView,
+    )
+
 urlpatterns = [
     # ========================
     # AUTHENTICATION ENDPOINTS
@@ -48,6 +64,9 @@ urlpatterns = [
     path('cancel-session/<int:id>/', CancelStudySession.as_view(), name='cancel-session'),
     path('update-session-rating/<int:id>/', UpdateSessionRating.as_view(), name='update-session-rating'),
     path('cleanup-hanging-sessions/', CleanupHangingSessions.as_view(), name='cleanup-hanging-sessions'),
+    path('sessions/history/', SessionHistory.as_view(), name='session-history'),
+    path('sessions/sync/', SyncSessions.as_view(), name='session-sync'),
+    path('sessions/<int:id>/heartbeat/', SessionHeartbeat.as_view(), name='session-heartbeat'),
     
     # ========================
     # CATEGORY ENDPOINTS
@@ -65,6 +84,10 @@ urlpatterns = [
     path('insights/daily/', DailyInsights.as_view(), name='daily-insights'),
     path('insights/weekly/', WeeklyInsights.as_view(), name='weekly-insights'),
     path('insights/monthly/', MonthlyInsights.as_view(), name='monthly-insights'),
+    path('insights/range/', RangeInsights.as_view(), name='range-insights'),
+    path('insights/batch/', BatchInsights.as_view(), name='batch-insights'),
+    path('insights/compare/', CompareInsights.as_view(), name='compare-insights'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
     
     # ========================
     # USER MANAGEMENT ENDPOINTS
@@ -1,4 +1,5 @@
 from .models import Categories, CustomUser
+from .services.insights_cache import InsightsCache
 
 def ensure_break_category(user):
     """Ensure user has a break category, create if missing"""
@@ -18,6 +19,8 @@ def ensure_break_category(user):
             category_type='break'
         )
         print(f"Created break category for user {user.username}")
+        # Insights responses list every category
+        InsightsCache.bump(user.id)
     
     return break_category
 
@@ -0,0 +1,287 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from ..models import Categories, CustomUser, WeeklyGoal
+from ..models import DailyAggregate, WeeklyAggregate, MonthlyAggregate
+from ..serializers import WeeklyGoalSerializer
+from ..services.aggregate_job_queue import AggregateJobQueue
+from ..services.insights_cache import InsightsCache
+from ..services.insights_payload import render_json
+from ..services.user_flow_stats_service import UserFlowStatsService
+from ..utils import ensure_break_category
+from .category_api import CategoryList, BreakCategory
+from .goal_api import WeeklyGoalView, HasGoalsView
+from .insights_api import (
+    DailyInsights, WeeklyInsights, MonthlyInsights,
+    aget_category_metadata, build_validators, build_cache_entry, splice_json,
+    get_not_modified_response, insights_response,
+)
+
+JWT_AUTHENTICATION = JWTAuthentication()
+
+
+async def aauthenticate(request):
+    """
+    JWTAuthentication for async views: the token is checked in-process and only the
+    user lookup touches the database. Returns None for anything that is not a valid
+    token for an active user, leaving the error response to the sync view.
+    """
+    header = JWT_AUTHENTICATION.get_header(request)
+    if header is None:
+        return None
+    try:
+        raw_token = JWT_AUTHENTICATION.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = JWT_AUTHENTICATION.get_validated_token(raw_token)
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except (AuthenticationFailed, KeyError):
+        return None
+
+    user = await CustomUser.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None or not user.is_active:
+        return None
+    if api_settings.CHECK_REVOKE_TOKEN and (
+        validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+    ):
+        return None
+    return user
+
+
+async def aget_target_user(request, requesting_user):
+    """Async get_target_user for an already authenticated user"""
+    target_username = request.GET.get('username')
+    if not target_username:
+        return requesting_user
+    if requesting_user.is_staff:
+        return await CustomUser.objects.filter(username=target_username).afirst()
+    if target_username == requesting_user.username:
+        return requesting_user
+    return None
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """JSON response encoded the way DRF's JSONRenderer encodes it"""
+    return HttpResponse(render_json(data), status=status_code, content_type='application/json')
+
+
+class AsyncReadView(View):
+    """
+    Async counterpart of a DRF view for ASGI deployments (see ASYNC_READ_VIEWS).
+
+    Subclasses serve the common read paths natively with the async ORM. Everything
+    else - writes, error responses, unauthenticated requests and the rarer read paths -
+    is handed to sync_view in a worker thread, so both return the same responses.
+    """
+    sync_view = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Like DRF views: clients authenticate with tokens, not CSRF cookies
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def _call_sync_view(self, request, *args, **kwargs):
+        response = self.sync_view.as_view()(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self._call_sync_view)(request, *args, **kwargs)
+
+    async def get_user(self, request):
+        """The target user of a request, or None when the sync view should answer it"""
+        user = await aauthenticate(request)
+        if user is None:
+            return None
+        return await aget_target_user(request, user)
+
+    post = put = patch = delete = delegate
+
+
+class AsyncInsightsView(AsyncReadView):
+    """
+    Full v1 insights payloads of clean periods: cache hits, or the aggregate's
+    pre-rendered JSON spliced with the per-user sections. Dirty periods, fields=/exclude=,
+    version=2 and periods without an aggregate go to the sync view.
+    """
+    timeframe = None
+    model = None
+    period_field = None
+
+    def get_period(self, params):
+        """(cache key parts, start date, end date), or None when the params are invalid"""
+        start_date = parse_date(params.get('start_date') or '')
+        end_date = parse_date(params.get('end_date') or '')
+        if not start_date or not end_date:
+            return None
+        return (start_date, end_date), start_date, end_date
+
+    async def get_extra(self, user):
+        """Per-user top-level keys that are not part of the pre-rendered payload"""
+        return {}
+
+    async def get(self, request):
+        params = request.GET
+        if 'fields' in params or 'exclude' in params or params.get('version', '1') != '1':
+            return await self.delegate(request)
+        try:
+            period = self.get_period(params)
+        except ValueError:
+            period = None
+        user = await self.get_user(request) if period else None
+        if user is None:
+            return await self.delegate(request)
+        period_key, start_date, end_date = period
+
+        version = await InsightsCache.aget_version(user.id)
+        cache_key = InsightsCache.key(user, self.timeframe, *period_key, 'all:v1', version=version)
+        cached = await InsightsCache.aget(cache_key)
+        if cached is not None:
+            return get_not_modified_response(request, cached['validators']) or insights_response(request, cached)
+
+        # Recomputing dirty days is sync work; leave it to the sync view
+        if await AggregateJobQueue.ais_dirty(user, start_date, end_date):
+            return await self.delegate(request)
+
+        row = await self.model.objects.filter(
+            user=user, **{self.period_field: start_date}
+        ).values_list('last_updated', 'rendered_payload').afirst()
+        if row is None or row[1] is None:
+            return await self.delegate(request)
+        last_updated, rendered_payload = row
+
+        validators = build_validators(last_updated, version)
+        not_modified = get_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        entry = build_cache_entry(splice_json(bytes(rendered_payload), {
+            'category_metadata': await aget_category_metadata(user),
+            **await self.get_extra(user),
+            'is_stale': False,
+        }), validators)
+        await InsightsCache.aset(cache_key, entry)
+        return insights_response(request, entry)
+
+
+class AsyncDailyInsights(AsyncInsightsView):
+    sync_view = DailyInsights
+    timeframe = 'daily'
+    model = DailyAggregate
+    period_field = 'date'
+
+    def get_period(self, params):
+        date = parse_date(params.get('date') or '')
+        if not date:
+            return None
+        return (date,), date, date
+
+    async def get_extra(self, user):
+        stats = await UserFlowStatsService.aget_for_user(user)
+        return {'all_time_avg_productivity': stats.flow_score_avg}
+
+
+class AsyncWeeklyInsights(AsyncInsightsView):
+    sync_view = WeeklyInsights
+    timeframe = 'weekly'
+    model = WeeklyAggregate
+    period_field = 'week_start'
+
+
+class AsyncMonthlyInsights(AsyncInsightsView):
+    sync_view = MonthlyInsights
+    timeframe = 'monthly'
+    model = MonthlyAggregate
+    period_field = 'month_start'
+
+
+class AsyncCategoryList(AsyncReadView):
+    sync_view = CategoryList
+
+    async def get(self, request):
+        user = await self.get_user(request)
+        if user is None:
+            return await self.delegate(request)
+
+        if not await Categories.objects.filter(user=user, is_system=True, category_type='break').aexists():
+            await sync_to_async(ensure_break_category)(user)
+
+        return json_response([
+            {
+                'id': category.id,
+                'name': category.name,
+                'color': category.color
+            }
+            async for category in Categories.objects.filter(user=user, is_active=True, is_system=False)
+        ])
+
+
+class AsyncBreakCategory(AsyncReadView):
+    sync_view = BreakCategory
+
+    async def get(self, request):
+        user = await self.get_user(request)
+        if user is None:
+            return await self.delegate(request)
+
+        break_category = await Categories.objects.filter(
+            user=user, is_system=True, category_type='break'
+        ).afirst()
+        if break_category is None:
+            break_category = await sync_to_async(ensure_break_category)(user)
+
+        return json_response({
+            'id': break_category.id,
+            'name': break_category.name,
+            'color': break_category.color
+        })
+
+
+class AsyncWeeklyGoalView(AsyncReadView):
+    sync_view = WeeklyGoalView
+
+    async def get(self, request):
+        week_start = request.GET.get('week_start')
+        if week_start:
+            try:
+                week_start = parse_date(week_start)
+            except ValueError:
+                week_start = None
+        else:
+            week_start = timezone.now().date()
+        user = await self.get_user(request) if week_start else None
+        if user is None:
+            return await self.delegate(request)
+
+        week_start = week_start - timedelta(days=week_start.weekday())
+        goal = await WeeklyGoal.objects.filter(
+            user=user, week_start=week_start
+        ).prefetch_related('daily_goals').afirst()
+        if not goal:
+            return json_response({'message': 'No goal set for this week'}, status.HTTP_404_NOT_FOUND)
+
+        return json_response(WeeklyGoalSerializer(goal).data)
+
+
+class AsyncHasGoalsView(AsyncReadView):
+    sync_view = HasGoalsView
+
+    async def get(self, request):
+        user = await aauthenticate(request)
+        if user is None:
+            return await self.delegate(request)
+
+        return json_response({'has_goals': await WeeklyGoal.objects.filter(user=user).aexists()})
@@ -6,6 +6,7 @@ from django.contrib.auth.models import AbstractUser
 from .insights_api import get_target_user
 from ..serializers import CategorySerializer
 from ..utils import ensure_break_category, get_break_category
+from ..services.insights_cache import InsightsCache
 
 # Predefined color palette
 ALLOWED_COLORS = ['#5A4FCF', '#4F9DDE', '#F3C44B', '#F46D75', '#2EC4B6']
@@ -59,6 +60,7 @@ class CategoryList(APIView):
         serializer = CategorySerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             category = serializer.save(user=user)
+            InsightsCache.bump(user.id)
             return Response({
                 'id': category.id,
                 'name': category.name,
@@ -100,6 +102,7 @@ class CategoryDetail(APIView):
         serializer = CategorySerializer(category, data=request.data, context={'request': request})
         if serializer.is_valid():
             category = serializer.save()
+            InsightsCache.bump(user.id)
             return Response({
                 'id': category.id,
                 'name': category.name,
@@ -118,6 +121,7 @@ class CategoryDetail(APIView):
         
         category.is_active = False
         category.save()
+        InsightsCache.bump(user.id)
         return Response({'message': 'Category deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -1,7 +1,7 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import Q
-from datetime import timedelta
+from django.db import IntegrityError, models, transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -9,15 +9,54 @@ from ..models import StudySession, CategoryBlock
 from ..serializers import StudySessionSerializer, CategoryBlockSerializer
 from rest_framework import serializers
 from django.utils import timezone
-from ..services.split_aggregate_service import SplitAggregateUpdateService
+from ..services.aggregate_job_queue import AggregateJobQueue
+from ..services.hanging_session_service import HangingSessionService
+from ..services.live_session_service import LiveSessionService
+from ..services.session_completion_service import SessionCompletionService
+from ..services.insights_cache import InsightsCache
+
+
+def get_client_uuid(request):
+    """The request's client_uuid, None when absent; raises ValueError when it is not a UUID"""
+    value = request.data.get('client_uuid')
+    if value in (None, ''):
+        return None
+    return uuid.UUID(str(value))
+
+
+def parse_id(value):
+    """An integer primary key from request data, or None"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 
 class CreateStudySession(APIView):
     #is passed a start time and optional status
+    #a client_uuid makes retries return the session the first attempt created
     def post(self, request):
+        try:
+            client_uuid = get_client_uuid(request)
+        except ValueError:
+            return Response({"client_uuid": ["Must be a valid UUID."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        if client_uuid:
+            existing = StudySession.objects.filter(user=request.user, client_uuid=client_uuid).first()
+            if existing:
+                return Response({"id": existing.id}, status=status.HTTP_200_OK)
+
         serializer = StudySessionSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            session = serializer.save()
+            try:
+                with transaction.atomic():
+                    session = serializer.save()
+            except IntegrityError:
+                if client_uuid is None:
+                    raise
+                # A concurrent retry inserted it first
+                session = StudySession.objects.get(user=request.user, client_uuid=client_uuid)
+                return Response({"id": session.id}, status=status.HTTP_200_OK)
             return Response({"id": session.id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -26,32 +65,13 @@ class CreateStudySession(APIView):
 class EndStudySession(APIView):
     def put(self, request, id):
         try:
-            session = StudySession.objects.get(id=id, user=request.user)
+            session = StudySession.objects.select_related('user').get(id=id, user=request.user)
             serializer = StudySessionSerializer(instance=session, data=request.data, partial=True)
             
             if serializer.is_valid():
-                updated_session = serializer.complete_session(instance=session, validated_data=serializer.validated_data)
-                
-                # End any open category blocks when completing the session
-                open_blocks = CategoryBlock.objects.filter(
-                    study_session=updated_session,
-                    end_time__isnull=True
-                )
-                for block in open_blocks:
-                    block.end_time = updated_session.end_time
-                    block.save()
-                    print(f"Ended CategoryBlock {block.id} at {block.end_time}")
-                
-                # Update aggregates immediately after session completion
-                try:
-                    # Use new split aggregate service for all updates
-                    SplitAggregateUpdateService.update_for_session(updated_session)
-                    print(f"Successfully updated aggregates for session {updated_session.id}")
-                except Exception as e:
-                    print(f"Failed to update aggregates for session {updated_session.id}: {str(e)}")
-                    # Fail fast - if aggregate update fails, the operation should fail
-                    return Response({"error": f"Session completed but aggregate update failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
+                # Blocks, flow score, session, aggregates and goals in one transaction
+                updated_session = SessionCompletionService.complete(session, serializer.validated_data)
+                LiveSessionService.clear(session.id)
                 return Response(StudySessionSerializer(updated_session).data, status=status.HTTP_200_OK)
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -64,7 +84,7 @@ class EndStudySession(APIView):
 class CancelStudySession(APIView):
     def put(self, request, id):
         try:
-            session = StudySession.objects.get(id=id, user=request.user)
+            session = StudySession.objects.select_related('user').get(id=id, user=request.user)
             
             # Mark session as cancelled and set end time
             session.status = "cancelled"
@@ -82,6 +102,8 @@ class CancelStudySession(APIView):
                 session.end_time = timezone.now()
             
             session.save()
+            HangingSessionService.mark_closed(session)
+            LiveSessionService.clear(session.id)
             
             # Also end any open category blocks with the same end time
             open_blocks = CategoryBlock.objects.filter(
@@ -92,6 +114,8 @@ class CancelStudySession(APIView):
                 block.end_time = session.end_time
                 block.save()
             
+            InsightsCache.bump(request.user.id)
+            
             return Response({
                 "message": "Session cancelled successfully",
                 "session_id": session.id,
@@ -110,11 +134,35 @@ class CancelStudySession(APIView):
         
 class CreateCategoryBlock(APIView):
     def post(self, request):
+        try:
+            client_uuid = get_client_uuid(request)
+        except ValueError:
+            return Response({"client_uuid": ["Must be a valid UUID."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Retries of a create that went through get the original block back
+        study_session_id = parse_id(request.data.get('study_session'))
+        if client_uuid and study_session_id:
+            existing = CategoryBlock.objects.filter(
+                study_session_id=study_session_id,
+                study_session__user=request.user,
+                client_uuid=client_uuid
+            ).first()
+            if existing:
+                return Response({"id": existing.id}, status=status.HTTP_200_OK)
+
         serializer = CategoryBlockSerializer(data=request.data, context={'request': request})
 
         if serializer.is_valid():
             print("Serializer is valid")
-            category_block = serializer.save()
+            try:
+                with transaction.atomic():
+                    category_block = serializer.save()
+            except IntegrityError:
+                if client_uuid is None:
+                    raise
+                # A concurrent retry inserted it first
+                category_block = CategoryBlock.objects.get(study_session_id=study_session_id, client_uuid=client_uuid)
+                return Response({"id": category_block.id}, status=status.HTTP_200_OK)
             return Response({"id": category_block.id}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -158,6 +206,7 @@ class EndCategoryBlock(APIView):
                     validated_data=serializer.validated_data
                 )
                 print(f"Block after update: start_time={updated_category_block.start_time}, end_time={updated_category_block.end_time}")
+                InsightsCache.bump(category_block.study_session.user_id)
                 return Response(CategoryBlockSerializer(updated_category_block).data, status=status.HTTP_200_OK)
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -179,67 +228,12 @@ class CreateSubject(APIView):
 class CleanupHangingSessions(APIView):
     def post(self, request):
         """
-        Cleanup hanging sessions that were never properly ended.
-        Detects sessions with null end_time or sessions older than 24 hours.
+        Cleanup the requesting user's hanging sessions and orphaned category blocks.
+        A check of the user's open-session marker; sessions are only touched when it
+        shows one left open too long (the sweep_hanging_sessions command covers the rest).
         """
         try:
-            user = request.user
-            cleaned_count = 0
-            
-            # Find hanging sessions for this user
-            # Sessions are considered hanging if:
-            # 1. end_time is null (never ended) OR status is still 'active'
-            # 2. start_time is older than 1 hour ago (more aggressive for crash recovery)
-            cutoff_time = timezone.now() - timedelta(hours=1)
-            
-            hanging_sessions = StudySession.objects.filter(
-                user=user,
-                start_time__lt=cutoff_time
-            ).filter(
-                Q(end_time__isnull=True) | Q(status='active')
-            )
-            
-            for session in hanging_sessions:
-                # End the session with a reasonable duration (1 hour max)
-                # to indicate it was auto-ended due to hanging
-                if not session.end_time:
-                    session.end_time = session.start_time + timedelta(hours=1)
-                if session.status == 'active':
-                    session.status = "cancelled"  # Mark as cancelled since it wasn't properly completed
-                session.save()
-                
-                # Also end any open category blocks for this session
-                open_blocks = CategoryBlock.objects.filter(
-                    study_session=session,
-                    end_time__isnull=True
-                )
-                for block in open_blocks:
-                    block.end_time = session.end_time
-                    block.save()
-                
-                cleaned_count += 1
-                print(f"Cleaned hanging session {session.id} started at {session.start_time}")
-            
-            # Also clean up any orphaned category blocks (blocks with null end_time 
-            # but belonging to completed sessions)
-            orphaned_blocks = CategoryBlock.objects.filter(
-                study_session__user=user,
-                study_session__status='completed',
-                end_time__isnull=True,
-                start_time__lt=cutoff_time
-            )
-            
-            orphaned_count = 0
-            for block in orphaned_blocks:
-                # Set block end_time to session end_time or start_time + 1 hour as fallback
-                if block.study_session.end_time:
-                    block.end_time = block.study_session.end_time
-                else:
-                    block.end_time = block.start_time + timedelta(hours=1)
-                block.save()
-                orphaned_count += 1
-                print(f"Cleaned orphaned category block {block.id} in session {block.study_session.id}")
-            
+            cleaned_count, orphaned_count = HangingSessionService.cleanup_user(request.user)
             total_cleaned = cleaned_count + orphaned_count
             return Response({
                 "message": f"Cleaned up {cleaned_count} hanging session(s) and {orphaned_count} orphaned category block(s)",
@@ -298,6 +292,10 @@ class UpdateSessionRating(APIView):
                 print(f"Failed to recalculate flow score for session {session.id}: {str(e)}")
                 # Don't fail the rating update if flow score calculation fails
             
+            # The new rating changes the day's productivity and flow scores
+            AggregateJobQueue.request_update(session)
+            InsightsCache.bump(request.user.id)
+            
             return Response({
                 "message": "Session rating updated successfully",
                 "session_id": session.id,
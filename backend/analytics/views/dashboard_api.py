@@ -0,0 +1,94 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..models import Categories, DailyAggregate, WeeklyAggregate, WeeklyGoal
+from ..serializers import CustomUserSerializer, WeeklyGoalSerializer
+from ..services.aggregate_job_queue import AggregateJobQueue
+from ..services.date_utils import get_user_today, get_week_boundaries
+from ..services.hanging_session_service import HangingSessionService
+from ..services.insights_payload import daily_aggregate_payload, weekly_aggregate_payload
+from ..services.user_flow_stats_service import UserFlowStatsService
+from ..utils import ensure_break_category
+from .insights_api import empty_aggregate
+
+
+class DashboardView(APIView):
+    """
+    Everything the app needs on launch in one response: profile, categories, break
+    category, today's and this week's insights, the current weekly goal and hanging
+    session cleanup. Built with a fixed number of queries however much history the
+    user has.
+    """
+
+    def get(self, request):
+        user = request.user
+        today = get_user_today(user)
+        week_start, week_end = get_week_boundaries(today)
+
+        # Close crashed sessions first so today's numbers leave them out; free unless
+        # the user's open-session marker shows one
+        cleaned_sessions, cleaned_blocks = HangingSessionService.cleanup_user(user)
+
+        # One category query serves the category list, break category and insights metadata
+        categories = list(Categories.objects.filter(user=user))
+        break_category = next(
+            (category for category in categories if category.is_system and category.category_type == 'break'),
+            None
+        ) or ensure_break_category(user)
+
+        is_stale = AggregateJobQueue.ensure_fresh(user, week_start, week_end)
+        daily_aggregate = (
+            DailyAggregate.objects.filter(user=user, date=today).first()
+            or empty_aggregate(user, today, 'daily', today)
+        )
+        weekly_aggregate = (
+            WeeklyAggregate.objects.filter(user=user, week_start=week_start).first()
+            or empty_aggregate(user, week_start, 'weekly', today)
+        )
+        category_metadata = {
+            category.id: {
+                "name": category.name,
+                "color": category.color
+            }
+            for category in categories
+        }
+
+        goal = WeeklyGoal.objects.filter(user=user, week_start=week_start).prefetch_related('daily_goals').first()
+        has_goals = goal is not None or WeeklyGoal.objects.filter(user=user).exists()
+
+        response_data = {
+            'today': today,
+            'profile': CustomUserSerializer(user).data,
+            'categories': [
+                {
+                    'id': category.id,
+                    'name': category.name,
+                    'color': category.color
+                }
+                for category in categories
+                if category.is_active and not category.is_system
+            ],
+            'break_category': {
+                'id': break_category.id,
+                'name': break_category.name,
+                'color': break_category.color
+            },
+            'daily_insights': {
+                **daily_aggregate_payload(daily_aggregate),
+                'category_metadata': category_metadata,
+                'all_time_avg_productivity': UserFlowStatsService.get_for_user(user).flow_score_avg,
+            },
+            'weekly_insights': {
+                **weekly_aggregate_payload(weekly_aggregate),
+                'category_metadata': category_metadata,
+            },
+            'weekly_goal': WeeklyGoalSerializer(goal).data if goal else None,
+            'has_goals': has_goals,
+            'cleanup': {
+                'cleaned_sessions': cleaned_sessions,
+                'cleaned_blocks': cleaned_blocks,
+            },
+            'is_stale': is_stale,
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
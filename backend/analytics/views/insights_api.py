@@ -1,3 +1,7 @@
+import hashlib
+import logging
+import re
+
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -9,11 +13,30 @@ from ..serializers import DailyAggregateSerializer, WeeklyAggregateSerializer, M
 from ..queries import StudyAnalytics
 from ..models import StudySession, CategoryBlock, Categories, CustomUser
 from ..models import DailyAggregate, WeeklyAggregate, MonthlyAggregate
+from ..services.aggregate_job_queue import AggregateJobQueue
+from ..services.user_flow_stats_service import UserFlowStatsService
+from ..services.insights_cache import InsightsCache
+from ..services.insights_payload import (
+    wants, daily_aggregate_payload, weekly_aggregate_payload, monthly_aggregate_payload,
+    render_json, get_rendered_payload, compact_category_metadata, compact_payload,
+)
+from ..services.period_comparison import COMPARED_METRICS, get_baseline_date, period_summary, compare_aggregates
+from ..services.split_aggregate_service import SplitAggregateUpdateService
+from ..services.date_utils import get_user_today, get_local_day_start, get_week_boundaries, get_month_boundaries
 from django.utils import timezone
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
+from django.utils.http import http_date, quote_etag
+
+logger = logging.getLogger(__name__)
 
 
 # TODO: Move formatting logic into serializer for cleaner separation
 
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
 def get_target_user(request):
     """Get the target user based on request parameters and permissions"""
     requesting_user = request.user
@@ -35,6 +58,227 @@ def get_target_user(request):
         return requesting_user
     return None
 
+
+def get_category_metadata(user):
+    """Current name and color of each of the user's categories, keyed by category id"""
+    return {
+        category.id: {
+            "name": category.name,
+            "color": category.color
+        }
+        for category in StudyAnalytics.get_category_list(user)
+    }
+
+
+async def aget_category_metadata(user):
+    return {
+        category.id: {
+            "name": category.name,
+            "color": category.color
+        }
+        async for category in StudyAnalytics.get_category_list(user)
+    }
+
+
+# Columns shared by the summary section of every aggregate payload
+AGGREGATE_SUMMARY_COLUMNS = [
+    'total_duration', 'category_durations', 'session_count', 'break_count', 'is_final',
+    'flow_score', 'flow_score_details', 'flow_coaching_message',
+]
+
+# Top-level sections of each insights payload and the aggregate columns each one reads
+INSIGHTS_FIELDS = {
+    'daily': {
+        'aggregate': AGGREGATE_SUMMARY_COLUMNS + ['productivity_score', 'productivity_sessions_count'],
+        'timeline_data': ['timeline_data'],
+        'category_metadata': [],
+        'all_time_avg_productivity': [],
+    },
+    'weekly': {
+        'aggregate': AGGREGATE_SUMMARY_COLUMNS,
+        'daily_breakdown': ['daily_breakdown'],
+        'session_times': ['session_times'],
+        'category_metadata': [],
+    },
+    'monthly': {
+        'statistics': ['total_duration', 'session_count'],
+        'monthly_aggregate': AGGREGATE_SUMMARY_COLUMNS,
+        'daily_breakdown': ['daily_breakdown'],
+        'heatmap_data': ['heatmap_data'],
+        'category_metadata': [],
+    },
+}
+
+
+def get_requested_fields(request, timeframe):
+    """
+    Payload sections selected with fields= or exclude= (comma-separated), or None for all.
+    Raises ValueError for unknown sections or when both params are given.
+    """
+    available = INSIGHTS_FIELDS[timeframe]
+    fields = {name for name in request.query_params.get('fields', '').split(',') if name}
+    exclude = {name for name in request.query_params.get('exclude', '').split(',') if name}
+    if not fields and not exclude:
+        return None
+    if fields and exclude:
+        raise ValueError('Use either fields or exclude, not both')
+    unknown = (fields | exclude) - set(available)
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(available)}"
+        )
+    return fields or set(available) - exclude
+
+
+def get_format_version(request):
+    """
+    Wire format requested with version= (default 1). Version 2 sends timelines, session
+    times and heatmaps as compact arrays. Raises ValueError for unknown versions.
+    """
+    format_version = request.query_params.get('version', '1')
+    if format_version not in ('1', '2'):
+        raise ValueError('version must be 1 or 2')
+    return int(format_version)
+
+
+def get_representation_key(fields, format_version):
+    """Cache/ETag discriminator for a field selection and wire format"""
+    fields_key = 'all' if fields is None else ','.join(sorted(fields))
+    return f"{fields_key}:v{format_version}"
+
+
+def load_aggregates(model, timeframe, fields, *extra_columns):
+    """Aggregate queryset reading only the columns the requested sections need"""
+    queryset = model.objects.all()
+    if fields is not None:
+        queryset = queryset.only(*extra_columns, *{
+            column for name in fields for column in INSIGHTS_FIELDS[timeframe][name]
+        })
+    return queryset
+
+
+# Aggregate model, period column and payload builder of each timeframe
+PERIOD_AGGREGATES = {
+    'daily': (DailyAggregate, 'date', daily_aggregate_payload),
+    'weekly': (WeeklyAggregate, 'week_start', weekly_aggregate_payload),
+    'monthly': (MonthlyAggregate, 'month_start', monthly_aggregate_payload),
+}
+
+
+def get_v2_response_data(user, timeframe, fields, category_data, period_start):
+    """
+    Version 2 payload for one period: timelines and session times as arrays of second
+    offsets from local midnight, heatmaps as dense arrays, and category_metadata as a
+    list the timeline's category indices point into. Periods without an aggregate are
+    zeroed rather than rebuilt from sessions.
+    """
+    model, period_field, payload = PERIOD_AGGREGATES[timeframe]
+    aggregate = load_aggregates(model, timeframe, fields).filter(user=user, **{period_field: period_start}).first()
+    if aggregate is None:
+        aggregate = empty_aggregate(user, period_start, timeframe, get_user_today(user))
+    if not category_data and timeframe == 'daily' and wants(fields, 'timeline_data'):
+        # Timeline category indices are positions in the category list
+        category_data = get_category_metadata(user)
+
+    categories = compact_category_metadata(category_data)
+    response_data = {
+        'version': 2,
+        **compact_payload(payload(aggregate, fields), categories, get_local_day_start(user, period_start), period_start),
+    }
+    if wants(fields, 'category_metadata'):
+        response_data['category_metadata'] = categories
+    return response_data
+
+
+def select_fields(response_data, fields):
+    if fields is None:
+        return response_data
+    return {key: value for key, value in response_data.items() if key in fields or key == 'is_stale'}
+
+
+def get_validators(user, model, version, representation='all:v1', **lookup):
+    """
+    ETag and Last-Modified for an insights payload, from the aggregate row's
+    last_updated and the user's data version (bumped by session and category
+    writes). Only last_updated is loaded, never the JSON columns. Each field
+    selection and wire format is a separate representation with its own ETag.
+    """
+    last_updated = model.objects.filter(user=user, **lookup).values_list('last_updated', flat=True).first()
+    return build_validators(last_updated, version, representation)
+
+
+def build_validators(last_updated, version, representation='all:v1'):
+    """Validators for an aggregate last updated at last_updated (None when there is no row)"""
+    # Versions are nanosecond timestamps of the user's last write
+    last_modified = max(last_updated.timestamp() if last_updated else 0, version / 1e9)
+    tag = f"{last_updated.isoformat() if last_updated else ''}:{version}:{representation}"
+    return {
+        'etag': quote_etag(hashlib.md5(tag.encode()).hexdigest()),
+        'last_modified': int(last_modified),
+    }
+
+
+def get_not_modified_response(request, validators):
+    """A 304 response if the client's If-None-Match / If-Modified-Since still match, else None"""
+    response = get_conditional_response(
+        request, etag=validators['etag'], last_modified=validators['last_modified']
+    )
+    if response is not None:
+        set_validators(response, validators)
+    return response
+
+
+def splice_json(rendered_payload, extra):
+    """Append top-level keys to a pre-rendered JSON object without decoding it"""
+    extra_json = render_json(extra)
+    if rendered_payload == b'{}':
+        return extra_json
+    return rendered_payload[:-1] + b',' + extra_json[1:]
+
+
+def insights_response(request, entry):
+    """
+    200 response sending an encoded insights body as-is, or its pre-compressed copy
+    when the client accepts gzip.
+    """
+    response = HttpResponse(content_type='application/json')
+    patch_vary_headers(response, ('Accept-Encoding',))
+    set_validators(response, entry['validators'])
+    if entry['gzip_body'] is not None and ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+        response.content = entry['gzip_body']
+        response['Content-Encoding'] = 'gzip'
+        # The compressed bytes differ from the identity ones, so the tag can only be weak
+        response['ETag'] = 'W/' + entry['validators']['etag']
+    else:
+        response.content = entry['body']
+    return response
+
+
+def cache_insights_response(request, cache_key, body, validators, is_stale):
+    """Send a freshly encoded insights body, caching it (and its gzip copy) unless it is stale"""
+    entry = build_cache_entry(body, validators)
+    if not is_stale:
+        InsightsCache.set(cache_key, entry)
+    return insights_response(request, entry)
+
+
+def build_cache_entry(body, validators):
+    """Cache entry for an encoded insights body, with a gzip copy when it is worth compressing"""
+    gzip_min_bytes = getattr(settings, 'INSIGHTS_GZIP_MIN_BYTES', 1024)
+    return {
+        'body': body,
+        'gzip_body': compress_string(body) if len(body) >= gzip_min_bytes else None,
+        'validators': validators,
+    }
+
+
+def set_validators(response, validators):
+    response['ETag'] = validators['etag']
+    response['Last-Modified'] = http_date(validators['last_modified'])
+    # Per-user data: clients may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
  
 class DailyInsights(APIView):
 
@@ -45,17 +289,7 @@ class DailyInsights(APIView):
                 {'error': 'User not found or access denied'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        user_categories = StudyAnalytics.get_category_list(user)
-        category_data = {}
-
-        for category in user_categories:
-
-            category_data[category.id] = {
-                "name" : category.name,
-                "color" : category.color
-        }
 
-            
         date_str = request.query_params.get('date')
         
         # Parse the date string into a date object
@@ -72,45 +306,69 @@ class DailyInsights(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            fields = get_requested_fields(request, 'daily')
+            format_version = get_format_version(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Served from cache until this user's data changes
+        version = InsightsCache.get_version(user.id)
+        cache_key = InsightsCache.key(
+            user, 'daily', date, get_representation_key(fields, format_version), version=version
+        )
+        cached = InsightsCache.get(cache_key)
+        if cached is not None:
+            return get_not_modified_response(request, cached['validators']) or insights_response(request, cached)
+
+        # Recompute the day first if a write marked it dirty
+        is_stale = AggregateJobQueue.ensure_fresh(user, date, date)
+
+        # Answer conditional requests before loading or serializing the payload
+        validators = get_validators(
+            user, DailyAggregate, version, get_representation_key(fields, format_version), date=date
+        )
+        not_modified = get_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        category_data = get_category_metadata(user) if wants(fields, 'category_metadata') else {}
+
+        # Full v1 payloads are spliced straight from the aggregate's pre-rendered JSON
+        if fields is None and format_version == 1:
+            rendered_payload = get_rendered_payload(DailyAggregate, user=user, date=date)
+            if rendered_payload is not None:
+                response_body = splice_json(rendered_payload, {
+                    'category_metadata': category_data,
+                    'all_time_avg_productivity': UserFlowStatsService.get_for_user(user).flow_score_avg,
+                    'is_stale': is_stale,
+                })
+                return cache_insights_response(request, cache_key, response_body, validators, is_stale)
+
+        # Compact wire format for clients that ask for it
+        if format_version == 2:
+            response_data = get_v2_response_data(user, 'daily', fields, category_data, date)
+            if wants(fields, 'all_time_avg_productivity'):
+                response_data['all_time_avg_productivity'] = UserFlowStatsService.get_for_user(user).flow_score_avg
+            response_data['is_stale'] = is_stale
+            return cache_insights_response(request, cache_key, render_json(response_data), validators, is_stale)
+
         # Try to get daily aggregate from new split model first
         try:
-            daily_aggregate = DailyAggregate.objects.get(user=user, date=date)
-            print(f"Found DailyAggregate for {date}")
-            print(f"DEBUG: Daily aggregate flow_score = {daily_aggregate.flow_score}")
-            print(f"DEBUG: Daily aggregate flow_score_details = {daily_aggregate.flow_score_details}")
-            
-            # Calculate all-time average flow score
-            all_time_avg_productivity = None
-            historical_aggregates = DailyAggregate.objects.filter(
-                user=user,
-                flow_score__isnull=False
-            ).values_list('flow_score', flat=True)
-            
-            if historical_aggregates:
-                all_time_avg_productivity = sum(historical_aggregates) / len(historical_aggregates)
+            daily_aggregate = load_aggregates(DailyAggregate, 'daily', fields).get(user=user, date=date)
+            logger.debug("Found DailyAggregate for %s", date)
             
             # Use precomputed data from new model
             response_data = {
-                'aggregate': {
-                    'total_duration': daily_aggregate.total_duration,
-                    'category_durations': daily_aggregate.category_durations,
-                    'session_count': daily_aggregate.session_count,
-                    'break_count': daily_aggregate.break_count,
-                    'is_final': daily_aggregate.is_final,
-                    'productivity_score': daily_aggregate.productivity_score,
-                    'productivity_sessions_count': daily_aggregate.productivity_sessions_count,
-                    'flow_score': daily_aggregate.flow_score,  # Add flow score
-                    'flow_score_details': daily_aggregate.flow_score_details,  # Add flow score details
-                    'flow_coaching_message': daily_aggregate.flow_coaching_message  # Add coaching message
-                },
-                'timeline_data': daily_aggregate.timeline_data,  # Precomputed!
+                **daily_aggregate_payload(daily_aggregate, fields),
                 'category_metadata': category_data,
-                'all_time_avg_productivity': all_time_avg_productivity
             }
-            print(f"DEBUG: Response data aggregate flow_score = {response_data['aggregate']['flow_score']}")
+            if wants(fields, 'all_time_avg_productivity'):
+                # All-time average flow score from the materialized lifetime stats
+                response_data['all_time_avg_productivity'] = UserFlowStatsService.get_for_user(user).flow_score_avg
             
         except DailyAggregate.DoesNotExist:
-            print(f"No DailyAggregate found for {date}, falling back to old method")
+            logger.debug("No DailyAggregate found for %s, falling back to old method", date)
             
             # Fallback to old method if new aggregate doesn't exist
             daily_aggregate = StudyAnalytics.get_aggregate_data(user, start_date=date, end_date=date, timeframe='daily')
@@ -161,15 +419,8 @@ class DailyInsights(APIView):
                     is_final=False
                 )
             
-            # Calculate all-time average for fallback case too
-            all_time_avg_productivity = None
-            historical_aggregates = DailyAggregate.objects.filter(
-                user=user,
-                flow_score__isnull=False
-            ).values_list('flow_score', flat=True)
-            
-            if historical_aggregates:
-                all_time_avg_productivity = sum(historical_aggregates) / len(historical_aggregates)
+            # All-time average for fallback case too
+            all_time_avg_productivity = UserFlowStatsService.get_for_user(user).flow_score_avg
             
             response_data = {
                 'aggregate': DailyAggregateSerializer(daily_aggregate).data,
@@ -178,7 +429,9 @@ class DailyInsights(APIView):
                 'all_time_avg_productivity': all_time_avg_productivity
             }
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        response_data = select_fields(response_data, fields)
+        response_data['is_stale'] = is_stale
+        return cache_insights_response(request, cache_key, render_json(response_data), validators, is_stale)
     
     
     
@@ -192,25 +445,13 @@ class WeeklyInsights(APIView):
                 {'error': 'User not found or access denied'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        user_categories = StudyAnalytics.get_category_list(user)
-        category_data = {}
-
-        for category in user_categories:
-
-            category_data[category.id] = {
-                "name" : category.name,
-                "color" : category.color
-            }
-            
 
-            
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
         try:
             start_date = parse_date(start_date)
             end_date = parse_date(end_date)
-            print(f"Parsed dates - Start: {start_date} ({type(start_date)}), End: {end_date} ({type(end_date)})")
             
             if not start_date or not end_date:
                 return Response(
@@ -223,41 +464,63 @@ class WeeklyInsights(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        try:
+            fields = get_requested_fields(request, 'weekly')
+            format_version = get_format_version(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Served from cache until this user's data changes
+        version = InsightsCache.get_version(user.id)
+        cache_key = InsightsCache.key(
+            user, 'weekly', start_date, end_date, get_representation_key(fields, format_version), version=version
+        )
+        cached = InsightsCache.get(cache_key)
+        if cached is not None:
+            return get_not_modified_response(request, cached['validators']) or insights_response(request, cached)
+
+        # Recompute any days of the week that writes marked dirty
+        is_stale = AggregateJobQueue.ensure_fresh(user, start_date, end_date)
+
+        # Answer conditional requests before loading or serializing the payload
+        validators = get_validators(
+            user, WeeklyAggregate, version, get_representation_key(fields, format_version), week_start=start_date
+        )
+        not_modified = get_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        category_data = get_category_metadata(user) if wants(fields, 'category_metadata') else {}
+
+        # Full v1 payloads are spliced straight from the aggregate's pre-rendered JSON
+        if fields is None and format_version == 1:
+            rendered_payload = get_rendered_payload(WeeklyAggregate, user=user, week_start=start_date)
+            if rendered_payload is not None:
+                response_body = splice_json(rendered_payload, {
+                    'category_metadata': category_data,
+                    'is_stale': is_stale,
+                })
+                return cache_insights_response(request, cache_key, response_body, validators, is_stale)
+
+        # Compact wire format for clients that ask for it
+        if format_version == 2:
+            response_data = get_v2_response_data(user, 'weekly', fields, category_data, start_date)
+            response_data['is_stale'] = is_stale
+            return cache_insights_response(request, cache_key, render_json(response_data), validators, is_stale)
+
         # Try to get weekly aggregate from new split model first
         try:
-            weekly_aggregate = WeeklyAggregate.objects.get(user=user, week_start=start_date)
-            print(f"Found WeeklyAggregate for week starting {start_date}")
+            weekly_aggregate = load_aggregates(WeeklyAggregate, 'weekly', fields).get(user=user, week_start=start_date)
             
             # Use precomputed data from new model
             response_data = {
-                'aggregate': {
-                    'total_duration': weekly_aggregate.total_duration,
-                    'category_durations': weekly_aggregate.category_durations,
-                    'session_count': weekly_aggregate.session_count,
-                    'break_count': weekly_aggregate.break_count,
-                    'is_final': weekly_aggregate.is_final,
-                    'flow_score': weekly_aggregate.flow_score,
-                    'flow_score_details': weekly_aggregate.flow_score_details,
-                    'flow_coaching_message': weekly_aggregate.flow_coaching_message
-                },
+                **weekly_aggregate_payload(weekly_aggregate, fields),
                 'category_metadata': category_data,
-                'daily_breakdown': weekly_aggregate.daily_breakdown,  # Precomputed!
-                'session_times': weekly_aggregate.session_times,     # Precomputed!
             }
             
         except WeeklyAggregate.DoesNotExist:
-            print(f"No WeeklyAggregate found for week starting {start_date}, falling back to old method")
-            
             # Fallback to old method if new aggregate doesn't exist
             weekly_aggregate = StudyAnalytics.get_aggregate_data(user, start_date=start_date, end_date=end_date, timeframe='weekly')
-            print(f"Weekly Aggregate Query - Start: {start_date}, End: {end_date}, Timeframe: weekly")
-            print(f"Weekly Aggregate Result: {weekly_aggregate}")
-            if weekly_aggregate:
-                print(f"Found weekly aggregate: {weekly_aggregate.week_start} - {weekly_aggregate.total_duration} seconds")
-            else:
-                print("No weekly aggregate found - checking what exists in DB")
-                all_weekly = WeeklyAggregate.objects.filter(user=user)
-                print(f"All weekly aggregates for user: {[(a.week_start, a.total_duration) for a in all_weekly]}")
             
             daily_breakdown = StudyAnalytics.get_aggregates_in_range(user, start_date, end_date, timeframe='daily')
             session_times = StudyAnalytics.get_weekly_session_times(user, start_date, end_date)
@@ -292,7 +555,9 @@ class WeeklyInsights(APIView):
                 'session_times': formatted_session_times,
             }
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        response_data = select_fields(response_data, fields)
+        response_data['is_stale'] = is_stale
+        return cache_insights_response(request, cache_key, render_json(response_data), validators, is_stale)
     
 class MonthlyInsights(APIView):
     def get(self, request):
@@ -303,15 +568,6 @@ class MonthlyInsights(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        user_categories = StudyAnalytics.get_category_list(user)
-        category_data = {}
-
-        for category in user_categories:
-            category_data[category.id] = {
-                "name": category.name,
-                "color": category.color
-            }
-            
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
 
@@ -330,36 +586,63 @@ class MonthlyInsights(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        try:
+            fields = get_requested_fields(request, 'monthly')
+            format_version = get_format_version(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Served from cache until this user's data changes
+        version = InsightsCache.get_version(user.id)
+        cache_key = InsightsCache.key(
+            user, 'monthly', start_date, end_date, get_representation_key(fields, format_version), version=version
+        )
+        cached = InsightsCache.get(cache_key)
+        if cached is not None:
+            return get_not_modified_response(request, cached['validators']) or insights_response(request, cached)
+
+        # Recompute any days of the month that writes marked dirty
+        is_stale = AggregateJobQueue.ensure_fresh(user, start_date, end_date)
+
+        # Answer conditional requests before loading or serializing the payload
+        validators = get_validators(
+            user, MonthlyAggregate, version, get_representation_key(fields, format_version), month_start=start_date
+        )
+        not_modified = get_not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        category_data = get_category_metadata(user) if wants(fields, 'category_metadata') else {}
+
+        # Full v1 payloads are spliced straight from the aggregate's pre-rendered JSON
+        if fields is None and format_version == 1:
+            rendered_payload = get_rendered_payload(MonthlyAggregate, user=user, month_start=start_date)
+            if rendered_payload is not None:
+                response_body = splice_json(rendered_payload, {
+                    'category_metadata': category_data,
+                    'is_stale': is_stale,
+                })
+                return cache_insights_response(request, cache_key, response_body, validators, is_stale)
+
+        # Compact wire format for clients that ask for it
+        if format_version == 2:
+            response_data = get_v2_response_data(user, 'monthly', fields, category_data, start_date)
+            response_data['is_stale'] = is_stale
+            return cache_insights_response(request, cache_key, render_json(response_data), validators, is_stale)
+
         # Try to get monthly aggregate from new split model first
         try:
-            monthly_aggregate = MonthlyAggregate.objects.get(user=user, month_start=start_date)
-            print(f"Found MonthlyAggregate for month starting {start_date}")
+            monthly_aggregate = load_aggregates(MonthlyAggregate, 'monthly', fields).get(user=user, month_start=start_date)
+            logger.debug("Found MonthlyAggregate for month starting %s", start_date)
             
             # Use precomputed data from new model
-            total_hours = monthly_aggregate.total_duration / 3600 if monthly_aggregate.total_duration else 0
-            
             response_data = {
-                'statistics': {
-                    'total_hours': total_hours,
-                    'total_sessions': monthly_aggregate.session_count
-                },
-                'monthly_aggregate': {
-                    'total_duration': monthly_aggregate.total_duration,
-                    'category_durations': monthly_aggregate.category_durations,
-                    'session_count': monthly_aggregate.session_count,
-                    'break_count': monthly_aggregate.break_count,
-                    'is_final': monthly_aggregate.is_final,
-                    'flow_score': monthly_aggregate.flow_score,
-                    'flow_score_details': monthly_aggregate.flow_score_details,
-                    'flow_coaching_message': monthly_aggregate.flow_coaching_message
-                },
-                'daily_breakdown': monthly_aggregate.daily_breakdown,  # Precomputed!
-                'heatmap_data': monthly_aggregate.heatmap_data,       # Precomputed!
+                **monthly_aggregate_payload(monthly_aggregate, fields),
                 'category_metadata': category_data
             }
             
         except MonthlyAggregate.DoesNotExist:
-            print(f"No MonthlyAggregate found for month starting {start_date}, falling back to old method")
+            logger.debug("No MonthlyAggregate found for month starting %s, falling back to old method", start_date)
             
             # Fallback to old method if new aggregate doesn't exist
             monthly_aggregate = StudyAnalytics.get_aggregate_data(user, start_date, end_date, timeframe='monthly')
@@ -404,5 +687,288 @@ class MonthlyInsights(APIView):
                 'category_metadata': category_data
             }
 
+        response_data = select_fields(response_data, fields)
+        response_data['is_stale'] = is_stale
+        return cache_insights_response(request, cache_key, render_json(response_data), validators, is_stale)
+
+
+class RangeInsights(APIView):
+    """Totals for an arbitrary local-date range (last 90 days, semester to date, ...)"""
+
+    def get(self, request):
+        user = get_target_user(request)
+        if not user:
+            return Response(
+                {'error': 'User not found or access denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            start_date = parse_date(request.query_params.get('start_date') or '')
+            end_date = parse_date(request.query_params.get('end_date') or '')
+        except ValueError:
+            # Well formed but impossible, e.g. 2025-02-30
+            start_date = end_date = None
+        if not start_date or not end_date:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start_date > end_date:
+            return Response(
+                {'error': 'start_date must be on or before end_date'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        is_stale = AggregateJobQueue.ensure_fresh(user, start_date, end_date)
+
+        # Two running-total lookups and one GROUP BY, however long the range
+        totals = StudyAnalytics.get_custom_aggregate(user, start_date, end_date)
+        category_breakdown = StudyAnalytics.get_category_breakdown_in_range(user, start_date, end_date)
+        days = (end_date - start_date).days + 1
+
+        response_data = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'aggregate': {
+                'total_duration': totals['total_duration'],
+                'session_count': totals['session_count'],
+                'break_count': totals['break_count'],
+                'flow_score': totals['flow_score'],
+                'avg_daily_duration': totals['total_duration'] / days,
+            },
+            'category_breakdown': [
+                {
+                    'category_id': row['category_id'],
+                    'name': row['category__name'],
+                    'color': row['category__color'],
+                    'total_duration': row['total_duration'],
+                    'session_count': row['session_count'],
+                }
+                for row in category_breakdown
+            ],
+            'is_stale': is_stale,
+        }
         return Response(response_data, status=status.HTTP_200_OK)
-    
\ No newline at end of file
+
+
+class CompareInsights(APIView):
+    """
+    Period-over-period deltas, e.g. this week vs last week or this month vs the same
+    month last year, computed from the two periods' aggregates alone.
+
+    Query params: timeframe (daily/weekly/monthly), date (any day of the current
+    period, defaults to today) and against (previous or last_year, default previous).
+    """
+
+    def get(self, request):
+        user = get_target_user(request)
+        if not user:
+            return Response(
+                {'error': 'User not found or access denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        timeframe = request.query_params.get('timeframe')
+        if timeframe not in PERIOD_AGGREGATES:
+            return Response(
+                {'error': 'timeframe must be one of daily, weekly, monthly'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        against = request.query_params.get('against', 'previous')
+        if against not in ('previous', 'last_year'):
+            return Response(
+                {'error': 'against must be previous or last_year'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        today = get_user_today(user)
+        target_date = today
+        if request.query_params.get('date'):
+            try:
+                target_date = parse_date(request.query_params['date'])
+            except ValueError:
+                # Well formed but impossible, e.g. 2025-02-30
+                target_date = None
+            if not target_date:
+                return Response(
+                    {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        current_start = get_period_start(target_date, timeframe)
+        baseline_start = get_period_start(get_baseline_date(current_start, against), timeframe)
+        current_end = get_period_end(current_start, timeframe)
+        baseline_end = get_period_end(baseline_start, timeframe)
+
+        # Separate checks so a year-over-year comparison doesn't refresh the year between
+        is_stale = AggregateJobQueue.ensure_fresh(user, baseline_start, baseline_end)
+        is_stale = AggregateJobQueue.ensure_fresh(user, current_start, current_end) or is_stale
+
+        # Both periods in one indexed query, without the payload columns
+        model, period_field, _ = PERIOD_AGGREGATES[timeframe]
+        aggregates = {
+            getattr(aggregate, period_field): aggregate
+            for aggregate in model.objects.filter(
+                user=user, **{f'{period_field}__in': [baseline_start, current_start]}
+            ).only(period_field, 'category_durations', *COMPARED_METRICS)
+        }
+        current = aggregates.get(current_start) or empty_aggregate(user, current_start, timeframe, today)
+        baseline = aggregates.get(baseline_start) or empty_aggregate(user, baseline_start, timeframe, today)
+
+        response_data = {
+            'timeframe': timeframe,
+            'against': against,
+            'current': {
+                'period_start': current_start,
+                'period_end': current_end,
+                **period_summary(current),
+            },
+            'baseline': {
+                'period_start': baseline_start,
+                'period_end': baseline_end,
+                **period_summary(baseline),
+            },
+            **compare_aggregates(current, baseline),
+            'is_stale': is_stale,
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+# Longest batch a client may request, e.g. two months of days
+MAX_BATCH_PERIODS = 62
+
+
+def get_period_start(target_date, timeframe):
+    """Normalize a date to the start of its daily/weekly/monthly period"""
+    if timeframe == 'weekly':
+        return get_week_boundaries(target_date)[0]
+    if timeframe == 'monthly':
+        return get_month_boundaries(target_date)[0]
+    return target_date
+
+
+def get_period_end(period_start, timeframe):
+    if timeframe == 'weekly':
+        return get_week_boundaries(period_start)[1]
+    if timeframe == 'monthly':
+        return get_month_boundaries(period_start)[1]
+    return period_start
+
+
+def get_next_period_start(period_start, timeframe):
+    return get_period_end(period_start, timeframe) + timedelta(days=1)
+
+
+def empty_aggregate(user, period_start, timeframe, today):
+    """Unsaved aggregate standing in for a period with no recorded sessions"""
+    if timeframe == 'weekly':
+        return WeeklyAggregate(
+            user=user, week_start=period_start,
+            **SplitAggregateUpdateService._build_weekly_aggregate_data(period_start, [], today)
+        )
+    if timeframe == 'monthly':
+        return MonthlyAggregate(
+            user=user, month_start=period_start,
+            **SplitAggregateUpdateService._build_monthly_aggregate_data(
+                period_start, get_period_end(period_start, 'monthly'), [], today
+            )
+        )
+    return DailyAggregate(user=user, date=period_start, is_final=period_start < today)
+
+
+class BatchInsights(APIView):
+    """
+    Several consecutive (or listed) days, weeks or months of insights in one round trip,
+    so swiping through history does not cost one request per period.
+
+    Query params: timeframe (daily/weekly/monthly) and either start_date/end_date or
+    dates=YYYY-MM-DD,YYYY-MM-DD,... Dates are normalized to their period start.
+    fields= / exclude= select payload sections as on the single-period endpoints.
+    """
+
+    def get(self, request):
+        user = get_target_user(request)
+        if not user:
+            return Response(
+                {'error': 'User not found or access denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        timeframe = request.query_params.get('timeframe')
+        if timeframe not in PERIOD_AGGREGATES:
+            return Response(
+                {'error': 'timeframe must be one of daily, weekly, monthly'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        periods, error = self._get_periods(request, timeframe)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fields = get_requested_fields(request, timeframe)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One freshness check over the whole span instead of one per period
+        is_stale = AggregateJobQueue.ensure_fresh(user, periods[0], get_period_end(periods[-1], timeframe))
+
+        # One indexed query for every requested period
+        model, period_field, payload = PERIOD_AGGREGATES[timeframe]
+        aggregates = {
+            getattr(aggregate, period_field): aggregate
+            for aggregate in load_aggregates(model, timeframe, fields, period_field).filter(
+                user=user, **{f'{period_field}__in': periods}
+            )
+        }
+
+        today = get_user_today(user)
+        response_data = {
+            'timeframe': timeframe,
+            'periods': [
+                {
+                    'period_start': period_start,
+                    **payload(aggregates.get(period_start) or empty_aggregate(user, period_start, timeframe, today), fields),
+                }
+                for period_start in periods
+            ],
+            'is_stale': is_stale,
+        }
+        if wants(fields, 'category_metadata'):
+            response_data['category_metadata'] = get_category_metadata(user)
+        if timeframe == 'daily' and wants(fields, 'all_time_avg_productivity'):
+            response_data['all_time_avg_productivity'] = UserFlowStatsService.get_for_user(user).flow_score_avg
+        return Response(response_data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _get_periods(request, timeframe):
+        """Sorted, de-duplicated period starts requested, or an error message"""
+        dates_param = request.query_params.get('dates')
+        if dates_param:
+            try:
+                dates = [parse_date(value.strip()) for value in dates_param.split(',') if value.strip()]
+            except ValueError:
+                # Well formed but impossible, e.g. 2025-02-30
+                dates = [None]
+            if not dates or not all(dates):
+                return None, 'Invalid date format. Use YYYY-MM-DD'
+            periods = sorted({get_period_start(value, timeframe) for value in dates})
+        else:
+            try:
+                start_date = parse_date(request.query_params.get('start_date') or '')
+                end_date = parse_date(request.query_params.get('end_date') or '')
+            except ValueError:
+                return None, 'Invalid date format. Use YYYY-MM-DD'
+            if not start_date or not end_date:
+                return None, 'Provide dates or start_date and end_date (YYYY-MM-DD)'
+            if start_date > end_date:
+                return None, 'start_date must be on or before end_date'
+            periods = []
+            period_start = get_period_start(start_date, timeframe)
+            while period_start <= end_date and len(periods) <= MAX_BATCH_PERIODS:
+                periods.append(period_start)
+                period_start = get_next_period_start(period_start, timeframe)
+
+        if len(periods) > MAX_BATCH_PERIODS:
+            return None, f'At most {MAX_BATCH_PERIODS} periods per request'
+        return periods, None
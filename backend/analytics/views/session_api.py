@@ -0,0 +1,210 @@
+import base64
+import binascii
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.utils.dateparse import parse_datetime
+
+from ..models import CategoryBlock, StudySession
+from ..queries import StudyAnalytics
+from ..services.live_session_service import LiveSessionService
+from .insights_api import get_target_user
+
+DEFAULT_HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+
+def encode_history_cursor(session):
+    """Opaque cursor pointing just past the given session"""
+    raw = f"{session.start_time.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_history_cursor(cursor):
+    """(start_time, id) from a cursor, or None if it is malformed"""
+    try:
+        start_time, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        start_time = parse_datetime(start_time)
+        session_id = int(session_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if start_time is None:
+        return None
+    return start_time, session_id
+
+
+def parse_int_param(params, name):
+    """Integer query param, None when absent; raises ValueError when malformed"""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    return int(value)
+
+
+class SessionHistory(APIView):
+    """
+    Past sessions, newest first, with their category blocks and breaks.
+
+    Query params: limit, cursor (next_cursor from the previous page), status
+    (comma-separated), category, min_focus/max_focus (1-5) and
+    min_duration/max_duration (seconds).
+    """
+
+    def get(self, request):
+        user = get_target_user(request)
+        if not user:
+            return Response(
+                {'error': 'User not found or access denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        params = request.query_params
+        try:
+            limit = parse_int_param(params, 'limit') or DEFAULT_HISTORY_PAGE_SIZE
+            category_id = parse_int_param(params, 'category')
+            min_focus = parse_int_param(params, 'min_focus') or 1
+            max_focus = parse_int_param(params, 'max_focus') or 5
+            min_duration = parse_int_param(params, 'min_duration')
+            max_duration = parse_int_param(params, 'max_duration')
+        except ValueError:
+            return Response(
+                {'error': 'limit, category, min_focus, max_focus, min_duration and max_duration must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+
+        after = None
+        if params.get('cursor'):
+            after = decode_history_cursor(params['cursor'])
+            if after is None:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        valid_statuses = {choice for choice, _ in StudySession.STATUS_CHOICES}
+        if not set(statuses) <= valid_statuses:
+            return Response(
+                {'error': f"status must be one of {', '.join(sorted(valid_statuses))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Only narrow by rating when the caller asked for a rating range
+        focus_ratings = None
+        if 'min_focus' in params or 'max_focus' in params:
+            focus_ratings = range(min_focus, max_focus + 1)
+
+        # Fetch one extra row to know whether another page follows
+        sessions = list(StudyAnalytics.get_session_history(
+            user,
+            limit + 1,
+            after=after,
+            statuses=statuses,
+            category_id=category_id,
+            focus_ratings=focus_ratings,
+            min_duration=min_duration,
+            max_duration=max_duration,
+        ))
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+
+        return Response({
+            'results': [self._session_data(session) for session in sessions],
+            'next_cursor': encode_history_cursor(sessions[-1]) if has_more else None,
+        }, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _session_data(session):
+        return {
+            'id': session.id,
+            'start_time': session.start_time,
+            'end_time': session.end_time,
+            'local_date': session.local_date,
+            'total_duration': session.total_duration,
+            'status': session.status,
+            'focus_rating': session.focus_rating,
+            'flow_score': session.flow_score,
+            'category_blocks': [
+                {
+                    'id': block.id,
+                    'category_id': block.category_id,
+                    'category_name': block.category.name,
+                    'category_color': block.category.color,
+                    'start_time': block.start_time,
+                    'end_time': block.end_time,
+                    'duration': block.duration,
+                }
+                for block in session.categoryblock_set.all()
+            ],
+            'breaks': [
+                {
+                    'start_time': session_break.start_time,
+                    'end_time': session_break.end_time,
+                    'duration': session_break.duration,
+                }
+                for session_break in session.break_set.all()
+            ],
+        }
+
+
+class SessionHeartbeat(APIView):
+    """
+    Periodic heartbeat from a running session's timer.
+
+    Body: {"category_block": id or null, "focus_seconds": elapsed focus time}. The state
+    goes to the cache; the session row is read on the first heartbeat (or after the state
+    expires) to check it is the user's and still active, and its last_heartbeat_at is
+    written at most every SESSION_HEARTBEAT_PERSIST_SECONDS. A session whose heartbeats
+    stop is completed at the last one by sweep_hanging_sessions; heartbeats for it then
+    get 409 so the client can stop its timer.
+    """
+
+    def get(self, request, id):
+        state = LiveSessionService.get_state(id)
+        if state is None or state['user_id'] != request.user.id:
+            return Response({'error': 'No live state for this session'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.payload(state), status=status.HTTP_200_OK)
+
+    def post(self, request, id):
+        try:
+            category_block_id = parse_int_param(request.data, 'category_block')
+            focus_seconds = parse_int_param(request.data, 'focus_seconds')
+        except (AttributeError, TypeError, ValueError):
+            return Response({'error': 'category_block and focus_seconds must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if focus_seconds is not None and focus_seconds < 0:
+            return Response({'error': 'focus_seconds must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = LiveSessionService.get_state(id)
+        if state is None or state['user_id'] != request.user.id:
+            state = None
+            session = StudySession.objects.filter(id=id, user=request.user).only('status', 'end_time').first()
+            if session is None:
+                return Response({'error': 'Study session not found'}, status=status.HTTP_404_NOT_FOUND)
+            if session.status != 'active' or session.end_time is not None:
+                return self.no_longer_active(session.status)
+
+        # The block only needs checking when it changes, so steady heartbeats stay query-free
+        if (
+            category_block_id is not None
+            and (state is None or state['category_block_id'] != category_block_id)
+            and not CategoryBlock.objects.filter(id=category_block_id, study_session_id=id).exists()
+        ):
+            return Response({'error': 'category_block is not part of this session'}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = LiveSessionService.record_heartbeat(id, request.user.id, category_block_id, focus_seconds)
+        if state is None:
+            # Ended since the state was cached, e.g. closed by sweep_hanging_sessions
+            return self.no_longer_active(StudySession.objects.filter(id=id).values_list('status', flat=True).first())
+        return Response(self.payload(state), status=status.HTTP_200_OK)
+
+    def no_longer_active(self, session_status):
+        return Response(
+            {'error': 'Session is no longer active', 'status': session_status},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    def payload(self, state):
+        return {
+            **{key: value for key, value in state.items() if key != 'persisted_at'},
+            # Send heartbeats well within this, or the session is closed as crashed
+            'timeout_seconds': round(LiveSessionService.heartbeat_timeout().total_seconds()),
+        }
@@ -0,0 +1,87 @@
+from django.db import IntegrityError
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..models import Categories
+from ..serializers import SyncSessionSerializer
+from ..services.session_sync_service import SessionSyncService
+
+# Largest batch accepted in one request; clients send longer queues in chunks
+MAX_SYNC_SESSIONS = 100
+
+
+class SyncSessions(APIView):
+    """
+    Upload sessions recorded offline, each complete with its category blocks and breaks,
+    in one request instead of a create/end call per session and block.
+
+    Body: {"sessions": [{client_uuid, start_time, end_time, status, focus_rating,
+    category_blocks: [{client_uuid, category, start_time, end_time}], breaks: [{start_time, end_time}]}]}
+    The batch is written all-or-nothing; the response lists the session ids in request
+    order. Sessions carrying a client_uuid that was already uploaded are not written
+    again, so a batch can be replayed safely.
+    """
+
+    def post(self, request):
+        user = request.user
+        sessions_data = request.data.get('sessions') if isinstance(request.data, dict) else None
+        if not isinstance(sessions_data, list) or not sessions_data:
+            return Response({'error': 'sessions must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(sessions_data) > MAX_SYNC_SESSIONS:
+            return Response(
+                {'error': f'At most {MAX_SYNC_SESSIONS} sessions per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = SyncSessionSerializer(data=sessions_data, many=True)
+        if not serializer.is_valid():
+            return Response({'sessions': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Replays of a batch that was partly stored skip the sessions already written
+        uploaded, new_sessions_data = SessionSyncService.split_uploaded(user, serializer.validated_data)
+
+        # Ownership of every category in the batch, checked with one query
+        category_ids = {
+            block['category']
+            for session_data in new_sessions_data
+            for block in session_data['category_blocks']
+        }
+        categories = Categories.objects.filter(user=user).in_bulk(category_ids)
+        unknown_ids = category_ids - categories.keys()
+        if unknown_ids:
+            return Response(
+                {'error': 'Category not found', 'categories': sorted(unknown_ids)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            created = SessionSyncService.create_sessions(user, new_sessions_data, categories)
+        except IntegrityError:
+            # Another upload of the same sessions committed first; the retry will match them
+            return Response(
+                {'error': 'Sessions in this batch are being uploaded by another request, retry'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if created:
+            SessionSyncService.refresh_aggregates(user, created)
+
+        # Every entry in request order, whether written now or by an earlier attempt
+        by_client_uuid = {**uploaded, **{session.client_uuid: session for session in created if session.client_uuid}}
+        anonymous = iter([session for session in created if not session.client_uuid])
+        sessions = [
+            by_client_uuid[session_data['client_uuid']] if session_data.get('client_uuid') else next(anonymous)
+            for session_data in serializer.validated_data
+        ]
+
+        return Response({
+            'sessions': [
+                {
+                    'id': session.id,
+                    'local_date': session.local_date,
+                    'total_duration': session.total_duration,
+                    'flow_score': session.flow_score,
+                }
+                for session in sessions
+            ]
+        }, status=status.HTTP_201_CREATED)
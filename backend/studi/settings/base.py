@@ -67,6 +67,17 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'studi.wsgi.application'
+ASGI_APPLICATION = 'studi.asgi.application'
+
+# Serve the read-only insights, category and goal endpoints with async views. Keep
+# this off by default: Django's async ORM still runs each request's queries one at a
+# time on a single database thread, so the async views issue the same queries in the
+# same order and are no faster per request (slower on a local database). The only
+# gain is not tying up a worker while the database answers, under ASGI with real
+# database latency, e.g. gunicorn -k uvicorn.workers.UvicornWorker studi.asgi. Turn
+# it on only where benchmark_read_views shows a throughput win; under WSGI each async
+# view would run in its own event loop.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'false').lower() == 'true'
 
 
 # Database
@@ -164,3 +175,38 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',                           # Which user field to include
     'USER_ID_CLAIM': 'user_id',                      # Claim name in token
 }
+
+# Aggregate updates
+# When deferred, session writes only enqueue an AggregateJob per (user, local date),
+# marking that day dirty. The run_aggregate_worker command recomputes dirty days in the
+# background, and the insights views recompute any still dirty on first read.
+# Off by default: inline updates apply each completed session as an O(1) delta, while a
+# deferred day costs a full recompute (or a stale response) on its next read. Turn it on
+# when write latency matters more and the worker is running.
+AGGREGATE_UPDATES_DEFERRED = os.environ.get('AGGREGATE_UPDATES_DEFERRED', 'false').lower() == 'true'
+# Serve dirty aggregates immediately and refresh them in a background thread
+AGGREGATE_STALE_WHILE_REVALIDATE = os.environ.get('AGGREGATE_STALE_WHILE_REVALIDATE', 'false').lower() == 'true'
+
+# Cache
+# Local memory is per process; with several gunicorn workers use the file backend
+# (CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache, CACHE_LOCATION=/path/to/dir)
+# so the workers share cached insights. Invalidation doesn't depend on it: the version
+# keying a user's entries is stored on the user row, so every process sees each write.
+# Likewise the sweeper judges running sessions by StudySession.last_heartbeat_at, not the cache.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'studi-default'),
+    }
+}
+INSIGHTS_CACHE_TIMEOUT = 60 * 60 * 24  # Entries are invalidated by version bumps; this just bounds their lifetime
+INSIGHTS_GZIP_MIN_BYTES = int(os.environ.get('INSIGHTS_GZIP_MIN_BYTES', '1024'))  # Cached insights bodies at least this large also keep a gzipped copy
+AGGREGATE_JOB_MAX_ATTEMPTS = 5
+AGGREGATE_JOB_RETRY_BACKOFF_SECONDS = 30   # Doubles on each retry
+AGGREGATE_JOB_STALE_SECONDS = 600          # Reclaim jobs from workers that died mid-run
+# Running sessions report heartbeats into the cache; one silent this long is completed at its last heartbeat
+SESSION_HEARTBEAT_TIMEOUT_SECONDS = int(os.environ.get('SESSION_HEARTBEAT_TIMEOUT_SECONDS', '120'))
+# How often a heartbeat is also written to StudySession.last_heartbeat_at, which is what the
+# sweeper reads. Keep it well under the timeout less the client's heartbeat interval
+SESSION_HEARTBEAT_PERSIST_SECONDS = int(os.environ.get('SESSION_HEARTBEAT_PERSIST_SECONDS', '30'))
+LIVE_SESSION_STATE_TIMEOUT = 60 * 60 * 24  # How long heartbeat state outlives the last heartbeat